@@ -0,0 +1,235 @@
+"""
+Adaptive next-question selection
+An attempt's paper is indexed once into difficulty pools: each question
+gets a bit position and each difficulty level a bitmask. Per attempt we
+keep the served and answered question ids as two Redis sets, updated with
+SADD so concurrent saves on one attempt cannot drop each other's answers,
+and turn them into bitmasks. Picking the next question is a mask AND plus
+a lowest-set-bit lookup, with no queries and no scan over the answers so
+far. While Redis is unavailable the answered set is rebuilt from the
+caller's authoritative answered ids instead.
+
+The strategy is pluggable through settings.ADAPTIVE['SELECTOR'] (a dotted
+path to a class with next_question(pools, state, question_id, is_correct)).
+DifficultyPools, AttemptState and StepSelector are plain Python and can
+be benchmarked without Django (see scripts/bench_adaptive.py).
+"""
+import threading
+from collections import defaultdict
+
+LEVELS = ('EASY', 'MEDIUM', 'HARD')
+# Attempt state only matters while the attempt is running
+STATE_TIMEOUT = 6 * 3600
+# Member of an answered set once it holds all earlier answers (see next_question)
+SEEDED = '*'
+
+
+class DifficultyPools:
+    """Bit index of every question on a paper, bucketed by difficulty"""
+
+    def __init__(self, question_ids, difficulties):
+        self.question_ids = list(question_ids)
+        self.index = {question_id: i for i, question_id in enumerate(self.question_ids)}
+        self.masks = {}
+        self.difficulty = {}
+        for i, (question_id, level) in enumerate(zip(self.question_ids, difficulties)):
+            self.masks[level] = self.masks.get(level, 0) | (1 << i)
+            self.difficulty[question_id] = level
+
+    @classmethod
+    def from_paper(cls, paper):
+        ordered = sorted(paper, key=lambda question_id: paper[question_id]['order'])
+        return cls(ordered, [paper[q]['difficulty'] for q in ordered])
+
+    def bit(self, question_id):
+        i = self.index.get(question_id)
+        return 0 if i is None else 1 << i
+
+    def mask_of(self, question_ids):
+        mask = 0
+        for question_id in question_ids:
+            mask |= self.bit(str(question_id))
+        return mask
+
+    def first(self, mask):
+        """Question at the lowest set bit (paper order), or None"""
+        if not mask:
+            return None
+        return self.question_ids[(mask & -mask).bit_length() - 1]
+
+
+class AttemptState:
+    """Questions served to and answered by one attempt, as bitmasks"""
+
+    __slots__ = ('served', 'answered')
+
+    def __init__(self, served=0, answered=0):
+        self.served = served
+        self.answered = answered
+
+
+class StepSelector:
+    """
+    Step one level up after a correct answer and one level down after a
+    wrong one. Prefers questions not yet served, then any unanswered one
+    of the target level, in paper order.
+    """
+
+    def target_level(self, current, is_correct):
+        if current not in LEVELS:
+            return current
+        i = LEVELS.index(current) + (1 if is_correct else -1)
+        return LEVELS[min(max(i, 0), len(LEVELS) - 1)]
+
+    def next_question(self, pools, state, question_id, is_correct):
+        level = self.target_level(pools.difficulty.get(question_id), is_correct)
+        pool = pools.masks.get(level, 0) & ~state.answered
+        return pools.first(pool & ~state.served) or pools.first(pool)
+
+
+class LocalAttemptStates:
+    """In-process stand-in for RedisAttemptStates (tests, single process)"""
+
+    def __init__(self):
+        self._served = defaultdict(set)
+        self._answered = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def record(self, attempt_id, question_ids):
+        """Add answered question ids; returns (served ids, answered ids)"""
+        with self._lock:
+            answered = self._answered[str(attempt_id)]
+            answered.update(question_ids)
+            return set(self._served[str(attempt_id)]), set(answered)
+
+    def seed(self, attempt_id, question_ids):
+        with self._lock:
+            self._answered[str(attempt_id)].update([SEEDED, *question_ids])
+
+    def serve(self, attempt_id, question_id):
+        with self._lock:
+            self._served[str(attempt_id)].add(question_id)
+
+
+class RedisAttemptStates:
+    """
+    Served and answered question ids of each attempt as Redis sets shared by
+    all workers. record() returns None while Redis is unavailable.
+    """
+
+    def __init__(self):
+        from apps.core.redis_client import get_breaker
+        self._breaker = get_breaker('adaptive')
+
+    @staticmethod
+    def _keys(attempt_id):
+        return f'adaptive:{attempt_id}:served', f'adaptive:{attempt_id}:answered'
+
+    def record(self, attempt_id, question_ids):
+        served_key, answered_key = self._keys(attempt_id)
+
+        def run(r):
+            pipe = r.pipeline()
+            if question_ids:
+                pipe.sadd(answered_key, *question_ids)
+            pipe.expire(answered_key, STATE_TIMEOUT)
+            pipe.smembers(served_key)
+            pipe.smembers(answered_key)
+            return tuple(pipe.execute()[-2:])
+        return self._breaker.call(run, lambda: None)
+
+    def seed(self, attempt_id, question_ids):
+        _, answered_key = self._keys(attempt_id)
+
+        def run(r):
+            pipe = r.pipeline()
+            pipe.sadd(answered_key, SEEDED, *question_ids)
+            pipe.expire(answered_key, STATE_TIMEOUT)
+            pipe.execute()
+        self._breaker.call(run, lambda: None)
+
+    def serve(self, attempt_id, question_id):
+        served_key, _ = self._keys(attempt_id)
+
+        def run(r):
+            pipe = r.pipeline()
+            pipe.sadd(served_key, question_id)
+            pipe.expire(served_key, STATE_TIMEOUT)
+            pipe.execute()
+        self._breaker.call(run, lambda: None)
+
+
+_selector = None
+_pools = None
+_states = None
+_states_lock = threading.Lock()
+
+
+def get_selector():
+    global _selector
+    if _selector is None:
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+        _selector = import_string(settings.ADAPTIVE['SELECTOR'])()
+    return _selector
+
+
+def attempt_pools(attempt, paper):
+    """Pools for an attempt's frozen paper, kept per process (the paper never changes)"""
+    global _pools
+    if _pools is None:
+        from django.conf import settings
+        from apps.core.lru import LRUCache
+        _pools = LRUCache(settings.ADAPTIVE['POOL_CACHE_ENTRIES'], settings.ADAPTIVE['POOL_CACHE_TTL'])
+    pools = _pools.get(attempt.id)
+    if pools is None:
+        pools = DifficultyPools.from_paper(paper)
+        _pools.set(attempt.id, pools)
+    return pools
+
+
+def get_states():
+    global _states
+    if _states is None:
+        with _states_lock:
+            if _states is None:
+                from django.conf import settings
+                if settings.ADAPTIVE['STATE_BACKEND'] == 'memory':
+                    _states = LocalAttemptStates()
+                else:
+                    _states = RedisAttemptStates()
+    return _states
+
+
+def next_question(attempt, paper, question_id, is_correct, answered_ids=None):
+    """
+    Record question_id as answered and return the id of the question to
+    serve next (or None). answered_ids (the answers saved so far) seeds the
+    answered set the first time and stands in for it while Redis is
+    unavailable; pass a callable to make that lazy.
+    """
+    pools = attempt_pools(attempt, paper)
+    states = get_states()
+    question_id = str(question_id)
+    recorded = states.record(attempt.id, [question_id])
+    if recorded is None or SEEDED not in recorded[1]:
+        ids = answered_ids() if callable(answered_ids) else (answered_ids or [])
+        ids = {str(i) for i in ids} | {question_id}
+        if recorded is None:
+            served, answered = set(), ids
+        else:
+            states.seed(attempt.id, ids)
+            served, answered = recorded[0], recorded[1] | ids
+    else:
+        served, answered = recorded
+
+    state = AttemptState(pools.mask_of(served), pools.mask_of(answered))
+    chosen = get_selector().next_question(pools, state, question_id, is_correct)
+    if chosen:
+        states.serve(attempt.id, chosen)
+    return chosen
+
+
+def mark_answered(attempt, paper, question_ids):
+    """Add answers saved outside next_question (batch submits) to the attempt's state"""
+    get_states().record(attempt.id, [str(question_id) for question_id in question_ids])
@@ -0,0 +1,390 @@
+"""
+Write-behind buffer for answer autosaves
+In write_behind mode submit-answer stores the latest answer per
+(attempt, question) in a Redis hash and acknowledges immediately; a
+flusher upserts buffered answers into StudentAnswer in bulk every few
+seconds. An answer older (by client ts) than the one already buffered
+for its question is not stored, whatever order they arrive in. finish writes the attempt's buffered answers before grading and
+drops them from the buffer only once its transaction commits; if the
+buffer cannot be read or locked, finish fails (AnswerBufferUnavailable,
+503) rather than grade without them.
+
+Redis layout:
+    answers:<attempt_id>   hash question_id -> JSON {"choice", "text", "ts"}
+                           (ts: client clock in Unix seconds, or null)
+    answers:dirty          set of attempt ids with unflushed answers
+    answers_lock:<id>      held while an attempt's answers are being written
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.core.redis_client import get_breaker, get_redis
+from .grading import evaluate_submission
+from .models import Attempt, StudentAnswer
+from .paper import attempt_paper
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'answers:dirty'
+
+# KEYS[1] answers hash, KEYS[2] dirty set; ARGV: attempt id, then
+# (question id, answer JSON, client ts or '') triples. Stores each answer
+# unless the buffered one has a later ts; returns the question ids stored.
+PUT_SCRIPT = """
+local stored = {}
+for i = 2, #ARGV, 3 do
+    local ts = tonumber(ARGV[i + 2])
+    local newer = false
+    if ts then
+        local current = redis.call('HGET', KEYS[1], ARGV[i])
+        if current then
+            local current_ts = cjson.decode(current)['ts']
+            newer = type(current_ts) == 'number' and current_ts > ts
+        end
+    end
+    if not newer then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+        table.insert(stored, ARGV[i])
+    end
+end
+if #stored > 0 then
+    redis.call('SADD', KEYS[2], ARGV[1])
+end
+return stored
+"""
+
+# HDEL the given fields only where they still hold the given values
+DISCARD_SCRIPT = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        removed = removed + redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
+
+
+class AnswerBufferUnavailable(APIException):
+    """Buffered answers could not be read or locked; closing the attempt now would lose them"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Saved answers are temporarily unavailable, please try again.'
+    default_code = 'answer_buffer_unavailable'
+
+
+def _answers_key(attempt_id):
+    return f'answers:{attempt_id}'
+
+
+class LocalAnswerBuffer:
+    """In-process stand-in for RedisAnswerBuffer (tests, single process)"""
+
+    def __init__(self):
+        self._answers = defaultdict(dict)
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._attempt_locks = defaultdict(threading.Lock)
+
+    def put(self, attempt_id, question_id, answer):
+        return str(question_id) in self.put_many(attempt_id, {str(question_id): answer})
+
+    def put_many(self, attempt_id, answers):
+        with self._lock:
+            current = self._answers[str(attempt_id)]
+            stored = set()
+            for question_id, answer in answers.items():
+                buffered = current.get(question_id)
+                if buffered is None or not is_stale(answer.get('ts'), buffered.get('ts')):
+                    current[question_id] = answer
+                    stored.add(question_id)
+            if stored:
+                self._dirty[str(attempt_id)] = True
+        return stored
+
+    def question_ids(self, attempt_id):
+        with self._lock:
+            return set(self._answers.get(str(attempt_id), {}))
+
+    def pop_dirty(self, limit):
+        with self._lock:
+            ids = list(self._dirty)[:limit]
+            for attempt_id in ids:
+                del self._dirty[attempt_id]
+        return ids
+
+    def drain(self, attempt_id):
+        with self._lock:
+            return self._answers.pop(str(attempt_id), {})
+
+    def peek(self, attempt_id):
+        with self._lock:
+            return dict(self._answers.get(str(attempt_id), {}))
+
+    def discard(self, attempt_id, answers):
+        """Drop the given answers unless newer ones replaced them meanwhile"""
+        with self._lock:
+            current = self._answers.get(str(attempt_id), {})
+            for question_id, answer in answers.items():
+                if current.get(question_id) == answer:
+                    del current[question_id]
+            if not current:
+                self._answers.pop(str(attempt_id), None)
+
+    def restore(self, attempt_id, answers):
+        """Put back answers that failed to write, unless newer ones arrived"""
+        with self._lock:
+            current = self._answers[str(attempt_id)]
+            for question_id, answer in answers.items():
+                current.setdefault(question_id, answer)
+            self._dirty[str(attempt_id)] = True
+
+    @contextmanager
+    def locked(self, attempt_id):
+        with self._lock:
+            lock = self._attempt_locks[str(attempt_id)]
+        with lock:
+            yield
+
+
+class RedisAnswerBuffer:
+    """
+    Buffer shared by all workers. put() and put_many() return None when
+    Redis is unavailable so the caller can fall back to a synchronous write.
+    """
+
+    def __init__(self):
+        self._breaker = get_breaker('answer_buffer')
+
+    def put(self, attempt_id, question_id, answer):
+        stored = self.put_many(attempt_id, {str(question_id): answer})
+        return None if stored is None else str(question_id) in stored
+
+    def put_many(self, attempt_id, answers):
+        """Store answers unless newer ones are buffered; returns the question ids stored"""
+        args = [str(attempt_id)]
+        for question_id, answer in answers.items():
+            ts = answer.get('ts')
+            args += [question_id, json.dumps(answer), '' if ts is None else repr(float(ts))]
+
+        return self._breaker.call(
+            lambda r: set(r.eval(PUT_SCRIPT, 2, _answers_key(attempt_id), DIRTY_KEY, *args)),
+            lambda: None
+        )
+
+    def question_ids(self, attempt_id):
+        return set(self._breaker.call(lambda r: r.hkeys(_answers_key(attempt_id)), lambda: []))
+
+    def pop_dirty(self, limit):
+        return self._breaker.call(lambda r: r.spop(DIRTY_KEY, limit) or [], lambda: [])
+
+    def drain(self, attempt_id):
+        def take(r):
+            # HGETALL + DEL in one MULTI so no concurrent put is lost in between
+            pipe = r.pipeline(transaction=True)
+            pipe.hgetall(_answers_key(attempt_id))
+            pipe.delete(_answers_key(attempt_id))
+            raw, _ = pipe.execute()
+            return {question_id: json.loads(value) for question_id, value in raw.items()}
+        return self._breaker.call(take, self._unavailable)
+
+    def peek(self, attempt_id):
+        def read(r):
+            raw = r.hgetall(_answers_key(attempt_id))
+            return {question_id: json.loads(value) for question_id, value in raw.items()}
+        return self._breaker.call(read, self._unavailable)
+
+    def discard(self, attempt_id, answers):
+        """Drop the given answers unless newer ones replaced them meanwhile"""
+        args = []
+        for question_id, answer in answers.items():
+            args += [question_id, json.dumps(answer)]
+        self._breaker.call(
+            lambda r: r.eval(DISCARD_SCRIPT, 1, _answers_key(attempt_id), *args),
+            lambda: logger.error('Could not discard written answers of attempt %s', attempt_id)
+        )
+
+    @staticmethod
+    def _unavailable():
+        raise AnswerBufferUnavailable()
+
+    def restore(self, attempt_id, answers):
+        def put_back(r):
+            pipe = r.pipeline()
+            for question_id, answer in answers.items():
+                pipe.hsetnx(_answers_key(attempt_id), question_id, json.dumps(answer))
+            pipe.sadd(DIRTY_KEY, str(attempt_id))
+            pipe.execute()
+        self._breaker.call(put_back, lambda: logger.error(
+            'Lost %s buffered answers for attempt %s', len(answers), attempt_id
+        ))
+
+    @contextmanager
+    def locked(self, attempt_id):
+        lock = get_redis().lock(f'answers_lock:{attempt_id}', timeout=30, blocking_timeout=10)
+        if not self._breaker.call(lambda r: lock.acquire(), lambda: False):
+            # Writing without the lock could race the flusher (or finish) on the same answers
+            raise AnswerBufferUnavailable()
+        try:
+            yield
+        finally:
+            self._breaker.call(lambda r: lock.release(), lambda: None)
+
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def write_behind_enabled():
+    return settings.ANSWER_BUFFER['MODE'] == 'write_behind'
+
+
+def get_answer_buffer():
+    """Return this process's buffer, starting the in-process flusher if configured"""
+    global _buffer, _buffer_pid
+    if _buffer is None or _buffer_pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is None or _buffer_pid != os.getpid():
+                if settings.ANSWER_BUFFER['BACKEND'] == 'memory':
+                    _buffer = LocalAnswerBuffer()
+                else:
+                    _buffer = RedisAnswerBuffer()
+                _buffer_pid = os.getpid()
+                if settings.ANSWER_BUFFER['IN_PROCESS_FLUSHER']:
+                    threading.Thread(target=_run_flusher, name='answer-flusher', daemon=True).start()
+    return _buffer
+
+
+def is_stale(ts, stored_ts):
+    """
+    Whether an answer given at client time ts is older than the stored one.
+    Only client clocks are compared; an answer without a client time is
+    applied in arrival order.
+    """
+    return ts is not None and stored_ts is not None and ts < stored_ts
+
+
+def write_answers(batch, stale=None):
+    """
+    Upsert {attempt_id: {question_id: answer}} into StudentAnswer with one
+    bulk statement. Returns the number of rows written. Attempts that are
+    no longer running are skipped: their answers are final. So are answers
+    older (by client ts) than the stored ones, e.g. an offline replay
+    arriving after a newer online save; their (attempt_id, question_id)
+    pairs are added to the stale set when one is given.
+    """
+    with transaction.atomic():
+        attempts = list(
+            Attempt.objects.filter(id__in=list(batch), status='STARTED')
+            .select_related('exam').defer('paper', 'review')
+        )
+        question_ids = {question_id for answers in batch.values() for question_id in answers}
+        # Locked so a concurrent writer cannot slip a newer answer in between
+        stored = {
+            (str(attempt_id), str(question_id)): client_ts
+            for attempt_id, question_id, client_ts in StudentAnswer.objects.select_for_update().filter(
+                attempt__in=attempts, question_id__in=question_ids
+            ).values_list('attempt_id', 'question_id', 'client_ts')
+        }
+        rows = []
+        for attempt in attempts:
+            key = attempt_paper(attempt)
+            for question_id, answer in batch[str(attempt.id)].items():
+                entry = key.get(question_id)
+                if entry is None:
+                    continue
+                if is_stale(answer.get('ts'), stored.get((str(attempt.id), question_id))):
+                    if stale is not None:
+                        stale.add((str(attempt.id), question_id))
+                    continue
+                choice_id = answer.get('choice')
+                values = evaluate_submission(
+                    entry['type'], entry['marks'],
+                    entry['choices'].get(choice_id) if choice_id else None,
+                    answer.get('text'), attempt.exam.negative_marking
+                )
+                rows.append(StudentAnswer(
+                    attempt=attempt,
+                    question_id=question_id,
+                    selected_choice_id=None if entry['type'] == 'DESCRIPTIVE' else choice_id,
+                    answer_text=values.pop('answer_text', None),
+                    feedback=values.pop('feedback', None),
+                    client_ts=answer.get('ts'),
+                    **values
+                ))
+        StudentAnswer.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_choice', 'answer_text', 'feedback', 'is_correct', 'marks_awarded', 'client_ts'],
+        )
+    return len(rows)
+
+
+def flush_pending(buffer=None, limit=None):
+    """Write up to `limit` dirty attempts; returns (attempts, answers) flushed"""
+    buffer = buffer or get_answer_buffer()
+    attempt_ids = buffer.pop_dirty(limit or settings.ANSWER_BUFFER['FLUSH_BATCH'])
+    if not attempt_ids:
+        return 0, 0
+    with ExitStack() as stack:
+        # Hold each attempt's lock until its answers are in the database,
+        # so a concurrent finish cannot grade before they land
+        batch = {}
+        for attempt_id in attempt_ids:
+            try:
+                stack.enter_context(buffer.locked(attempt_id))
+                answers = buffer.drain(attempt_id)
+            except AnswerBufferUnavailable:
+                # Busy (finish holds it) or Redis trouble: leave it for the next run
+                buffer.restore(attempt_id, {})
+                continue
+            if answers:
+                batch[attempt_id] = answers
+        if not batch:
+            return 0, 0
+        try:
+            written = write_answers(batch)
+        except Exception:
+            for attempt_id, answers in batch.items():
+                buffer.restore(attempt_id, answers)
+            raise
+    return len(batch), written
+
+
+def drain_attempt(attempt, buffer=None):
+    """
+    Synchronously write everything buffered for one attempt (used by finish).
+    Raises AnswerBufferUnavailable when the buffer cannot be read or locked.
+    The answers leave the buffer only when the surrounding transaction
+    commits, so a rolled back finish can still write them later.
+    """
+    buffer = buffer or get_answer_buffer()
+    with buffer.locked(attempt.id):
+        answers = buffer.peek(attempt.id)
+        if answers:
+            write_answers({str(attempt.id): answers})
+            transaction.on_commit(lambda: buffer.discard(attempt.id, answers))
+    return len(answers)
+
+
+def _run_flusher():
+    interval = settings.ANSWER_BUFFER['FLUSH_INTERVAL']
+    while True:
+        time.sleep(interval)
+        close_old_connections()
+        try:
+            while flush_pending()[0]:
+                pass
+        except Exception:
+            logger.exception('Answer buffer flush failed')
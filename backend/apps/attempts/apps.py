@@ -3,6 +3,3 @@ from django.apps import AppConfig
 class AttemptsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.attempts'
-
-    def ready(self):
-        import apps.attempts.signals
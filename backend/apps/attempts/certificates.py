@@ -0,0 +1,197 @@
+"""
+Completion certificates
+A certificate is rendered once, when the attempt completes, by a small
+per-process thread pool, and stored on local disk under the hash of
+everything printed on it (plus TEMPLATE_VERSION). ReportLab runs with
+invariant=1 and the attempt's finish time is printed instead of "now",
+so the same inputs always give the same bytes: the hash doubles as a
+strong ETag, a re-grade that changes the score simply addresses a new
+file, and downloads are plain file reads (FileResponse, which gunicorn
+serves with sendfile).
+
+Exam-wide downloads stream a ZIP built on the fly, one file at a time.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so every certificate is re-rendered
+TEMPLATE_VERSION = 1
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _fields(attempt_id, username, exam, score, finish_time):
+    return {
+        'attempt_id': str(attempt_id),
+        'username': username,
+        'exam_title': exam.title,
+        'score': score,
+        'pass_marks': exam.pass_marks,
+        'finish_time': finish_time.strftime('%Y-%m-%d %H:%M:%S') if finish_time else '',
+    }
+
+
+def certificate_fields(attempt):
+    """Everything printed on an attempt's certificate"""
+    return _fields(attempt.id, attempt.user.username, attempt.exam, attempt.score, attempt.finish_time)
+
+
+def exam_certificates(exam):
+    """(arcname, fields) for every completed attempt of an exam, read in chunks"""
+    from .models import Attempt
+
+    rows = (
+        Attempt.objects.filter(exam=exam, status='COMPLETED')
+        .order_by('finish_time')
+        .values_list('id', 'user__username', 'score', 'finish_time')
+        .iterator(chunk_size=500)
+    )
+    for attempt_id, username, score, finish_time in rows:
+        yield f'{username}_{attempt_id}.pdf', _fields(attempt_id, username, exam, score, finish_time)
+
+
+def certificate_key(fields):
+    payload = json.dumps([TEMPLATE_VERSION, fields], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def certificate_path(key):
+    return os.path.join(settings.CERTIFICATES['ROOT'], key[:2], f'{key}.pdf')
+
+
+def render_pdf(fields):
+    """PDF bytes for a certificate; byte-identical for identical fields"""
+    from io import BytesIO
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    p.setTitle(f"Certificate {fields['attempt_id']}")
+
+    # Draw certificate
+    p.setFont("Helvetica-Bold", 30)
+    p.drawCentredString(297, 700, "CERTIFICATE OF COMPLETION")
+
+    p.setFont("Helvetica", 18)
+    p.drawCentredString(297, 600, "This is to certify that")
+
+    p.setFont("Helvetica-Bold", 24)
+    p.drawCentredString(297, 550, fields['username'].upper())
+
+    p.setFont("Helvetica", 18)
+    p.drawCentredString(297, 500, "has successfully completed the exam")
+
+    p.setFont("Helvetica-Bold", 20)
+    p.drawCentredString(297, 450, fields['exam_title'])
+
+    p.setFont("Helvetica", 16)
+    p.drawCentredString(297, 400, f"Score: {fields['score']} / Pass Marks: {fields['pass_marks']}")
+
+    p.setFont("Helvetica-Oblique", 12)
+    p.drawCentredString(297, 300, f"Completed on: {fields['finish_time']}")
+    p.drawCentredString(297, 280, f"Certificate ID: {fields['attempt_id']}")
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def ensure_certificate(fields):
+    """(path, key) of the certificate for fields, rendering it if it is not on disk yet"""
+    key = certificate_key(fields)
+    path = certificate_path(key)
+    if not os.path.exists(path):
+        data = render_pdf(fields)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent renders of one certificate write identical bytes; the rename is atomic
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return path, key
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    # Pools do not survive fork: each worker starts its own
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CERTIFICATES['WORKERS'], thread_name_prefix='certificates'
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _render_quietly(fields):
+    try:
+        ensure_certificate(fields)
+    except Exception:
+        logger.exception('Rendering certificate for attempt %s failed', fields['attempt_id'])
+
+
+def schedule_render(attempt):
+    """Render a completed attempt's certificate in the background (the download renders it if this has not)"""
+    if not settings.CERTIFICATES['RENDER_ON_COMPLETE'] or attempt.status != 'COMPLETED':
+        return
+    from django.db import transaction
+    fields = certificate_fields(attempt)
+    transaction.on_commit(lambda: _get_executor().submit(_render_quietly, fields))
+
+
+class _ZipPipe:
+    """Write-only file object that hands what zipfile wrote to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive of (arcname, fields) certificates as it is built.
+    The pipe is not seekable, so zipfile writes data descriptors and
+    nothing but the current file is held in memory.
+    """
+    pipe = _ZipPipe()
+    # PDFs are already compressed
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for arcname, fields in entries:
+            try:
+                path, _ = ensure_certificate(fields)
+            except Exception:
+                logger.exception('Rendering certificate for attempt %s failed', fields['attempt_id'])
+                continue
+            archive.write(path, arcname)
+            yield pipe.drain()
+    yield pipe.drain()
@@ -0,0 +1,88 @@
+"""
+Expiry sweeper for abandoned attempts
+Attempts whose deadline has passed while still STARTED (the student closed
+the browser) are graded with the same engine as finish and marked TIMEOUT.
+Candidates are found through the (status, deadline) index, oldest first.
+An attempt that fails to finalize (bad paper, grading error) is retried
+with exponential backoff (sweep_retry_at), so a few broken rows cannot
+hold up every attempt behind them.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .grading import finalize_attempt
+from .models import Attempt
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+
+def overdue(now, grace_seconds=0):
+    cutoff = now - timedelta(seconds=grace_seconds)
+    # Offline-capable exams accept late log uploads (see sync.py) before timing out
+    late_cutoff = cutoff - timedelta(seconds=settings.OFFLINE_SYNC['LATE_SYNC_SECONDS'])
+    return Attempt.objects.filter(status='STARTED', deadline__lt=cutoff).filter(
+        Q(exam__is_offline_capable=False) | Q(deadline__lt=late_cutoff)
+    )
+
+
+def due(now, grace_seconds=0):
+    """Overdue attempts that are not backing off after a failure"""
+    return overdue(now, grace_seconds).filter(Q(sweep_retry_at__isnull=True) | Q(sweep_retry_at__lte=now))
+
+
+def _record_failure(attempt_id, now):
+    failures = Attempt.objects.filter(id=attempt_id).values_list('sweep_failures', flat=True).first() or 0
+    delay = min(RETRY_BASE_SECONDS * 2 ** failures, RETRY_MAX_SECONDS)
+    Attempt.objects.filter(id=attempt_id).update(
+        sweep_failures=failures + 1, sweep_retry_at=now + timedelta(seconds=delay)
+    )
+
+
+def sweep_batch(batch_size, grace_seconds=0):
+    """
+    Finalize up to batch_size overdue attempts. Returns
+    {'swept', 'failed', 'seconds', 'max_lag_seconds'} where lag is how long past its
+    deadline the oldest swept attempt was.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    candidates = list(
+        due(now, grace_seconds).order_by('deadline').values_list('id', flat=True)[:batch_size]
+    )
+    swept = failed = 0
+    max_lag = 0.0
+    for attempt_id in candidates:
+        try:
+            with transaction.atomic():
+                # Skip rows a concurrent finish (or another sweeper) is holding
+                attempt = (
+                    Attempt.objects.select_for_update(skip_locked=True, of=('self',))
+                    .select_related('exam').defer('paper')
+                    .filter(id=attempt_id, status='STARTED').first()
+                )
+                if attempt is None:
+                    continue
+                if finalize_attempt(attempt, status='TIMEOUT', finish_time=attempt.deadline) is None:
+                    continue
+        except Exception:
+            logger.exception('Could not time out attempt %s', attempt_id)
+            _record_failure(attempt_id, now)
+            failed += 1
+            continue
+        swept += 1
+        max_lag = max(max_lag, (now - attempt.deadline).total_seconds())
+    return {
+        'swept': swept,
+        'failed': failed,
+        'seconds': time.monotonic() - started,
+        'max_lag_seconds': max_lag,
+    }
@@ -0,0 +1,198 @@
+"""
+Answer evaluation helpers shared by submit-answer, the answer buffer
+flusher and finish
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.cache import exam_namespace, get_or_build
+from apps.exams.models import ExamQuestion
+from apps.question_bank.models import Choice
+from .certificates import schedule_render
+from .models import Attempt, StudentAnswer
+from .monitoring import attempt_finished
+from .notifications import queue_completion_email
+from .review import materialize
+
+
+def build_answer_key(exam_id):
+    """
+    {question_id: {'order', 'type', 'difficulty', 'marks', 'choices': {choice_id: is_correct}}}
+    for every question currently in the exam (two queries).
+    """
+    key = {}
+    rows = ExamQuestion.objects.filter(exam_id=exam_id).values_list(
+        'question_id', 'question__question_type', 'question__difficulty', 'marks'
+    )
+    # Rows come back in ExamQuestion.Meta.ordering
+    for order, (question_id, question_type, difficulty, marks) in enumerate(rows):
+        key[str(question_id)] = {
+            'order': order,
+            'type': question_type,
+            'difficulty': difficulty,
+            'marks': marks,
+            'choices': {},
+        }
+    for choice_id, question_id, is_correct in Choice.objects.filter(
+        question_id__in=[qid for qid in key]
+    ).values_list('id', 'question_id', 'is_correct'):
+        key[str(question_id)]['choices'][str(choice_id)] = is_correct
+    return key
+
+
+def exam_answer_key(exam_id):
+    """Cached answer key; invalidated with the exam's cache namespace"""
+    return get_or_build(exam_namespace(exam_id), ['answer_key'], lambda: build_answer_key(exam_id))
+
+
+def evaluate_submission(question_type, max_marks, choice_correct, answer_text, negative_marking):
+    """
+    Provisional marks recorded when an answer is saved (finish re-grades,
+    applying partial scoring). choice_correct is None when no choice applies.
+    Uses the same rules as grade_answers so saved and final marks agree.
+    """
+    result = {}
+    if question_type == 'DESCRIPTIVE':
+        result['answer_text'] = answer_text
+        result['is_correct'], result['marks_awarded'], result['feedback'] = descriptive_marks(
+            max_marks, answer_text
+        )
+    else:
+        result['is_correct'] = bool(choice_correct)
+        if choice_correct:
+            result['marks_awarded'] = max_marks
+        else:
+            # Apply negative marking if configured
+            result['marks_awarded'] = -negative_deduction(max_marks, negative_marking)
+    return result
+
+
+def negative_deduction(max_marks, negative_marking):
+    """
+    Marks removed for a wrong choice. 0 < negative_marking <= 1 is a
+    fraction of the question's marks; anything larger is absolute marks.
+    """
+    if 0 < negative_marking <= 1.0:
+        return abs(max_marks * negative_marking)
+    return abs(negative_marking)
+
+
+def descriptive_marks(max_marks, answer_text):
+    """Mock NLP evaluation based on word count: (is_correct, marks, feedback)"""
+    word_count = len(answer_text.split()) if answer_text else 0
+    if word_count > 50:
+        return True, max_marks, "Strong answer with sufficient detail. (AI Evaluated)"
+    if word_count > 10:
+        return False, max_marks * 0.5, "Average answer. More detail required. (AI Evaluated)"
+    return False, 0.0, "Answer too short. (AI Evaluated)"
+
+
+def grade_answers(answers, paper, exam, fallback_marks=None):
+    """
+    Score StudentAnswer instances in memory against a paper/answer key.
+    Sets is_correct, marks_awarded and feedback on each and returns the
+    total. fallback_marks maps question_id -> marks for answers whose
+    question is not on the paper (attempts started before snapshots).
+
+    With exam.partial_scoring, a correct choice on a question with several
+    correct choices earns marks / number of correct choices.
+    """
+    fallback_marks = fallback_marks or {}
+    total = 0.0
+    for answer in answers:
+        question_id = str(answer.question_id)
+        entry = paper.get(question_id)
+        if entry:
+            max_marks = entry['marks']
+            question_type = entry['type']
+        else:
+            max_marks = fallback_marks.get(question_id, 1)
+            question_type = answer.question.question_type
+
+        if question_type == 'DESCRIPTIVE':
+            answer.is_correct, answer.marks_awarded, answer.feedback = descriptive_marks(
+                max_marks, answer.answer_text
+            )
+        elif answer.selected_choice_id:
+            # MCQ or TF
+            if entry:
+                answer.is_correct = entry['choices'].get(str(answer.selected_choice_id), False)
+                correct_count = sum(entry['choices'].values())
+            else:
+                answer.is_correct = answer.selected_choice.is_correct
+                correct_count = 1
+            if not answer.is_correct:
+                answer.marks_awarded = -negative_deduction(max_marks, exam.negative_marking)
+            elif exam.partial_scoring and correct_count > 1:
+                answer.marks_awarded = max_marks / correct_count
+            else:
+                answer.marks_awarded = max_marks
+        else:
+            # No answer selected
+            answer.is_correct = False
+            answer.marks_awarded = 0.0
+        total += answer.marks_awarded
+    return total
+
+
+def grade_attempt(attempt, paper=None):
+    """
+    Grade every saved answer of an attempt: one query for the answer
+    sheet, the paper from cache, and one bulk_update. Returns the score.
+    """
+    from .paper import attempt_paper  # paper imports this module
+
+    paper = paper if paper is not None else attempt_paper(attempt)
+    answers = list(
+        StudentAnswer.objects.filter(attempt=attempt).select_related('question', 'selected_choice')
+    )
+
+    # Attempts started before paper snapshots: the live ExamQuestion may point
+    # to a newer version of the question, so match those by title (one query)
+    fallback_marks = {}
+    missing = {str(a.question_id): a.question.title for a in answers if str(a.question_id) not in paper}
+    if missing:
+        marks_by_title = dict(ExamQuestion.objects.filter(
+            exam_id=attempt.exam_id, question__title__in=set(missing.values())
+        ).values_list('question__title', 'marks'))
+        fallback_marks = {
+            question_id: marks_by_title[title]
+            for question_id, title in missing.items() if title in marks_by_title
+        }
+
+    score = grade_answers(answers, paper, attempt.exam, fallback_marks)
+    StudentAnswer.objects.bulk_update(
+        answers, ['is_correct', 'marks_awarded', 'feedback'], batch_size=500
+    )
+    return score
+
+
+def finalize_attempt(attempt, status='COMPLETED', finish_time=None):
+    """
+    Close an attempt: flush any buffered autosaves, grade the answer sheet,
+    record score, status and finish time and queue the completion email.
+    The row is locked first; returns None without grading when it is no
+    longer STARTED (a concurrent finish, timeout or termination won).
+    """
+    from .answer_buffer import drain_attempt, write_behind_enabled  # answer_buffer imports this module
+
+    with transaction.atomic():
+        if not Attempt.objects.select_for_update().filter(pk=attempt.pk, status='STARTED').exists():
+            return None
+
+        # Autosaves may still be sitting in the write-behind buffer
+        if write_behind_enabled():
+            drain_attempt(attempt)
+
+        attempt.score = grade_attempt(attempt)
+        attempt.status = status
+        attempt.graded_at = timezone.now()
+        attempt.finish_time = finish_time or attempt.graded_at
+        attempt.save(update_fields=['score', 'status', 'finish_time', 'graded_at'])
+        # Committed (or rolled back) together with the status change
+        queue_completion_email(attempt)
+    # Students open their reviews as soon as results are out: build it now
+    materialize(attempt)
+    attempt_finished(attempt)
+    schedule_render(attempt)
+    return attempt
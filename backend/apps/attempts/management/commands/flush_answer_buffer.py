@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.attempts.answer_buffer import flush_pending, RedisAnswerBuffer
+from apps.core.periodic import run_periodically
+
+
+class Command(BaseCommand):
+    help = (
+        'Upserts buffered write-behind answer autosaves into StudentAnswer. '
+        'Run with --loop as the dedicated flusher when ANSWER_BUFFER_IN_PROCESS_FLUSHER=False.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ANSWER_BUFFER['FLUSH_BATCH'],
+            help='Attempts flushed per bulk upsert'
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep running as a periodic task')
+        parser.add_argument(
+            '--interval', type=float, default=settings.ANSWER_BUFFER['FLUSH_INTERVAL'],
+            help='Seconds between runs with --loop'
+        )
+
+    def handle(self, *args, **options):
+        buffer = RedisAnswerBuffer()
+        run_periodically('flush_answer_buffer', lambda: self.run_once(buffer, options), options)
+
+    def run_once(self, buffer, options):
+        started = time.monotonic()
+        attempts = answers = 0
+        while True:
+            flushed_attempts, flushed_answers = flush_pending(buffer, options['batch_size'])
+            if not flushed_attempts:
+                break
+            attempts += flushed_attempts
+            answers += flushed_answers
+        if attempts or not options['loop']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Flushed {answers} answers from {attempts} attempts in {time.monotonic() - started:.2f}s'
+            ))
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attempts.regrade import regrade_exam
+from apps.exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-scores every finished attempt of an exam against its current answer key "
+        "and negative marking. Use --dry-run to review the score changes first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', help='Exam UUID')
+        parser.add_argument('--dry-run', action='store_true', help='Report score changes without writing')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: REGRADE_WORKERS or CPU count)')
+        parser.add_argument('--shard-size', type=int, default=None, help='Attempts per worker task')
+        parser.add_argument('--show', type=int, default=20, help='Largest score changes to list')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            report = regrade_exam(
+                options['exam_id'],
+                dry_run=options['dry_run'],
+                workers=options['workers'],
+                shard_size=options['shard_size'],
+                report_limit=options['show'],
+            )
+        except (Exam.DoesNotExist, ValueError) as e:
+            raise CommandError(f'Exam not found: {e}')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for change in report['changes']:
+            self.stdout.write(
+                f"  {change['attempt_id']}: {change['old_score']:g} -> {change['new_score']:g}"
+            )
+        verb = 'Would change' if report['dry_run'] else 'Changed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['changed_attempts']} of {report['attempts']} attempts "
+            f"({report['changed_answers']} of {report['answers']} answers, "
+            f"mean delta {report['mean_delta']:+g}) in {report['elapsed_seconds']}s"
+        ))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.attempts.expiry import due, overdue, sweep_batch
+from apps.attempts.sessions import purge_unused
+from apps.core.periodic import run_periodically
+
+
+class Command(BaseCommand):
+    help = (
+        'Grades attempts that are still STARTED past their deadline and marks them TIMEOUT, '
+        'reporting throughput and lag. Also deletes prepared (PENDING) attempts that were never started.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Attempts finalized per batch')
+        parser.add_argument('--grace', type=float, default=30, help='Seconds past the deadline before sweeping')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the overdue backlog')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a periodic task')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        run_periodically('sweep_expired_attempts', lambda: self.run_once(options), options)
+
+    def run_once(self, options):
+        backlog = overdue(timezone.now(), options['grace'])
+        if options['dry_run']:
+            oldest = backlog.order_by('deadline').values_list('deadline', flat=True).first()
+            lag = (timezone.now() - oldest).total_seconds() if oldest else 0
+            waiting = backlog.count() - due(timezone.now(), options['grace']).count()
+            self.stdout.write(
+                f'{backlog.count()} overdue attempts (oldest {lag:.0f}s past deadline, '
+                f'{waiting} backing off after failures)'
+            )
+            return
+
+        swept = failed = 0
+        seconds = 0.0
+        max_lag = 0.0
+        while True:
+            result = sweep_batch(options['batch_size'], options['grace'])
+            swept += result['swept']
+            failed += result['failed']
+            seconds += result['seconds']
+            max_lag = max(max_lag, result['max_lag_seconds'])
+            if result['swept'] < options['batch_size']:
+                break
+
+        purged = purge_unused()
+        if purged:
+            self.stdout.write(f'Deleted {purged} prepared attempts that were never started')
+
+        if swept or not options['loop']:
+            rate = swept / seconds if seconds else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'Timed out {swept} attempts in {seconds:.2f}s ({rate:.0f}/s), '
+                f'max lag {max_lag:.0f}s, {failed} failed, {backlog.count()} still overdue'
+            ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0004_alter_studentanswer_marks_awarded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='paper',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
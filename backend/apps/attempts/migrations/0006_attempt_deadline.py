@@ -0,0 +1,22 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0005_attempt_paper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['status', 'deadline'], name='att_status_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:31
+
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def backfill_deadlines(apps, schema_editor):
+    """Only in-progress attempts need a deadline for the expiry sweeper"""
+    Attempt = apps.get_model('attempts', 'Attempt')
+    pending = Attempt.objects.filter(status='STARTED', deadline__isnull=True).select_related('exam')
+    batch = []
+    for attempt in pending.iterator(chunk_size=2000):
+        attempt.deadline = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+        batch.append(attempt)
+        if len(batch) >= 2000:
+            Attempt.objects.bulk_update(batch, ['deadline'])
+            batch = []
+    if batch:
+        Attempt.objects.bulk_update(batch, ['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0006_attempt_deadline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0007_backfill_attempt_deadline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProctoringEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('TAB_SWITCH', 'Tab switch'), ('FULLSCREEN_EXIT', 'Fullscreen exit'), ('COPY_PASTE', 'Copy/paste'), ('FOCUS_LOST', 'Window focus lost')], max_length=20)),
+                ('occurred_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField()),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proctoring_events', to='attempts.attempt')),
+            ],
+            options={
+                'db_table': 'att_proctoring_events',
+                'ordering': ['occurred_at'],
+                'indexes': [models.Index(fields=['attempt', 'occurred_at'], name='att_event_attempt_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0008_proctoring_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='review',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='review_stamp',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0009_attempt_review'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attempt',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('STARTED', 'Started'), ('COMPLETED', 'Completed'), ('TIMEOUT', 'Timeout')], default='STARTED', max_length=15),
+        ),
+    ]
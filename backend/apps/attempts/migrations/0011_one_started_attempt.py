@@ -0,0 +1,41 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:52
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def close_duplicate_attempts(apps, schema_editor):
+    """
+    Duplicate running attempts (from racing starts) would block the unique
+    index: keep the latest one per student and exam, time out the others.
+    """
+    Attempt = apps.get_model('attempts', 'Attempt')
+    duplicated = (
+        Attempt.objects.filter(status='STARTED')
+        .values('user_id', 'exam_id').annotate(n=Count('id')).filter(n__gt=1)
+    )
+    now = timezone.now()
+    for pair in duplicated.iterator():
+        attempts = Attempt.objects.filter(
+            status='STARTED', user_id=pair['user_id'], exam_id=pair['exam_id']
+        ).order_by('-start_time')
+        for attempt in attempts[1:]:
+            attempt.status = 'TIMEOUT'
+            attempt.finish_time = min(attempt.deadline or now, now)
+            attempt.save(update_fields=['status', 'finish_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0010_attempt_pending_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'STARTED')), fields=('user', 'exam'), name='att_one_started_per_exam'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0011_one_started_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='sync_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0012_attempt_sync_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='sweep_failures',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='sweep_retry_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
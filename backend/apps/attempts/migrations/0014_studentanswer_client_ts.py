@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0013_attempt_sweep_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentanswer',
+            name='client_ts',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
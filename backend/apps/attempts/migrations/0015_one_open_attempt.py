@@ -0,0 +1,44 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_pending(apps, schema_editor):
+    """
+    Racing session prepares could leave a student several prepared attempts,
+    or one next to a running attempt: keep the running one, else the latest
+    prepared one. PENDING rows were never started and hold no answers.
+    """
+    Attempt = apps.get_model('attempts', 'Attempt')
+    duplicated = (
+        Attempt.objects.filter(status__in=['PENDING', 'STARTED'])
+        .values('user_id', 'exam_id').annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for pair in duplicated.iterator():
+        attempts = list(Attempt.objects.filter(
+            status__in=['PENDING', 'STARTED'], user_id=pair['user_id'], exam_id=pair['exam_id']
+        ).order_by('-start_time'))
+        keep = next((a for a in attempts if a.status == 'STARTED'), attempts[0])
+        Attempt.objects.filter(
+            id__in=[a.id for a in attempts if a.id != keep.id], status='PENDING'
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0014_studentanswer_client_ts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='attempt',
+            name='att_one_started_per_exam',
+        ),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'STARTED'])), fields=('user', 'exam'), name='att_one_open_per_exam'),
+        ),
+    ]
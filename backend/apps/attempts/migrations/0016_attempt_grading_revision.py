@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0015_one_open_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='grading_revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:18
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_graded_at(apps, schema_editor):
+    """Finished attempts so far: finish_time is what calibration watermarks were taken from"""
+    Attempt = apps.get_model('attempts', 'Attempt')
+    Attempt.objects.filter(finish_time__isnull=False).exclude(status__in=['PENDING', 'STARTED']).update(
+        graded_at=F('finish_time')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attempts', '0016_attempt_grading_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_graded_at, migrations.RunPython.noop),
+    ]
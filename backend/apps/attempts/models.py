@@ -7,6 +7,8 @@ from apps.question_bank.models import Question, Choice
 
 class Attempt(models.Model):
     STATUS_CHOICES = [
+        # Pre-provisioned by prepare-session; flipped to STARTED by start_attempt
+        ('PENDING', 'Pending'),
         ('STARTED', 'Started'),
         ('COMPLETED', 'Completed'),
         ('TIMEOUT', 'Timeout')
@@ -17,6 +19,11 @@ class Attempt(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='attempts')
     start_time = models.DateTimeField(auto_now_add=True)
     finish_time = models.DateTimeField(null=True, blank=True)
+    # When finalize_attempt graded it; finish_time may be back-dated (expiry sweep,
+    # offline sync). Item calibration reads attempts incrementally by this
+    graded_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+    # start_time + exam duration, fixed at start; the expiry sweeper scans (status, deadline)
+    deadline = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='STARTED')
     score = models.FloatField(default=0.0)
     
@@ -24,10 +31,35 @@ class Attempt(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     device_info = models.TextField(null=True, blank=True)
     violation_count = models.IntegerField(default=0)
+
+    # Compressed snapshot of the exam paper taken at start (see paper.py)
+    paper = models.BinaryField(null=True, blank=True, editable=False)
+    # Compressed review document built when the attempt finishes (see review.py);
+    # stamped with the grading_revision it was built against
+    review = models.BinaryField(null=True, blank=True, editable=False)
+    review_stamp = models.BigIntegerField(null=True, blank=True, editable=False)
+    # Bumped whenever regrade_exam re-scores the attempt's exam
+    grading_revision = models.PositiveIntegerField(default=0, editable=False)
+    # Expiry sweeper backoff for attempts that failed to time out (see expiry.py)
+    sweep_failures = models.PositiveSmallIntegerField(default=0, editable=False)
+    sweep_retry_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Highest offline-log sequence number applied (see sync.py)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'att_attempts'
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['status', 'deadline'], name='att_status_deadline_idx'),
+        ]
+        constraints = [
+            # Concurrent starts and session prepares (double clicks, retries) cannot
+            # open a second prepared or running attempt
+            models.UniqueConstraint(
+                fields=['user', 'exam'], condition=models.Q(status__in=['PENDING', 'STARTED']),
+                name='att_one_open_per_exam',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.exam.title} ({self.status})"
@@ -36,6 +68,8 @@ class Attempt(models.Model):
     def is_active(self):
         if self.status != 'STARTED':
             return False
+        if self.deadline:
+            return timezone.now() < self.deadline
         if not self.start_time:
             return True # Just created
         # Calculate if time is up
@@ -53,6 +87,8 @@ class StudentAnswer(models.Model):
     feedback = models.TextField(null=True, blank=True) # AI or Instructor feedback
     is_correct = models.BooleanField(default=False)
     marks_awarded = models.FloatField(default=0.0)
+    # Client clock (Unix seconds) when the answer was given; an older save never replaces it
+    client_ts = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -61,3 +97,31 @@ class StudentAnswer(models.Model):
 
     def __str__(self):
         return f"Ans: {self.question.title} by {self.attempt.user.username}"
+
+
+class ProctoringEvent(models.Model):
+    """Append-only log of client-reported proctoring events (written in batches)"""
+    EVENT_TYPES = [
+        ('TAB_SWITCH', 'Tab switch'),
+        ('FULLSCREEN_EXIT', 'Fullscreen exit'),
+        ('COPY_PASTE', 'Copy/paste'),
+        ('FOCUS_LOST', 'Window focus lost'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='proctoring_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    # Client clock when the event happened; received_at is the server clock
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField()
+    details = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = 'att_proctoring_events'
+        ordering = ['occurred_at']
+        indexes = [
+            models.Index(fields=['attempt', 'occurred_at'], name='att_event_attempt_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.attempt_id})"
@@ -0,0 +1,178 @@
+"""
+Live exam monitoring
+Attempt state changes (start, answers, violations, finish) are published
+as small JSON deltas on a per-exam channel of a dedicated message bus.
+The monitoring stream endpoint subscribes to its exam's channel and
+pushes Server-Sent Events: a snapshot of the active attempts on connect
+and every SNAPSHOT_INTERVAL seconds, and the deltas in between. Work
+scales with the number of state changes instead of pollers x students.
+
+Deltas are best effort: a stream that falls behind or a bus reconnect
+is repaired by the next snapshot.
+"""
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count
+from rest_framework.renderers import BaseRenderer
+
+from apps.core.pubsub import get_bus
+from .models import Attempt
+
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets text/event-stream requests through content negotiation (errors render as JSON)"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def get_monitor_bus():
+    return get_bus(settings.MONITORING['CHANNEL_PREFIX'])
+
+
+def channel(exam_id):
+    return f'exam:{exam_id}'
+
+
+def publish(exam_id, event, **fields):
+    """Publish a delta for an exam once the current transaction commits"""
+    if not settings.MONITORING['ENABLED']:
+        return
+    message = json.dumps(dict(fields, event=event), cls=DjangoJSONEncoder)
+    transaction.on_commit(lambda: get_monitor_bus().publish(channel(exam_id), message))
+
+
+def attempt_started(attempt):
+    publish(
+        attempt.exam_id, 'start', attempt_id=attempt.id, username=attempt.user.username,
+        start_time=attempt.start_time, deadline=attempt.deadline,
+    )
+
+
+def answers_saved(attempt, question_ids):
+    publish(attempt.exam_id, 'answer', attempt_id=attempt.id, question_ids=[str(q) for q in question_ids])
+
+
+def violation_recorded(attempt):
+    publish(attempt.exam_id, 'violation', attempt_id=attempt.id, violation_count=attempt.violation_count)
+
+
+def attempt_finished(attempt):
+    publish(attempt.exam_id, 'finish', attempt_id=attempt.id, status=attempt.status, score=attempt.score)
+
+
+def build_snapshot(exam):
+    """Active attempts of an exam in one query"""
+    students = list(
+        Attempt.objects.filter(exam=exam, status='STARTED')
+        .annotate(answered=Count('answers'))
+        .values(
+            'id', 'user__username', 'start_time', 'deadline', 'status', 'score',
+            'violation_count', 'answered',
+        )
+        .order_by('start_time')
+    )
+    for student in students:
+        student['username'] = student.pop('user__username')
+    return {
+        'exam_title': exam.title,
+        'active_count': len(students),
+        'students': students,
+    }
+
+
+def snapshot(exam):
+    """build_snapshot, shared for a couple of seconds by every poller and stream of the exam"""
+    return cache.get_or_set(
+        f'monitor_snapshot:{exam.id}', lambda: build_snapshot(exam),
+        settings.MONITORING['SNAPSHOT_CACHE_TIMEOUT'],
+    )
+
+
+def _acquire_stream():
+    global _streams
+    with _streams_lock:
+        if _streams >= settings.MONITORING['MAX_STREAMS']:
+            return False
+        _streams += 1
+        return True
+
+
+def _release_stream():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def open_stream(exam):
+    """
+    SSE iterator for an exam, or None when this process already serves
+    MAX_STREAMS. The stream's slot and subscription are released when it
+    ends or is closed because the client went away.
+    """
+    if not _acquire_stream():
+        return None
+    stream = _event_stream(exam)
+    # Run up to the first yield so that closing the generator reaches its finally
+    next(stream)
+    return stream
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {data}\n\n'
+
+
+def _event_stream(exam):
+    config = settings.MONITORING
+    pending = queue.Queue(maxsize=config['QUEUE_SIZE'])
+    overflowed = threading.Event()
+
+    def on_message(message):
+        try:
+            pending.put_nowait(message)
+        except queue.Full:
+            overflowed.set()
+
+    unsubscribe = None
+    try:
+        unsubscribe = get_monitor_bus().subscribe(channel(exam.id), on_message)
+        yield ''
+        started = last_snapshot = time.monotonic()
+        yield f'retry: {int(config["HEARTBEAT"] * 1000)}\n\n'
+        yield _sse('snapshot', json.dumps(snapshot(exam), cls=DjangoJSONEncoder))
+        while time.monotonic() - started < config['MAX_DURATION']:
+            try:
+                messages = [pending.get(timeout=config['HEARTBEAT'])]
+            except queue.Empty:
+                messages = []
+            # Everything that queued up meanwhile goes out in one write
+            while True:
+                try:
+                    messages.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            if overflowed.is_set() or time.monotonic() - last_snapshot >= config['SNAPSHOT_INTERVAL']:
+                overflowed.clear()
+                last_snapshot = time.monotonic()
+                yield _sse('snapshot', json.dumps(snapshot(exam), cls=DjangoJSONEncoder))
+            elif messages:
+                yield _sse('delta', '[' + ','.join(messages) + ']')
+            else:
+                yield ': keep-alive\n\n'
+    finally:
+        if unsubscribe:
+            unsubscribe()
+        _release_stream()
@@ -0,0 +1,21 @@
+"""
+Attempt notifications
+Completion emails go through the transactional outbox (apps.core.outbox):
+queued with the status change, delivered by send_outbox, at most once per
+attempt.
+"""
+from apps.core.outbox import enqueue
+
+
+def queue_completion_email(attempt):
+    if attempt.status != 'COMPLETED':
+        return
+    user = attempt.user
+    exam = attempt.exam
+    enqueue(
+        f'attempt-completed:{attempt.id}',
+        user.email,
+        f"Exam Completed: {exam.title}",
+        f"Hello {user.username},\n\nYou have successfully completed the exam '{exam.title}'.\n"
+        f"Your score: {attempt.score}\n\nThank you for using Exam Platform.",
+    )
@@ -0,0 +1,166 @@
+"""
+Frozen exam paper per attempt
+start_attempt snapshots the exam's questions (order, marks, type,
+difficulty and correct-choice map) into Attempt.paper as zlib-compressed
+JSON. Answering, grading, review and resume read the snapshot instead of
+the live ExamQuestion/Choice rows, so edits and re-versioning during an
+exam cannot change how a started attempt is scored.
+
+attempt_paper() returns the answer-key shape used by grading:
+    {question_id: {'order', 'type', 'difficulty', 'marks', 'choices': {choice_id: is_correct}}}
+
+The student-facing questions are rendered to JSON once per exam (one
+fragment per question, cached in the exam's namespace) and assembled per
+attempt; shuffled exams apply a permutation seeded by the attempt id, so
+a refresh returns the same bytes and the same ETag.
+"""
+import hashlib
+import json
+import random
+import zlib
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.cache import exam_namespace, get_or_build, question_namespace
+from apps.exams.models import ExamQuestion
+from apps.question_bank.models import Question
+from .grading import exam_answer_key
+
+PAPER_FORMAT = 1
+# The snapshot never changes, so the cached copy only needs to outlive the exam
+PAPER_CACHE_TIMEOUT = 6 * 3600
+
+
+def _cache_key(attempt_id):
+    return f'attempt_paper:{attempt_id}'
+
+
+def encode_paper(answer_key):
+    """Compact positional encoding: [id, marks, type, difficulty, [correct choice ids], [other choice ids]]"""
+    rows = sorted(answer_key.items(), key=lambda item: item[1]['order'])
+    questions = [
+        [
+            question_id, entry['marks'], entry['type'], entry['difficulty'],
+            [c for c, correct in entry['choices'].items() if correct],
+            [c for c, correct in entry['choices'].items() if not correct],
+        ]
+        for question_id, entry in rows
+    ]
+    payload = json.dumps({'v': PAPER_FORMAT, 'q': questions}, separators=(',', ':'))
+    return zlib.compress(payload.encode(), 9)
+
+
+def decode_paper(blob):
+    data = json.loads(zlib.decompress(bytes(blob)))
+    paper = {}
+    for order, (question_id, marks, question_type, difficulty, correct, other) in enumerate(data['q']):
+        choices = dict.fromkeys(other, False)
+        choices.update(dict.fromkeys(correct, True))
+        paper[question_id] = {
+            'order': order,
+            'type': question_type,
+            'difficulty': difficulty,
+            'marks': marks,
+            'choices': choices,
+        }
+    return paper
+
+
+def freeze_paper(exam_id):
+    """Blob for a new attempt, built from the exam's cached answer key"""
+    return encode_paper(exam_answer_key(exam_id))
+
+
+def attempt_paper(attempt):
+    """
+    The attempt's frozen paper. Served from cache; the blob column is
+    only read on a miss. Attempts started before snapshots existed fall
+    back to the exam's current answer key.
+    """
+    paper = cache.get(_cache_key(attempt.id))
+    if paper is not None:
+        return paper
+    if attempt.paper is None:
+        return exam_answer_key(attempt.exam_id)
+    paper = decode_paper(attempt.paper)
+    cache.set(_cache_key(attempt.id), paper, PAPER_CACHE_TIMEOUT)
+    return paper
+
+
+def cache_papers(attempt_ids, paper):
+    """Warm the paper cache for attempts sharing one snapshot (pre-provisioned sessions)"""
+    cache.set_many({_cache_key(attempt_id): paper for attempt_id in attempt_ids}, PAPER_CACHE_TIMEOUT)
+
+
+def answer_error(entry, c_id):
+    """(detail, status) when an answer does not fit its paper entry, else None"""
+    if entry is None:
+        return 'Question not found', status.HTTP_404_NOT_FOUND
+    if entry['type'] != 'DESCRIPTIVE':
+        # MCQ or TF
+        if not c_id:
+            return 'Choice ID required for this question type', status.HTTP_400_BAD_REQUEST
+        if str(c_id) not in entry['choices']:
+            return 'Invalid choice for this question', status.HTTP_400_BAD_REQUEST
+    return None
+
+
+def stored_answer(entry, c_id, a_text, ts):
+    """The {'choice', 'text', 'ts'} form kept by the answer buffer and write_answers (ts: client clock or None)"""
+    return {
+        'choice': str(c_id) if c_id and entry['type'] != 'DESCRIPTIVE' else None,
+        'text': a_text if entry['type'] == 'DESCRIPTIVE' else None,
+        'ts': ts,
+    }
+
+
+def ordered_question_ids(paper):
+    return sorted(paper, key=lambda question_id: paper[question_id]['order'])
+
+
+def render_questions(question_ids):
+    """{question_id: JSON bytes} for the student view of each question (no answers)"""
+    from .serializers import StudentQuestionSerializer
+    renderer = JSONRenderer()
+    return {
+        str(question.id): renderer.render(StudentQuestionSerializer(question).data)
+        for question in Question.objects.filter(id__in=list(question_ids)).prefetch_related('choices')
+    }
+
+
+def exam_fragments(exam_id):
+    """Rendered questions of the exam; rebuilt when its questions or choices change"""
+    return get_or_build(
+        exam_namespace(exam_id), ['student_paper'],
+        lambda: render_questions(
+            ExamQuestion.objects.filter(exam_id=exam_id).values_list('question_id', flat=True)
+        ),
+    )
+
+
+def presented_order(attempt, paper):
+    """Question ids in the order this attempt shows them"""
+    order = ordered_question_ids(paper)
+    if attempt.exam.shuffle_questions:
+        random.Random(str(attempt.id)).shuffle(order)
+    return order
+
+
+def rendered_paper(attempt):
+    """(JSON bytes of the attempt's question list, ETag)"""
+    paper = attempt_paper(attempt)
+    order = presented_order(attempt, paper)
+    fragments = exam_fragments(attempt.exam_id)
+    missing = [question_id for question_id in order if question_id not in fragments]
+    if missing:
+        # Questions since re-versioned out of the exam are still on this attempt's paper
+        fragments = dict(fragments)
+        for question_id in missing:
+            fragments.update(get_or_build(
+                question_namespace(question_id), ['student_fragment'],
+                lambda: render_questions([question_id]),
+            ))
+    body = b'[' + b','.join(fragments[q] for q in order if q in fragments) + b']'
+    return body, '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
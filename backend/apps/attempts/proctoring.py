@@ -0,0 +1,94 @@
+"""
+Proctoring event ingest
+Clients batch proctoring events (tab switch, fullscreen exit, copy/paste)
+into one request. The attempt's violation counter is bumped with a single
+UPDATE ... SET violation_count = violation_count + n, so concurrent
+requests cannot lose increments and no post_save signal fires. The event
+rows themselves are queued on a BackgroundBatcher and bulk-inserted off
+the request path. The termination rule is checked against the counter.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core.batching import BackgroundBatcher
+from . import monitoring
+from .grading import finalize_attempt
+from .models import Attempt, ProctoringEvent
+
+
+def _write_events(rows):
+    ProctoringEvent.objects.bulk_create(rows, batch_size=settings.PROCTORING['FLUSH_BATCH'])
+
+
+event_writer = BackgroundBatcher(
+    'proctoring_events', _write_events,
+    interval=settings.PROCTORING['FLUSH_INTERVAL'],
+    max_batch=settings.PROCTORING['FLUSH_BATCH'],
+)
+
+
+def _occurred_at(client_ts, received_at):
+    if client_ts is None:
+        return received_at
+    try:
+        return datetime.fromtimestamp(client_ts, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return received_at
+
+
+def record_events(attempt, events):
+    """
+    Count and log a batch of validated events ({'type', 'client_ts', 'details'})
+    for a running attempt. Returns (violation_count, terminated); the count
+    is None when the attempt was no longer running.
+    """
+    config = settings.PROCTORING
+    now = timezone.now()
+    violations = sum(1 for event in events if event['type'] in config['VIOLATION_EVENTS'])
+
+    count = attempt.violation_count
+    if violations:
+        updated = Attempt.objects.filter(pk=attempt.pk, status='STARTED').update(
+            violation_count=F('violation_count') + violations
+        )
+        if not updated:
+            return None, False
+        count = Attempt.objects.filter(pk=attempt.pk).values_list('violation_count', flat=True).first()
+        attempt.violation_count = count
+        monitoring.violation_recorded(attempt)
+
+    for event in events:
+        event_writer.add(ProctoringEvent(
+            attempt_id=attempt.pk,
+            event_type=event['type'],
+            occurred_at=_occurred_at(event.get('client_ts'), now),
+            received_at=now,
+            details=event.get('details') or {},
+        ))
+
+    terminated = bool(violations) and count >= config['VIOLATION_LIMIT'] and terminate(attempt)
+    return count, terminated
+
+
+def terminate(attempt):
+    """
+    End an attempt over the violation limit. The row lock makes sure only
+    one of several concurrent event batches grades and closes it.
+    """
+    with transaction.atomic():
+        locked = (
+            Attempt.objects.select_for_update(of=('self',))
+            .select_related('exam')
+            .filter(pk=attempt.pk, status='STARTED')
+            .first()
+        )
+        if locked is None or finalize_attempt(locked) is None:
+            return False
+    attempt.status = locked.status
+    attempt.score = locked.score
+    attempt.finish_time = locked.finish_time
+    return True
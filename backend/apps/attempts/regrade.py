@@ -0,0 +1,300 @@
+"""
+Vectorized re-grading of a whole exam
+Used after an instructor fixes an answer key or changes negative marking.
+Finished attempts are split into shards; each shard's answer sheet is
+loaded as attempts x questions NumPy matrices (selected choice, word
+count, previous marks) and re-scored with array operations using the same
+rules as grading.grade_answers. Shards write back with chunked
+bulk_updates; the regrade_exam command runs them across a process pool,
+the HTTP endpoint one after another in the request (workers=1).
+
+Answers given to an older version of a re-versioned question are matched
+to the exam's current version by title, and their choices by text.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+
+from apps.exams.models import Exam
+from apps.question_bank.models import Choice, Question
+from .grading import build_answer_key
+from .models import Attempt, StudentAnswer
+from .paper import decode_paper, encode_paper
+from .review import invalidate_exam_reviews
+
+FINISHED_STATUSES = ['COMPLETED', 'TIMEOUT']
+
+
+def build_regrade_key(exam_id):
+    """
+    The exam's current answer key, extended with every older question
+    version its answers still point to.
+    """
+    key = build_answer_key(exam_id)
+    stale_ids = set(
+        StudentAnswer.objects.filter(attempt__exam_id=exam_id)
+        .exclude(question_id__in=list(key)).values_list('question_id', flat=True).distinct()
+    )
+    if not stale_ids:
+        return key
+
+    live_by_title = {}
+    for question_id, title in Question.objects.filter(id__in=list(key)).values_list('id', 'title'):
+        live_by_title[title] = str(question_id)
+    live_correct = {}
+    for question_id, text, is_correct in Choice.objects.filter(
+        question_id__in=list(key)
+    ).values_list('question_id', 'text', 'is_correct'):
+        live_correct[(str(question_id), text)] = is_correct
+
+    old_choices = {}
+    for choice_id, question_id, text, is_correct in Choice.objects.filter(
+        question_id__in=stale_ids
+    ).values_list('id', 'question_id', 'text', 'is_correct'):
+        old_choices.setdefault(str(question_id), []).append((str(choice_id), text, is_correct))
+
+    for question_id, title, question_type, difficulty in Question.objects.filter(
+        id__in=stale_ids
+    ).values_list('id', 'title', 'question_type', 'difficulty'):
+        question_id = str(question_id)
+        live_id = live_by_title.get(title)
+        key[question_id] = {
+            'order': key[live_id]['order'] if live_id else len(key),
+            'type': question_type,
+            'difficulty': difficulty,
+            # Same default as grade_attempt for questions no longer on the exam
+            'marks': key[live_id]['marks'] if live_id else 1,
+            'choices': {
+                choice_id: live_correct.get((live_id, text), is_correct)
+                for choice_id, text, is_correct in old_choices.get(question_id, [])
+            },
+        }
+    return key
+
+
+def _key_arrays(key, partial_scoring, negative_marking):
+    question_ids = list(key)
+    columns = {question_id: i for i, question_id in enumerate(question_ids)}
+    max_marks = np.array([key[q]['marks'] for q in question_ids], dtype=np.float64)
+    is_descriptive = np.array([key[q]['type'] == 'DESCRIPTIVE' for q in question_ids], dtype=bool)
+    correct_count = np.array([sum(key[q]['choices'].values()) for q in question_ids], dtype=np.float64)
+
+    choice_index = {}
+    choice_correct = []
+    for question_id in question_ids:
+        for choice_id, is_correct in key[question_id]['choices'].items():
+            choice_index[choice_id] = len(choice_correct)
+            choice_correct.append(is_correct)
+    # Sentinel for choices that are not on the key (always wrong)
+    unknown_choice = len(choice_correct)
+    choice_correct = np.array(choice_correct + [False], dtype=bool)
+
+    if 0 < negative_marking <= 1.0:
+        deduction = np.abs(max_marks * negative_marking)
+    else:
+        deduction = np.full_like(max_marks, abs(negative_marking))
+    if partial_scoring:
+        credit = np.where(correct_count > 1, max_marks / np.maximum(correct_count, 1), max_marks)
+    else:
+        credit = max_marks
+    return {
+        'columns': columns,
+        'choice_index': choice_index,
+        'unknown_choice': unknown_choice,
+        'choice_correct': choice_correct,
+        'max_marks': max_marks,
+        'is_descriptive': is_descriptive,
+        'deduction': deduction,
+        'credit': credit,
+    }
+
+
+def _db_keyed(mapping):
+    """Re-key a {uuid_str: value} dict by the value the database driver returns for a UUID"""
+    field = StudentAnswer._meta.pk
+    return {field.get_db_prep_value(k, connection): v for k, v in mapping.items()}
+
+
+def _load_sheet(attempt_ids, arrays):
+    """Answer matrices for a shard of attempts"""
+    rows = _db_keyed({attempt_id: i for i, attempt_id in enumerate(attempt_ids)})
+    columns = _db_keyed(arrays['columns'])
+    choice_index = _db_keyed(arrays['choice_index'])
+    shape = (len(attempt_ids), len(columns))
+    sheet = {
+        'choice': np.full(shape, -1, dtype=np.int64),
+        'words': np.zeros(shape, dtype=np.int64),
+        'answered': np.zeros(shape, dtype=bool),
+        'old_marks': np.zeros(shape, dtype=np.float64),
+        'old_correct': np.zeros(shape, dtype=bool),
+        'answer_row': np.full(shape, -1, dtype=np.int64),
+        'answer_ids': [],
+    }
+    answers = StudentAnswer.objects.filter(attempt_id__in=attempt_ids).values_list(
+        'id', 'attempt_id', 'question_id', 'selected_choice_id', 'answer_text', 'marks_awarded', 'is_correct'
+    )
+    # A raw cursor skips Django's per-value UUID converters, which otherwise
+    # dominate load time; ids stay in the driver's native form
+    sql, params = answers.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(5000)
+            if not batch:
+                break
+            for answer_id, attempt_id, question_id, choice_id, text, marks, is_correct in batch:
+                column = columns.get(question_id)
+                if column is None:
+                    continue
+                r = rows[attempt_id]
+                if choice_id:
+                    sheet['choice'][r, column] = choice_index.get(choice_id, arrays['unknown_choice'])
+                sheet['words'][r, column] = len(text.split()) if text else 0
+                sheet['answered'][r, column] = True
+                sheet['old_marks'][r, column] = marks
+                sheet['old_correct'][r, column] = is_correct
+                sheet['answer_row'][r, column] = len(sheet['answer_ids'])
+                sheet['answer_ids'].append(answer_id)
+    return sheet
+
+
+def score_sheet(sheet, arrays):
+    """(marks, is_correct) matrices, mirroring grading.grade_answers"""
+    max_marks = arrays['max_marks']
+    has_choice = sheet['choice'] >= 0
+    chosen_correct = has_choice & arrays['choice_correct'][np.where(has_choice, sheet['choice'], 0)]
+    choice_marks = np.where(chosen_correct, arrays['credit'], np.where(has_choice, -arrays['deduction'], 0.0))
+
+    words = sheet['words']
+    descriptive_marks = np.where(words > 50, max_marks, np.where(words > 10, max_marks * 0.5, 0.0))
+
+    marks = np.where(arrays['is_descriptive'], descriptive_marks, choice_marks)
+    correct = np.where(arrays['is_descriptive'], words > 50, chosen_correct)
+    return marks * sheet['answered'], correct & sheet['answered']
+
+
+def _regrade_shard(attempt_ids, old_scores, key, negative_marking, partial_scoring, dry_run, chunk_size):
+    arrays = _key_arrays(key, partial_scoring, negative_marking)
+    sheet = _load_sheet(attempt_ids, arrays)
+    marks, correct = score_sheet(sheet, arrays)
+    scores = marks.sum(axis=1)
+
+    changed_answers = sheet['answered'] & (
+        ~np.isclose(marks, sheet['old_marks']) | (correct != sheet['old_correct'])
+    )
+    old = np.array(old_scores, dtype=np.float64)
+    changed_attempts = np.flatnonzero(~np.isclose(scores, old))
+    changes = [(attempt_ids[i], float(old[i]), float(scores[i])) for i in changed_attempts]
+
+    if not dry_run:
+        r, c = np.nonzero(changed_answers)
+        answers = [
+            StudentAnswer(
+                id=sheet['answer_ids'][sheet['answer_row'][i, j]],
+                marks_awarded=float(marks[i, j]),
+                is_correct=bool(correct[i, j]),
+            )
+            for i, j in zip(r, c)
+        ]
+        attempts = [Attempt(id=attempt_id, score=new) for attempt_id, _, new in changes]
+        for start in range(0, len(answers), chunk_size):
+            with transaction.atomic():
+                StudentAnswer.objects.bulk_update(answers[start:start + chunk_size], ['marks_awarded', 'is_correct'])
+        for start in range(0, len(attempts), chunk_size):
+            with transaction.atomic():
+                Attempt.objects.bulk_update(attempts[start:start + chunk_size], ['score'])
+        _refreeze_papers(attempt_ids, key, chunk_size)
+
+    return {
+        'attempts': len(attempt_ids),
+        'answers': len(sheet['answer_ids']),
+        'changed_answers': int(changed_answers.sum()),
+        'changes': changes,
+    }
+
+
+def _refreeze_papers(attempt_ids, key, chunk_size):
+    """Point the attempts' frozen papers at the corrected key, keeping their question order"""
+    rewritten = {}
+    updates = []
+    for attempt_id, blob in Attempt.objects.filter(id__in=attempt_ids, paper__isnull=False).values_list('id', 'paper'):
+        blob = bytes(blob)
+        if blob not in rewritten:
+            paper = decode_paper(blob)
+            for question_id, entry in paper.items():
+                if question_id in key:
+                    entry['marks'] = key[question_id]['marks']
+                    entry['choices'] = key[question_id]['choices']
+            new_blob = encode_paper(paper)
+            rewritten[blob] = new_blob if new_blob != blob else None
+        if rewritten[blob] is not None:
+            updates.append(Attempt(id=attempt_id, paper=rewritten[blob]))
+    for start in range(0, len(updates), chunk_size):
+        Attempt.objects.bulk_update(updates[start:start + chunk_size], ['paper'])
+
+
+def _init_worker():
+    import django
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def regrade_exam(exam_id, dry_run=False, workers=None, shard_size=None, report_limit=50):
+    """
+    Re-score every finished attempt of an exam against its current key and
+    negative marking. Returns a report; with dry_run nothing is written.
+    """
+    started = time.monotonic()
+    workers = workers if workers is not None else (settings.REGRADE['WORKERS'] or os.cpu_count())
+    shard_size = shard_size or settings.REGRADE['SHARD_SIZE']
+    chunk_size = settings.REGRADE['WRITE_CHUNK']
+    exam = Exam.objects.get(id=exam_id)
+    key = build_regrade_key(exam.id)
+
+    finished = list(
+        Attempt.objects.filter(exam=exam, status__in=FINISHED_STATUSES)
+        .order_by('id').values_list('id', 'score')
+    )
+    shards = [
+        ([str(a) for a, _ in finished[i:i + shard_size]], [s for _, s in finished[i:i + shard_size]])
+        for i in range(0, len(finished), shard_size)
+    ]
+    args = (key, exam.negative_marking, exam.partial_scoring, dry_run, chunk_size)
+
+    if workers > 1 and len(shards) > 1:
+        # Children must not inherit this process's open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker) as pool:
+            results = list(pool.map(_regrade_shard, *zip(*[(ids, scores) + args for ids, scores in shards])))
+    else:
+        results = [_regrade_shard(ids, scores, *args) for ids, scores in shards]
+
+    if not dry_run:
+        # Drop cached copies of the re-frozen papers (done here so the parent's L1 is cleared too)
+        cache.delete_many([f'attempt_paper:{attempt_id}' for attempt_id, _ in finished])
+        # Stored reviews show the old marks and key
+        invalidate_exam_reviews(exam.id)
+
+    changes = [change for result in results for change in result['changes']]
+    deltas = [new - old for _, old, new in changes]
+    changes.sort(key=lambda change: abs(change[2] - change[1]), reverse=True)
+    return {
+        'exam_id': str(exam.id),
+        'dry_run': dry_run,
+        'attempts': sum(r['attempts'] for r in results),
+        'answers': sum(r['answers'] for r in results),
+        'changed_answers': sum(r['changed_answers'] for r in results),
+        'changed_attempts': len(changes),
+        'mean_delta': round(sum(deltas) / len(deltas), 4) if deltas else 0.0,
+        'changes': [
+            {'attempt_id': attempt_id, 'old_score': old, 'new_score': new}
+            for attempt_id, old, new in changes[:report_limit]
+        ],
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
@@ -0,0 +1,55 @@
+"""
+Materialized attempt reviews
+The review document (AttemptReviewSerializer output) is rendered once when
+an attempt finishes, in three queries (answers + questions, choices, and
+the paper on a cache miss), and stored zlib-compressed on the attempt.
+Serving it is then a single primary-key read.
+
+A stored review is stamped with the attempt's grading_revision, which
+regrade_exam bumps when it re-scores the exam, so the next read rebuilds
+the document. The review records the attempt as graded: later edits to
+the exam or its questions do not change it until the exam is re-graded.
+"""
+import zlib
+
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from .models import Attempt
+
+
+def render_review(attempt):
+    """JSON bytes of the review document"""
+    from .serializers import AttemptReviewSerializer
+    return JSONRenderer().render(AttemptReviewSerializer(attempt).data)
+
+
+def materialize(attempt):
+    """Render a finished attempt's review and store it; returns the JSON bytes"""
+    stamp = attempt.grading_revision
+    body = render_review(attempt)
+    blob = zlib.compress(body, 6)
+    # A re-grade that started after this attempt was loaded keeps its newer stamp
+    Attempt.objects.filter(pk=attempt.pk, grading_revision=stamp).update(review=blob, review_stamp=stamp)
+    attempt.review = blob
+    attempt.review_stamp = stamp
+    return body
+
+
+def review_document(attempt):
+    """
+    JSON bytes of the attempt's review: the stored copy when it is current,
+    otherwise rebuilt (and stored again once the attempt is finished).
+    """
+    if attempt.status == 'STARTED':
+        return render_review(attempt)
+    if attempt.review is not None and attempt.review_stamp == attempt.grading_revision:
+        return zlib.decompress(bytes(attempt.review))
+    return materialize(attempt)
+
+
+def invalidate_exam_reviews(exam_id):
+    """Mark every stored review of an exam stale (after scores or the frozen keys changed)"""
+    return Attempt.objects.filter(exam_id=exam_id).exclude(status__in=['PENDING', 'STARTED']).update(
+        grading_revision=F('grading_revision') + 1, review=None
+    )
@@ -1,10 +1,12 @@
 from rest_framework import serializers
-from .models import Attempt, StudentAnswer
-from apps.exams.models import Exam, ExamQuestion
+from django.conf import settings
+from .models import Attempt, ProctoringEvent, StudentAnswer
+from .paper import attempt_paper, rendered_paper
+from apps.exams.models import Exam
 from apps.question_bank.models import Question, Choice
 from apps.users.serializers import UserSerializer
 from django.utils import timezone
-import random
+import json
 
 class StudentChoiceSerializer(serializers.ModelSerializer):
     """Serializer for choices that hides is_correct field"""
@@ -32,13 +34,15 @@ class AttemptSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'exam', 'exam_title', 'start_time', 'finish_time', 
             'status', 'score', 'questions', 'is_active', 'seconds_remaining',
-            'violation_count', 'user_details'
+            'violation_count', 'sync_seq', 'user_details'
         ]
-        read_only_fields = ['id', 'start_time', 'finish_time', 'status', 'score', 'questions', 'violation_count']
+        read_only_fields = ['id', 'start_time', 'finish_time', 'status', 'score', 'questions', 'violation_count', 'sync_seq']
 
     def get_seconds_remaining(self, obj):
         if obj.status != 'STARTED':
             return 0
+        if obj.deadline:
+            return max(0, int((obj.deadline - timezone.now()).total_seconds()))
         limit_seconds = obj.exam.duration_minutes * 60
         if not obj.start_time:
             return limit_seconds
@@ -47,20 +51,53 @@ class AttemptSerializer(serializers.ModelSerializer):
         return max(0, remaining)
 
     def get_questions(self, obj):
-        # Return questions linked to the exam
-        # Ideally, we should order them as per ExamQuestion order
-        exam_questions = ExamQuestion.objects.filter(exam=obj.exam).select_related('question').order_by('order')
-        questions = [eq.question for eq in exam_questions]
-        
-        if obj.exam.shuffle_questions:
-            random.shuffle(questions)
-            
-        return StudentQuestionSerializer(questions, many=True).data
+        # The attempt's frozen questions, pre-rendered and in its (seeded) order
+        body, _ = rendered_paper(obj)
+        return json.loads(body)
 
 class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.UUIDField()
     selected_choice_id = serializers.UUIDField(required=False, allow_null=True)
     answer_text = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    # Client clock (Unix seconds) when the answer was given; an older save never replaces a newer one
+    client_ts = serializers.FloatField(required=False, allow_null=True)
+
+class SubmitAnswerItemSerializer(SubmitAnswerSerializer):
+    # One entry of a submit-answers batch
+    pass
+
+class SubmitAnswersSerializer(serializers.Serializer):
+    answers = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=500)
+
+class SyncLogSerializer(serializers.Serializer):
+    # Offline answer events: SubmitAnswerItemSerializer fields plus a sequence number;
+    # the answer fields are validated one event at a time when the log is applied
+    events = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_events(self, value):
+        limit = settings.OFFLINE_SYNC['MAX_EVENTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} events per request.')
+        for event in value:
+            seq = event.get('seq')
+            if isinstance(seq, bool) or not isinstance(seq, int) or seq < 1:
+                raise serializers.ValidationError('Every event needs an integer seq of at least 1.')
+        return value
+
+class ProctoringEventItemSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=[t for t, _ in ProctoringEvent.EVENT_TYPES])
+    # Client clock (Unix seconds) when the event happened
+    client_ts = serializers.FloatField(required=False, allow_null=True)
+    details = serializers.DictField(required=False)
+
+class ProctoringEventsSerializer(serializers.Serializer):
+    events = ProctoringEventItemSerializer(many=True, allow_empty=False)
+
+    def validate_events(self, value):
+        limit = settings.PROCTORING['MAX_EVENTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} events per request.')
+        return value
 
 # --- REVIEW SERIALIZERS ---
 class ReviewChoiceSerializer(serializers.ModelSerializer):
@@ -68,6 +105,14 @@ class ReviewChoiceSerializer(serializers.ModelSerializer):
         model = Choice
         fields = ['id', 'text', 'is_correct']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Show the key the attempt was graded against, not the live one
+        entry = self.context.get('paper', {}).get(str(instance.question_id))
+        if entry:
+            data['is_correct'] = entry['choices'].get(str(instance.id), data['is_correct'])
+        return data
+
 class ReviewQuestionSerializer(serializers.ModelSerializer):
     choices = ReviewChoiceSerializer(many=True, read_only=True)
     class Meta:
@@ -76,7 +121,7 @@ class ReviewQuestionSerializer(serializers.ModelSerializer):
 
 class StudentAnswerReviewSerializer(serializers.ModelSerializer):
     question = ReviewQuestionSerializer(read_only=True)
-    selected_choice_id = serializers.UUIDField(source='selected_choice.id', read_only=True)
+    selected_choice_id = serializers.UUIDField(read_only=True)
     
     class Meta:
         model = StudentAnswer
@@ -84,7 +129,7 @@ class StudentAnswerReviewSerializer(serializers.ModelSerializer):
 
 class AttemptReviewSerializer(serializers.ModelSerializer):
     exam_title = serializers.CharField(source='exam.title', read_only=True)
-    answers = StudentAnswerReviewSerializer(many=True, read_only=True)
+    answers = serializers.SerializerMethodField()
     
     class Meta:
         model = Attempt
@@ -92,3 +137,11 @@ class AttemptReviewSerializer(serializers.ModelSerializer):
             'id', 'exam', 'exam_title', 'start_time', 'finish_time', 
             'status', 'score', 'answers', 'violation_count'
         ]
+
+    def get_answers(self, obj):
+        paper = attempt_paper(obj)
+        answers = sorted(
+            obj.answers.select_related('question').prefetch_related('question__choices'),
+            key=lambda a: paper.get(str(a.question_id), {}).get('order', len(paper))
+        )
+        return StudentAnswerReviewSerializer(answers, many=True, context={**self.context, 'paper': paper}).data
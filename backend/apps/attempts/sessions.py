@@ -0,0 +1,125 @@
+"""
+Pre-provisioned exam sessions
+prepare_session() bulk-creates PENDING attempts, all sharing one frozen
+paper, for every rostered student ahead of a scheduled exam, and warms
+their paper cache. When the exam opens, start_attempt only has to flip the
+student's row to STARTED with a conditional UPDATE (start()) instead of
+inserting it: the start spike becomes cheap updates on existing rows, and
+the rendered questions in the start response are already cached. A
+student has at most one open (PENDING or STARTED) attempt per exam, which
+the att_one_open_per_exam partial unique index enforces.
+
+Attempts nobody started are deleted by purge_unused() (run by
+sweep_expired_attempts) once their exam has ended or been unpublished,
+or PENDING_MAX_AGE after they were prepared.
+"""
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.exams.models import Exam
+from apps.users.models import User
+from .models import Attempt
+from .paper import cache_papers, decode_paper, exam_fragments, freeze_paper
+
+CREATE_CHUNK = 1000
+# Attempts to create the rows when students start the exam concurrently
+PREPARE_RETRIES = 3
+PENDING_MAX_AGE = timedelta(days=7)
+
+
+def roster(user_ids=None, usernames=None):
+    """Active students to provision: the given ones, or all of them"""
+    users = User.objects.filter(is_active=True, role__name='STUDENT')
+    if user_ids or usernames:
+        users = users.filter(id__in=user_ids or []) | users.filter(username__in=usernames or [])
+    return users
+
+
+def prepare_session(exam, users):
+    """
+    Create PENDING attempts for users without a pending or running attempt
+    of the exam. Existing PENDING attempts get the current paper, so the
+    session can be prepared again after late question edits.
+    """
+    started = time.monotonic()
+    blob = freeze_paper(exam.id)
+    paper = decode_paper(blob)
+
+    user_ids = list(users.values_list('id', flat=True))
+    for retry in range(PREPARE_RETRIES):
+        try:
+            created, refreshed = _create_pending(exam, user_ids, blob)
+            break
+        except IntegrityError:
+            # A student opened an attempt between the check and the insert
+            if retry == PREPARE_RETRIES - 1:
+                raise
+
+    pending_ids = Attempt.objects.filter(exam=exam, status='PENDING').values_list('id', flat=True)
+    cache_papers(pending_ids, paper)
+    # The start responses embed the rendered questions: build them now too
+    exam_fragments(exam.id)
+    return {
+        'rostered': len(user_ids),
+        'created': created,
+        'refreshed': refreshed,
+        'skipped': len(user_ids) - created,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def _create_pending(exam, user_ids, blob):
+    """Insert PENDING attempts for the users without an open one; returns (created, refreshed)"""
+    with transaction.atomic():
+        # Serializes concurrent prepares of the same exam (double click, retry)
+        Exam.objects.select_for_update().get(pk=exam.pk)
+        open_attempts = set(
+            Attempt.objects.filter(exam=exam, status__in=['PENDING', 'STARTED'])
+            .values_list('user_id', flat=True)
+        )
+        new = [
+            Attempt(user_id=user_id, exam=exam, status='PENDING', paper=blob)
+            for user_id in user_ids if user_id not in open_attempts
+        ]
+        refreshed = Attempt.objects.filter(exam=exam, status='PENDING').update(paper=blob)
+        for offset in range(0, len(new), CREATE_CHUNK):
+            Attempt.objects.bulk_create(new[offset:offset + CREATE_CHUNK])
+    return len(new), refreshed
+
+
+def start(attempt, exam, ip_address=None, device_info=None):
+    """
+    Flip a PENDING attempt to STARTED. Returns False when another request
+    (a double click) got there first and the row is no longer PENDING.
+    """
+    now = timezone.now()
+    fields = {
+        'status': 'STARTED',
+        'start_time': now,
+        'deadline': now + timedelta(minutes=exam.duration_minutes),
+        'ip_address': ip_address,
+        'device_info': device_info,
+    }
+    if not Attempt.objects.filter(pk=attempt.pk, status='PENDING').update(**fields):
+        return False
+    for name, value in fields.items():
+        setattr(attempt, name, value)
+    return True
+
+
+def purge_unused(now=None):
+    """Delete PENDING attempts that can no longer be started; returns how many"""
+    now = now or timezone.now()
+    unused = Attempt.objects.filter(status='PENDING').filter(
+        Q(exam__end_time__lt=now) | ~Q(exam__status='PUBLISHED') | Q(start_time__lt=now - PENDING_MAX_AGE)
+    )
+    deleted = 0
+    while True:
+        ids = list(unused.values_list('id', flat=True)[:CREATE_CHUNK])
+        if not ids:
+            return deleted
+        deleted += Attempt.objects.filter(id__in=ids, status='PENDING').delete()[1].get('attempts.Attempt', 0)
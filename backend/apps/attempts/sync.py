@@ -0,0 +1,175 @@
+"""
+Offline sync for is_offline_capable exams
+While offline the client keeps an ordered log of answer events, numbered
+1, 2, 3, ... (seq) and stamped with the client clock (client_ts). On
+reconnect it uploads the log in chunks, optionally gzip-compressed
+(Content-Encoding: gzip), instead of replaying hundreds of autosaves.
+
+Attempt.sync_seq is the highest sequence number applied. A chunk is
+applied under the attempt's row lock: events at or below sync_seq are
+duplicates and skipped, the rest are applied in seq order up to the first
+gap, in the same transaction that advances sync_seq. The new sync_seq is
+returned as the acknowledgement, so a client resumes an interrupted upload
+from ack_seq + 1 (GET returns it too). Invalid events (unknown question,
+wrong choice, answered after the deadline) are acknowledged and reported
+rather than retried forever.
+
+Answers are written with the bulk upsert used by the write-behind flusher.
+The latest event per question in the log wins within the upload, and it
+replaces the stored answer only when it is not older (by client time)
+than that answer, so a newer online autosave survives a late upload of
+older offline work. Uploads are accepted for
+LATE_SYNC_SECONDS past the deadline, and the expiry sweeper waits as long
+for offline-capable exams.
+"""
+import gzip
+import io
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from . import adaptive, monitoring
+from .answer_buffer import write_answers
+from .models import Attempt
+from .paper import answer_error, attempt_paper, stored_answer
+from .serializers import SubmitAnswerItemSerializer
+
+
+class CompressedJSONParser(JSONParser):
+    """JSON body, optionally gzip-compressed, capped at MAX_BODY_BYTES once decompressed"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower() if request else ''
+        if encoding == 'gzip':
+            stream = gzip.GzipFile(fileobj=stream)
+        elif encoding not in ('', 'identity'):
+            raise ParseError(f'Unsupported Content-Encoding "{encoding}"')
+
+        limit = settings.OFFLINE_SYNC['MAX_BODY_BYTES']
+        try:
+            body = stream.read(limit + 1)
+        except (OSError, EOFError, zlib.error) as exc:
+            raise ParseError(f'Invalid compressed body - {exc}')
+        if len(body) > limit:
+            raise ParseError(f'Sync payload larger than {limit} bytes')
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+def sync_window_end(attempt):
+    """Last moment a log may be uploaded for the attempt (None: no deadline)"""
+    if attempt.deadline is None:
+        return None
+    return attempt.deadline + timedelta(seconds=settings.OFFLINE_SYNC['LATE_SYNC_SECONDS'])
+
+
+def accepts_sync(attempt, now=None):
+    if attempt.status != 'STARTED':
+        return False
+    window_end = sync_window_end(attempt)
+    return window_end is None or (now or timezone.now()) <= window_end
+
+
+def sync_state(attempt):
+    """Where a client should resume its upload"""
+    return {
+        'attempt_id': attempt.id,
+        'status': attempt.status,
+        'ack_seq': attempt.sync_seq,
+        'deadline': attempt.deadline,
+        'accepts_until': sync_window_end(attempt) if attempt.status == 'STARTED' else None,
+        'max_events': settings.OFFLINE_SYNC['MAX_EVENTS'],
+    }
+
+
+def _event_answer(event, paper, cutoff):
+    """(question_id, stored answer) for a valid event, or (None, rejection)"""
+    item = SubmitAnswerItemSerializer(data=event)
+    if not item.is_valid():
+        return None, {'errors': item.errors}
+    q_id = str(item.validated_data['question_id'])
+    c_id = item.validated_data.get('selected_choice_id')
+    entry = paper.get(q_id)
+    error = answer_error(entry, c_id)
+    if error:
+        return None, {'question_id': q_id, 'detail': error[0]}
+    # Client time only: the server clock is never compared with it
+    ts = item.validated_data.get('client_ts')
+    if cutoff is not None and ts is not None and ts > cutoff:
+        return None, {'question_id': q_id, 'detail': 'Answered after the deadline'}
+    return q_id, stored_answer(entry, c_id, item.validated_data.get('answer_text'), ts)
+
+
+def apply_log(attempt, events):
+    """
+    Apply one chunk of an attempt's offline log (events carry 'seq', in any
+    order). Returns the acknowledgement, or None when the attempt no longer
+    accepts uploads.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        locked = (
+            Attempt.objects.select_for_update(of=('self',))
+            .select_related('exam').defer('review')
+            .filter(pk=attempt.pk, status='STARTED').first()
+        )
+        if locked is None or not accepts_sync(locked, now):
+            return None
+
+        paper = attempt_paper(locked)
+        cutoff = None
+        if locked.deadline is not None:
+            cutoff = locked.deadline.timestamp() + settings.OFFLINE_SYNC['CLOCK_SKEW_SECONDS']
+
+        ack = locked.sync_seq
+        duplicates = applied = 0
+        missing_from = None
+        rejected = []
+        superseded = []
+        latest = {}
+        for event in sorted(events, key=lambda event: event['seq']):
+            seq = event['seq']
+            if seq <= ack:
+                duplicates += 1
+                continue
+            if seq != ack + 1:
+                # Everything past a gap waits until the missing events arrive
+                missing_from = ack + 1
+                break
+            ack = seq
+            q_id, answer = _event_answer(event, paper, cutoff)
+            if q_id is None:
+                rejected.append(dict(answer, seq=seq))
+                continue
+            # Log order decides: a later event for the question replaces an earlier one
+            latest[q_id] = answer
+            applied += 1
+
+        if latest:
+            # Buffered autosaves need no flushing first: whichever lands second keeps the newer answer
+            stale = set()
+            write_answers({str(locked.id): latest}, stale)
+            for _, q_id in stale:
+                superseded.append(q_id)
+                del latest[q_id]
+        if ack != locked.sync_seq:
+            Attempt.objects.filter(pk=locked.pk).update(sync_seq=ack)
+
+    attempt.sync_seq = ack
+    if latest:
+        if locked.exam.is_adaptive:
+            adaptive.mark_answered(locked, paper, latest)
+        monitoring.answers_saved(locked, latest)
+    return {
+        'ack_seq': ack,
+        'applied': applied,
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'superseded': superseded,
+        'missing_from': missing_from,
+    }
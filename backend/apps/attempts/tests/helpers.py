@@ -0,0 +1,96 @@
+"""
+Fixtures shared by the attempt tests
+The process-wide backends (rate limiter, answer buffer, adaptive state)
+are switched to their in-process implementations, so the tests run
+without Redis.
+"""
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.core import pubsub, throttling
+from apps.exams.models import Exam, ExamQuestion
+from apps.question_bank.models import Choice, Question, Subject, Topic
+from apps.users.models import Role, User
+from apps.attempts import adaptive, answer_buffer
+
+ANSWER_BUFFER = {
+    'MODE': 'write_through',
+    'BACKEND': 'memory',
+    'FLUSH_INTERVAL': 5,
+    'FLUSH_BATCH': 200,
+    'IN_PROCESS_FLUSHER': False,
+}
+
+
+def user(username, role='STUDENT'):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password='password123',
+        role=Role.objects.get_or_create(name=role)[0],
+    )
+
+
+def make_exam(questions=3, descriptive=False, **fields):
+    """A published exam of MCQs worth 2 marks each (plus a 4 mark descriptive one)"""
+    author = User.objects.filter(username='author').first() or user('author', 'INSTRUCTOR')
+    subject, _ = Subject.objects.get_or_create(name='Subject')
+    topic, _ = Topic.objects.get_or_create(name='Topic', subject=subject)
+    exam = Exam.objects.create(**{
+        'title': 'Exam', 'status': 'PUBLISHED', 'created_by': author, 'pass_marks': 1, **fields
+    })
+    items = []
+    for i in range(questions):
+        question = Question.objects.create(
+            title=f'Q{i}', question_text='?', question_type='MCQ', difficulty='MEDIUM',
+            subject=subject, topic=topic, created_by=author, status='PUBLISHED',
+        )
+        Choice.objects.create(question=question, text='right', is_correct=True)
+        Choice.objects.create(question=question, text='wrong', is_correct=False)
+        ExamQuestion.objects.create(exam=exam, question=question, marks=2, order=i)
+        items.append(question)
+    if descriptive:
+        question = Question.objects.create(
+            title='D', question_text='?', question_type='DESCRIPTIVE',
+            subject=subject, topic=topic, created_by=author, status='PUBLISHED',
+        )
+        ExamQuestion.objects.create(exam=exam, question=question, marks=4, order=questions)
+        items.append(question)
+    return exam, items
+
+
+def right(question):
+    return str(question.choices.get(is_correct=True).id)
+
+
+def wrong(question):
+    return str(question.choices.get(is_correct=False).id)
+
+
+@override_settings(
+    RATE_LIMIT_BACKEND='memory', MESSAGE_BUS='memory', ANSWER_BUFFER=ANSWER_BUFFER,
+    ADAPTIVE={
+        'SELECTOR': 'apps.attempts.adaptive.StepSelector',
+        'POOL_CACHE_ENTRIES': 100, 'POOL_CACHE_TTL': 60, 'STATE_BACKEND': 'memory',
+    },
+)
+class AttemptTestCase(TestCase):
+    """Student client plus fresh in-process backends for every test"""
+
+    def setUp(self):
+        throttling._limiter = None
+        pubsub._buses = {}
+        answer_buffer._buffer = None
+        adaptive._states = None
+        self.student = user('student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def start(self, exam):
+        response = self.client.post(f'/api/attempts/start/{exam.id}/')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return response.data['id']
+
+    def submit(self, attempt_id, question, choice, client_ts=None):
+        payload = {'question_id': str(question.id), 'selected_choice_id': choice}
+        if client_ts is not None:
+            payload['client_ts'] = client_ts
+        return self.client.post(f'/api/attempts/{attempt_id}/submit-answer/', payload, format='json')
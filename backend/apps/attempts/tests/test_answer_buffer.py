@@ -0,0 +1,132 @@
+import json
+import unittest
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from apps.attempts.answer_buffer import (
+    AnswerBufferUnavailable, LocalAnswerBuffer, PUT_SCRIPT, RedisAnswerBuffer, drain_attempt,
+    flush_pending, get_answer_buffer,
+)
+from apps.attempts.models import Attempt, StudentAnswer
+from .helpers import ANSWER_BUFFER, AttemptTestCase, make_exam, right, wrong
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def answer(choice, ts):
+    return {'choice': choice, 'text': None, 'ts': ts}
+
+
+class LocalAnswerBufferTests(TestCase):
+
+    def test_older_answer_does_not_replace_newer(self):
+        buffer = LocalAnswerBuffer()
+        self.assertTrue(buffer.put('a', 'q', answer('1', 200.0)))
+        self.assertFalse(buffer.put('a', 'q', answer('2', 100.0)))
+        self.assertEqual(buffer.peek('a'), {'q': answer('1', 200.0)})
+
+    def test_answers_without_client_time_apply_in_arrival_order(self):
+        buffer = LocalAnswerBuffer()
+        buffer.put('a', 'q', answer('1', 200.0))
+        self.assertTrue(buffer.put('a', 'q', answer('2', None)))
+        self.assertEqual(buffer.peek('a')['q']['choice'], '2')
+
+    def test_discard_keeps_answers_saved_meanwhile(self):
+        buffer = LocalAnswerBuffer()
+        buffer.put('a', 'q', answer('1', 1.0))
+        written = buffer.peek('a')
+        buffer.put('a', 'q', answer('2', 2.0))
+        buffer.discard('a', written)
+        self.assertEqual(buffer.peek('a'), {'q': answer('2', 2.0)})
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class RedisPutScriptTests(TestCase):
+    """PUT_SCRIPT is the compare-and-set behind RedisAnswerBuffer.put"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+
+    def put(self, question_id, value):
+        ts = '' if value['ts'] is None else repr(value['ts'])
+        return self.redis.eval(PUT_SCRIPT, 2, 'answers:a', 'answers:dirty', 'a', question_id, json.dumps(value), ts)
+
+    def test_keeps_newest_by_client_time(self):
+        self.assertEqual(self.put('q', answer('1', 200.0)), ['q'])
+        self.assertEqual(self.put('q', answer('2', 100.0)), [])
+        self.assertEqual(json.loads(self.redis.hget('answers:a', 'q'))['choice'], '1')
+        self.assertEqual(self.put('q', answer('3', 300.0)), ['q'])
+        self.assertEqual(json.loads(self.redis.hget('answers:a', 'q'))['choice'], '3')
+        self.assertEqual(self.redis.smembers('answers:dirty'), {'a'})
+
+
+class WriteBehindTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.questions = make_exam(2)
+        self.attempt_id = self.start(self.exam)
+
+    def stored(self, question):
+        return StudentAnswer.objects.get(attempt_id=self.attempt_id, question=question)
+
+    @override_settings(ANSWER_BUFFER=dict(ANSWER_BUFFER, MODE='write_behind'))
+    def test_late_autosave_with_older_client_time_is_superseded(self):
+        question = self.questions[0]
+        self.assertEqual(self.submit(self.attempt_id, question, right(question), 200).data['status'], 'saved')
+        self.assertEqual(self.submit(self.attempt_id, question, wrong(question), 100).data['status'], 'superseded')
+        flush_pending()
+        self.assertTrue(self.stored(question).is_correct)
+
+    @override_settings(ANSWER_BUFFER=dict(ANSWER_BUFFER, MODE='write_behind'))
+    def test_finish_grades_buffered_answers(self):
+        for question in self.questions:
+            self.submit(self.attempt_id, question, right(question))
+        self.assertFalse(StudentAnswer.objects.filter(attempt_id=self.attempt_id).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attempt.objects.get(pk=self.attempt_id).score, 4)
+        self.assertEqual(get_answer_buffer().peek(self.attempt_id), {})
+
+    @override_settings(ANSWER_BUFFER=dict(ANSWER_BUFFER, MODE='write_behind'))
+    def test_rolled_back_finish_keeps_buffered_answers(self):
+        question = self.questions[0]
+        self.submit(self.attempt_id, question, right(question))
+        attempt = Attempt.objects.get(pk=self.attempt_id)
+        with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                drain_attempt(attempt)
+                raise RuntimeError('grading failed')
+        self.assertIn(str(question.id), get_answer_buffer().peek(self.attempt_id))
+
+    @override_settings(ANSWER_BUFFER=dict(ANSWER_BUFFER, MODE='write_behind'))
+    def test_unavailable_buffer_fails_finish_without_closing_the_attempt(self):
+        self.submit(self.attempt_id, self.questions[0], right(self.questions[0]))
+        with mock.patch.object(LocalAnswerBuffer, 'peek', side_effect=AnswerBufferUnavailable):
+            response = self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(Attempt.objects.get(pk=self.attempt_id).status, 'STARTED')
+
+    def test_flush_does_not_write_to_finished_attempts(self):
+        question = self.questions[0]
+        buffer = get_answer_buffer()
+        self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        buffer.put(self.attempt_id, question.id, answer(right(question), None))
+        flush_pending(buffer)
+        self.assertFalse(StudentAnswer.objects.filter(attempt_id=self.attempt_id).exists())
+
+
+class RedisAnswerBufferFallbackTests(TestCase):
+
+    def test_put_reports_unavailable_redis(self):
+        buffer = RedisAnswerBuffer()
+        with mock.patch.object(buffer._breaker, 'call', side_effect=lambda func, fallback: fallback()):
+            self.assertIsNone(buffer.put('a', 'q', answer('1', 1.0)))
+            with self.assertRaises(AnswerBufferUnavailable):
+                buffer.peek('a')
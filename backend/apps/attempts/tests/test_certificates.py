@@ -0,0 +1,93 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+
+from apps.attempts import certificates
+from apps.attempts.models import Attempt
+from .helpers import AttemptTestCase, make_exam, right, user
+
+
+class SynchronousExecutor:
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class CertificateTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = override_settings(
+            CERTIFICATES={'ROOT': root, 'WORKERS': 1, 'RENDER_ON_COMPLETE': False}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.exam, self.questions = make_exam(2)
+        self.attempt_id = self.start(self.exam)
+        for question in self.questions:
+            self.submit(self.attempt_id, question, right(question))
+        self.url = f'/api/attempts/{self.attempt_id}/certificate/'
+
+    def finish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return Attempt.objects.select_related('user', 'exam').get(pk=self.attempt_id)
+
+    def test_same_fields_give_the_same_file_and_bytes(self):
+        fields = certificates.certificate_fields(self.finish())
+        path, key = certificates.ensure_certificate(fields)
+        with open(path, 'rb') as f:
+            first = f.read()
+        os.unlink(path)
+        self.assertEqual(certificates.ensure_certificate(fields), (path, key))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), first)
+        self.assertEqual(certificates.render_pdf(fields), first)
+
+    def test_new_score_addresses_a_new_certificate(self):
+        attempt = self.finish()
+        _, key = certificates.ensure_certificate(certificates.certificate_fields(attempt))
+        attempt.score -= 2
+        _, regraded = certificates.ensure_certificate(certificates.certificate_fields(attempt))
+        self.assertNotEqual(key, regraded)
+
+    def test_download_is_revalidated_by_etag(self):
+        self.finish()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unfinished_attempt_has_no_certificate(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_completion_renders_in_the_background(self):
+        with override_settings(CERTIFICATES=dict(settings.CERTIFICATES, RENDER_ON_COMPLETE=True)), \
+                mock.patch.object(certificates, '_get_executor', return_value=SynchronousExecutor()):
+            attempt = self.finish()
+        key = certificates.certificate_key(certificates.certificate_fields(attempt))
+        self.assertTrue(os.path.exists(certificates.certificate_path(key)))
+
+    def test_exam_download_zips_every_completed_attempt(self):
+        self.finish()
+        instructor = user('instructor', 'INSTRUCTOR')
+        self.client.force_authenticate(instructor)
+        response = self.client.get(f'/api/exams/{self.exam.id}/certificates/')
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'student_{self.attempt_id}.pdf'])
@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase
+
+from apps.attempts.answer_buffer import is_stale, write_answers
+from apps.attempts.models import StudentAnswer
+from .helpers import AttemptTestCase, make_exam, right, wrong
+
+
+class IsStaleTests(SimpleTestCase):
+
+    def test_only_client_times_are_compared(self):
+        self.assertTrue(is_stale(1.0, 2.0))
+        self.assertFalse(is_stale(2.0, 1.0))
+        self.assertFalse(is_stale(2.0, 2.0))
+        self.assertFalse(is_stale(None, 2.0))
+        self.assertFalse(is_stale(1.0, None))
+
+
+class ClientTimePrecedenceTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.questions = make_exam(2)
+        self.attempt_id = self.start(self.exam)
+        self.question = self.questions[0]
+
+    def stored(self, question=None):
+        return StudentAnswer.objects.get(attempt_id=self.attempt_id, question=question or self.question)
+
+    def batch(self, *answers):
+        response = self.client.post(
+            f'/api/attempts/{self.attempt_id}/submit-answers/', {'answers': list(answers)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return [result['status'] for result in response.data['results']]
+
+    def item(self, choice, client_ts=None, question=None):
+        return {
+            'question_id': str((question or self.question).id), 'selected_choice_id': choice,
+            'client_ts': client_ts,
+        }
+
+    def test_older_autosave_does_not_replace_newer(self):
+        self.assertEqual(self.submit(self.attempt_id, self.question, right(self.question), 200).data['status'], 'saved')
+        self.assertEqual(
+            self.submit(self.attempt_id, self.question, wrong(self.question), 100).data['status'], 'superseded'
+        )
+        answer = self.stored()
+        self.assertTrue(answer.is_correct)
+        self.assertEqual(answer.client_ts, 200)
+
+    def test_newer_autosave_replaces_older(self):
+        self.submit(self.attempt_id, self.question, wrong(self.question), 100)
+        self.submit(self.attempt_id, self.question, right(self.question), 200)
+        self.assertTrue(self.stored().is_correct)
+
+    def test_autosave_without_client_time_applies_in_arrival_order(self):
+        self.submit(self.attempt_id, self.question, right(self.question), 200)
+        self.submit(self.attempt_id, self.question, wrong(self.question))
+        self.assertFalse(self.stored().is_correct)
+
+    def test_batch_keeps_latest_client_time_per_question(self):
+        statuses = self.batch(
+            self.item(right(self.question), 300),
+            self.item(wrong(self.question), 100),
+            self.item(wrong(self.question), 200),
+        )
+        self.assertEqual(statuses, ['saved', 'superseded', 'superseded'])
+        self.assertTrue(self.stored().is_correct)
+
+    def test_batch_uses_list_order_without_client_times(self):
+        statuses = self.batch(self.item(right(self.question)), self.item(wrong(self.question)))
+        self.assertEqual(statuses, ['superseded', 'saved'])
+        self.assertFalse(self.stored().is_correct)
+
+    def test_batch_replay_older_than_stored_answer_is_superseded(self):
+        self.submit(self.attempt_id, self.question, right(self.question), 500)
+        other = self.questions[1]
+        statuses = self.batch(
+            self.item(wrong(self.question), 100),
+            self.item(right(other), 100, question=other),
+        )
+        self.assertEqual(statuses, ['superseded', 'saved'])
+        self.assertTrue(self.stored().is_correct)
+        self.assertTrue(self.stored(other).is_correct)
+
+    def test_write_answers_reports_stale_answers(self):
+        self.submit(self.attempt_id, self.question, right(self.question), 500)
+        stale = set()
+        written = write_answers(
+            {str(self.attempt_id): {str(self.question.id): {'choice': wrong(self.question), 'text': None, 'ts': 1.0}}},
+            stale,
+        )
+        self.assertEqual(written, 0)
+        self.assertEqual(stale, {(str(self.attempt_id), str(self.question.id))})
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from apps.attempts import expiry
+from apps.attempts.models import Attempt, StudentAnswer
+from .helpers import AttemptTestCase, make_exam, right
+
+
+class SweepTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.questions = make_exam(2)
+        self.attempt_id = self.start(self.exam)
+        self.submit(self.attempt_id, self.questions[0], right(self.questions[0]))
+        self.deadline = timezone.now() - timedelta(minutes=5)
+        Attempt.objects.filter(pk=self.attempt_id).update(deadline=self.deadline)
+
+    def test_overdue_attempt_is_graded_and_timed_out_at_its_deadline(self):
+        result = expiry.sweep_batch(10)
+        self.assertEqual((result['swept'], result['failed']), (1, 0))
+        attempt = Attempt.objects.get(pk=self.attempt_id)
+        self.assertEqual(attempt.status, 'TIMEOUT')
+        self.assertEqual(attempt.finish_time, self.deadline)
+        self.assertEqual(attempt.score, 2)
+        self.assertIsNotNone(attempt.graded_at)
+
+    def test_grace_period_leaves_recent_attempts_alone(self):
+        self.assertEqual(expiry.sweep_batch(10, grace_seconds=600)['swept'], 0)
+        self.assertEqual(Attempt.objects.get(pk=self.attempt_id).status, 'STARTED')
+
+    def test_failed_attempt_backs_off_exponentially(self):
+        with mock.patch.object(expiry, 'finalize_attempt', side_effect=RuntimeError('bad paper')), \
+                self.assertLogs('apps.attempts.expiry', 'ERROR'):
+            self.assertEqual(expiry.sweep_batch(10)['failed'], 1)
+        attempt = Attempt.objects.get(pk=self.attempt_id)
+        self.assertEqual(attempt.sweep_failures, 1)
+        self.assertEqual(attempt.status, 'STARTED')
+
+        now = timezone.now()
+        self.assertFalse(expiry.due(now).exists())
+        self.assertTrue(expiry.overdue(now).exists())
+        retry_in = (attempt.sweep_retry_at - now).total_seconds()
+        self.assertAlmostEqual(retry_in, expiry.RETRY_BASE_SECONDS, delta=5)
+
+        expiry._record_failure(attempt.id, now)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.sweep_failures, 2)
+        self.assertAlmostEqual(
+            (attempt.sweep_retry_at - now).total_seconds(), 2 * expiry.RETRY_BASE_SECONDS, delta=1
+        )
+
+    def test_backoff_is_capped(self):
+        Attempt.objects.filter(pk=self.attempt_id).update(sweep_failures=20)
+        now = timezone.now()
+        expiry._record_failure(self.attempt_id, now)
+        attempt = Attempt.objects.get(pk=self.attempt_id)
+        self.assertEqual((attempt.sweep_retry_at - now).total_seconds(), expiry.RETRY_MAX_SECONDS)
+
+    def test_attempt_is_retried_once_its_backoff_ends(self):
+        Attempt.objects.filter(pk=self.attempt_id).update(
+            sweep_failures=1, sweep_retry_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(expiry.sweep_batch(10)['swept'], 1)
+        self.assertEqual(Attempt.objects.get(pk=self.attempt_id).status, 'TIMEOUT')
+
+    def test_offline_capable_exams_wait_for_late_uploads(self):
+        self.exam.is_offline_capable = True
+        self.exam.save()
+        self.assertEqual(expiry.sweep_batch(10)['swept'], 0)
+        self.assertEqual(StudentAnswer.objects.filter(attempt_id=self.attempt_id).count(), 1)
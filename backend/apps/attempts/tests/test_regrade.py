@@ -0,0 +1,55 @@
+import json
+
+from apps.attempts.models import Attempt, StudentAnswer
+from apps.attempts.regrade import regrade_exam
+from .helpers import AttemptTestCase, make_exam, right, wrong
+
+
+class RegradeTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.questions = make_exam(2)
+        self.attempt_id = self.start(self.exam)
+        q0, q1 = self.questions
+        self.submit(self.attempt_id, q0, right(q0))
+        self.submit(self.attempt_id, q1, wrong(q1))
+        self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        self.assertEqual(self.attempt().score, 2)
+
+    def attempt(self):
+        return Attempt.objects.get(pk=self.attempt_id)
+
+    def fix_key(self):
+        # The "wrong" choice of the second question was the right one all along
+        for choice in self.questions[1].choices.all():
+            choice.is_correct = not choice.is_correct
+            choice.save()
+
+    def test_dry_run_reports_without_writing(self):
+        self.fix_key()
+        report = regrade_exam(self.exam.id, dry_run=True, workers=1)
+        self.assertEqual((report['changed_answers'], report['changed_attempts']), (1, 1))
+        self.assertEqual(report['changes'], [{'attempt_id': str(self.attempt_id), 'old_score': 2, 'new_score': 4}])
+        self.assertEqual(self.attempt().score, 2)
+
+    def test_regrade_rescores_answers_and_rebuilds_the_review(self):
+        review = self.client.get(f'/api/attempts/{self.attempt_id}/review/')
+        self.assertEqual(review.status_code, 200)
+        revision = self.attempt().grading_revision
+
+        self.fix_key()
+        report = regrade_exam(self.exam.id, workers=1)
+        self.assertEqual(report['mean_delta'], 2)
+        attempt = self.attempt()
+        self.assertEqual(attempt.score, 4)
+        self.assertGreater(attempt.grading_revision, revision)
+        answer = StudentAnswer.objects.get(attempt=attempt, question=self.questions[1])
+        self.assertEqual((answer.is_correct, answer.marks_awarded), (True, 2))
+
+        review = json.loads(self.client.get(f'/api/attempts/{self.attempt_id}/review/').content)
+        self.assertEqual(review['score'], 4)
+
+    def test_unchanged_key_changes_nothing(self):
+        report = regrade_exam(self.exam.id, workers=1)
+        self.assertEqual((report['attempts'], report['changed_answers'], report['changed_attempts']), (1, 0, 0))
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.attempts import sessions
+from apps.attempts.models import Attempt
+from apps.users.models import User
+from .helpers import AttemptTestCase, make_exam, user
+
+
+class PreparedSessionTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = user('other')
+        self.exam, self.questions = make_exam(2)
+        self.report = sessions.prepare_session(self.exam, sessions.roster())
+
+    def pending(self, user=None):
+        return Attempt.objects.filter(exam=self.exam, user=user or self.student, status='PENDING')
+
+    def test_prepare_creates_one_pending_attempt_per_student(self):
+        self.assertEqual((self.report['rostered'], self.report['created']), (2, 2))
+        self.assertEqual(Attempt.objects.filter(exam=self.exam, status='PENDING').count(), 2)
+
+        again = sessions.prepare_session(self.exam, User.objects.filter(role__name='STUDENT'))
+        self.assertEqual((again['created'], again['refreshed'], again['skipped']), (0, 2, 2))
+        self.assertEqual(Attempt.objects.filter(exam=self.exam).count(), 2)
+
+    def test_second_open_attempt_is_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attempt.objects.create(user=self.student, exam=self.exam, status='STARTED')
+
+    def test_finished_attempts_do_not_block_a_new_one(self):
+        self.pending().update(status='COMPLETED')
+        Attempt.objects.create(user=self.student, exam=self.exam, status='PENDING')
+        self.assertEqual(Attempt.objects.filter(exam=self.exam, user=self.student).count(), 2)
+
+    def test_start_flips_the_pending_attempt(self):
+        attempt_id = str(self.pending().get().id)
+        response = self.client.post(f'/api/attempts/start/{self.exam.id}/')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['id'], attempt_id)
+        attempt = Attempt.objects.get(pk=attempt_id)
+        self.assertEqual(attempt.status, 'STARTED')
+        self.assertIsNotNone(attempt.deadline)
+
+        response = self.client.post(f'/api/attempts/start/{self.exam.id}/')
+        self.assertEqual((response.status_code, response.data['id']), (200, attempt_id))
+        self.assertEqual(Attempt.objects.filter(exam=self.exam, user=self.student).count(), 1)
+
+    def test_start_loses_to_a_concurrent_start(self):
+        attempt = self.pending().get()
+        self.assertTrue(sessions.start(attempt, self.exam))
+        self.assertFalse(sessions.start(attempt, self.exam))
+
+    def test_pending_attempts_are_hidden(self):
+        attempt_id = str(self.pending().get().id)
+        self.assertEqual(self.client.get('/api/attempts/').data['results'], [])
+        self.assertEqual(self.client.get(f'/api/attempts/{attempt_id}/').status_code, 404)
+
+    def test_purge_keeps_attempts_that_can_still_be_started(self):
+        self.assertEqual(sessions.purge_unused(), 0)
+        self.assertEqual(self.pending().count(), 1)
+
+    def test_purge_deletes_attempts_of_ended_exams(self):
+        self.exam.end_time = timezone.now() - timedelta(minutes=1)
+        self.exam.save()
+        self.assertEqual(sessions.purge_unused(), 2)
+        self.assertFalse(Attempt.objects.filter(exam=self.exam).exists())
+
+    def test_purge_deletes_attempts_of_unpublished_exams_only_while_pending(self):
+        self.client.post(f'/api/attempts/start/{self.exam.id}/')
+        self.exam.status = 'DRAFT'
+        self.exam.save()
+        self.assertEqual(sessions.purge_unused(), 1)
+        self.assertEqual(Attempt.objects.get(exam=self.exam).status, 'STARTED')
+
+    def test_purge_deletes_stale_attempts(self):
+        self.pending().update(start_time=timezone.now() - sessions.PENDING_MAX_AGE - timedelta(hours=1))
+        self.assertEqual(sessions.purge_unused(), 1)
+        self.assertTrue(self.pending(self.other).exists())
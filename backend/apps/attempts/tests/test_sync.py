@@ -0,0 +1,102 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.attempts.models import Attempt, StudentAnswer
+from .helpers import AttemptTestCase, make_exam, right, wrong
+
+
+class OfflineSyncTests(AttemptTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.questions = make_exam(3, is_offline_capable=True)
+        self.attempt_id = self.start(self.exam)
+        self.url = f'/api/attempts/{self.attempt_id}/sync/'
+
+    def event(self, seq, question, choice, client_ts=None):
+        return {
+            'seq': seq, 'question_id': str(question.id), 'selected_choice_id': choice, 'client_ts': client_ts,
+        }
+
+    def upload(self, *events):
+        response = self.client.post(self.url, {'events': list(events)}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def stored(self, question):
+        return StudentAnswer.objects.get(attempt_id=self.attempt_id, question=question)
+
+    def test_chunks_are_acknowledged_and_replays_skipped(self):
+        q0, q1 = self.questions[:2]
+        result = self.upload(self.event(1, q0, right(q0)), self.event(2, q1, wrong(q1)))
+        self.assertEqual((result['ack_seq'], result['applied']), (2, 2))
+
+        result = self.upload(self.event(2, q1, wrong(q1)), self.event(3, q1, right(q1)))
+        self.assertEqual((result['ack_seq'], result['applied'], result['duplicates']), (3, 1, 1))
+        self.assertTrue(self.stored(q1).is_correct)
+        self.assertEqual(self.client.get(self.url).data['ack_seq'], 3)
+
+    def test_events_after_a_gap_wait_for_the_missing_ones(self):
+        q0 = self.questions[0]
+        result = self.upload(self.event(1, q0, wrong(q0)), self.event(3, q0, right(q0)))
+        self.assertEqual((result['ack_seq'], result['missing_from']), (1, 2))
+        self.assertFalse(self.stored(q0).is_correct)
+
+    def test_later_event_in_the_log_wins(self):
+        q0 = self.questions[0]
+        self.upload(self.event(1, q0, right(q0), 100), self.event(2, q0, wrong(q0), 200))
+        self.assertFalse(self.stored(q0).is_correct)
+
+    def test_newer_online_save_survives_an_older_offline_upload(self):
+        q0, q1 = self.questions[:2]
+        self.submit(self.attempt_id, q0, right(q0), 500)
+        result = self.upload(self.event(1, q0, wrong(q0), 100), self.event(2, q1, right(q1), 100))
+        self.assertEqual(result['superseded'], [str(q0.id)])
+        self.assertEqual(result['ack_seq'], 2)
+        self.assertTrue(self.stored(q0).is_correct)
+        self.assertTrue(self.stored(q1).is_correct)
+
+    def test_newer_offline_event_replaces_older_online_save(self):
+        q0 = self.questions[0]
+        self.submit(self.attempt_id, q0, wrong(q0), 100)
+        result = self.upload(self.event(1, q0, right(q0), 500))
+        self.assertEqual(result['superseded'], [])
+        self.assertTrue(self.stored(q0).is_correct)
+
+    def test_answers_given_after_the_deadline_are_rejected(self):
+        q0 = self.questions[0]
+        deadline = timezone.now() - timedelta(minutes=1)
+        Attempt.objects.filter(pk=self.attempt_id).update(deadline=deadline)
+        result = self.upload(
+            self.event(1, q0, right(q0), deadline.timestamp() - 10),
+            self.event(2, self.questions[1], right(self.questions[1]), deadline.timestamp() + 3600),
+        )
+        self.assertEqual((result['ack_seq'], result['applied']), (2, 1))
+        self.assertEqual([r['seq'] for r in result['rejected']], [2])
+
+    def test_gzip_body(self):
+        q0 = self.questions[0]
+        body = gzip.compress(json.dumps({'events': [self.event(1, q0, right(q0))]}).encode())
+        response = self.client.post(
+            self.url, body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['ack_seq'], 1)
+
+    def test_exam_must_allow_offline_answering(self):
+        exam, questions = make_exam(1, title='Online only')
+        attempt_id = self.start(exam)
+        response = self.client.post(
+            f'/api/attempts/{attempt_id}/sync/', {'events': [self.event(1, questions[0], right(questions[0]))]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_finished_attempt_no_longer_accepts_uploads(self):
+        self.client.post(f'/api/attempts/{self.attempt_id}/finish/')
+        q0 = self.questions[0]
+        response = self.client.post(self.url, {'events': [self.event(1, q0, right(q0))]}, format='json')
+        self.assertEqual(response.status_code, 400)
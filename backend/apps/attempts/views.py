@@ -1,11 +1,28 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from .models import Attempt, StudentAnswer
-from .serializers import AttemptSerializer, SubmitAnswerSerializer
-from apps.exams.models import Exam, ExamQuestion
-from apps.question_bank.models import Choice
+from .serializers import (
+    AttemptSerializer, ProctoringEventsSerializer, SubmitAnswerSerializer, SubmitAnswerItemSerializer,
+    SubmitAnswersSerializer, SyncLogSerializer
+)
+from apps.exams.models import Exam
+from apps.core.idempotency import idempotent
+from apps.core.throttling import ProctoringRateThrottle, SubmitAnswerRateThrottle
+from .answer_buffer import get_answer_buffer, is_stale, write_answers, write_behind_enabled
+from .certificates import certificate_fields, ensure_certificate
+from .review import review_document
+from .grading import evaluate_submission, finalize_attempt
+from . import adaptive, monitoring, proctoring, sessions
+from .sync import CompressedJSONParser, apply_log, sync_state
+from .paper import answer_error, attempt_paper, freeze_paper, rendered_paper, stored_answer
 
 class AttemptViewSet(viewsets.ModelViewSet):
     serializer_class = AttemptSerializer
@@ -13,45 +30,98 @@ class AttemptViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        # Pre-provisioned (PENDING) attempts have not been started: nobody sees them yet
+        attempts = Attempt.objects.exclude(status='PENDING').select_related('exam').defer('paper', 'review')
         # Admin and Instructors can see ALL attempts (for monitoring/results)
         if getattr(user, 'is_admin', False) or getattr(user, 'role_name', '').upper() == 'INSTRUCTOR':
-            return Attempt.objects.all()
+            return attempts
         # Students see only their own
-        return Attempt.objects.filter(user=user)
+        return attempts.filter(user=user)
 
     @action(detail=False, methods=['post'], url_path='start/(?P<exam_id>[^/.]+)')
+    @idempotent
     def start_attempt(self, request, exam_id=None):
-        try:
-            exam = Exam.objects.get(id=exam_id)
-        except Exam.DoesNotExist:
-            return Response({'detail': 'Exam not found'}, status=status.HTTP_404_NOT_FOUND)
+        # The student's open attempt (prepared or running; at most one), with the exam
+        open_attempts = list(
+            Attempt.objects.filter(user=request.user, exam_id=exam_id, status__in=['PENDING', 'STARTED'])
+            .select_related('exam').defer('paper', 'review')
+        )
+        existing_attempt = next((a for a in open_attempts if a.status == 'STARTED'), None)
+        pending_attempt = next((a for a in open_attempts if a.status == 'PENDING'), None)
+
+        if open_attempts:
+            exam = open_attempts[0].exam
+        else:
+            try:
+                exam = Exam.objects.get(id=exam_id)
+            except Exam.DoesNotExist:
+                return Response({'detail': 'Exam not found'}, status=status.HTTP_404_NOT_FOUND)
 
         if exam.status != 'PUBLISHED':
              return Response({'detail': 'Exam is not published'}, status=status.HTTP_403_FORBIDDEN)
 
         # Check existing active attempt
-        existing_attempt = Attempt.objects.filter(user=request.user, exam=exam, status='STARTED').first()
         if existing_attempt:
             # Check if time expired
             if not existing_attempt.is_active:
-                existing_attempt.status = 'TIMEOUT'
-                existing_attempt.finish_time = timezone.now()
-                existing_attempt.save()
+                finalize_attempt(existing_attempt, status='TIMEOUT', finish_time=existing_attempt.deadline)
             else:
                  return Response(AttemptSerializer(existing_attempt, context={'request': request}).data)
 
-        # Create attempt
-        attempt = Attempt.objects.create(
-            user=request.user,
-            exam=exam,
-            status='STARTED',
-            ip_address=request.META.get('REMOTE_ADDR'),
-            device_info=request.META.get('HTTP_USER_AGENT')
-        )
-        attempt.refresh_from_db()
+        ip_address = request.META.get('REMOTE_ADDR')
+        device_info = request.META.get('HTTP_USER_AGENT')
+
+        # Prepared session: the row and its paper already exist, just flip it
+        if pending_attempt:
+            return self._start_pending(request, exam, pending_attempt, ip_address, device_info)
+
+        # Create attempt; the partial unique index turns a racing duplicate into an IntegrityError
+        try:
+            with transaction.atomic():
+                attempt = Attempt.objects.create(
+                    user=request.user,
+                    exam=exam,
+                    status='STARTED',
+                    deadline=timezone.now() + timedelta(minutes=exam.duration_minutes),
+                    ip_address=ip_address,
+                    device_info=device_info,
+                    paper=freeze_paper(exam.id)
+                )
+        except IntegrityError:
+            # A concurrent start opened one first, or the session was prepared meanwhile
+            pending_attempt = (
+                Attempt.objects.filter(user=request.user, exam=exam, status='PENDING')
+                .defer('paper', 'review').first()
+            )
+            if pending_attempt:
+                return self._start_pending(request, exam, pending_attempt, ip_address, device_info)
+            return self._running_attempt(request, exam)
+        monitoring.attempt_started(attempt)
         return Response(AttemptSerializer(attempt, context={'request': request}).data, status=status.HTTP_201_CREATED)
 
-    @action(detail=True, methods=['post'], url_path='submit-answer')
+    def _start_pending(self, request, exam, attempt, ip_address, device_info):
+        attempt.user = request.user
+        attempt.exam = exam
+        if not sessions.start(attempt, exam, ip_address, device_info):
+            # A concurrent request (double click) started it first
+            return self._running_attempt(request, exam)
+        monitoring.attempt_started(attempt)
+        return Response(AttemptSerializer(attempt, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+    def _running_attempt(self, request, exam):
+        """The attempt a concurrent start request opened first"""
+        attempt = (
+            Attempt.objects.filter(user=request.user, exam=exam, status='STARTED')
+            .select_related('exam').defer('paper', 'review').first()
+        )
+        if attempt is None:
+            # It has already been finished again
+            return Response({'detail': 'Attempt already finished'}, status=status.HTTP_409_CONFLICT)
+        return Response(AttemptSerializer(attempt, context={'request': request}).data)
+
+    # Autosaves are frequent: their own generous scope instead of the daily user limit
+    @action(detail=True, methods=['post'], url_path='submit-answer', throttle_classes=[SubmitAnswerRateThrottle])
+    @idempotent
     def submit_answer(self, request, pk=None):
         attempt = self.get_object()
         
@@ -63,242 +133,262 @@ class AttemptViewSet(viewsets.ModelViewSet):
             q_id = serializer.validated_data['question_id']
             c_id = serializer.validated_data.get('selected_choice_id')
             a_text = serializer.validated_data.get('answer_text')
+            client_ts = serializer.validated_data.get('client_ts')
 
-            from apps.question_bank.models import Question
-            try:
-                question = Question.objects.get(id=q_id)
-            except Question.DoesNotExist:
-                return Response({'detail': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
+            if write_behind_enabled():
+                return self._buffer_answer(attempt, q_id, c_id, a_text, client_ts)
+
+            paper = attempt_paper(attempt)
+            entry = paper.get(str(q_id))
+            error = answer_error(entry, c_id)
+            if error:
+                return Response({'detail': error[0]}, status=error[1])
+
+            defaults = evaluate_submission(
+                entry['type'], entry['marks'],
+                entry['choices'][str(c_id)] if entry['type'] != 'DESCRIPTIVE' else None,
+                a_text, attempt.exam.negative_marking
+            )
+            if entry['type'] != 'DESCRIPTIVE':
+                defaults['selected_choice_id'] = c_id
+            defaults['client_ts'] = client_ts
+
+            # A late replay of an older save must not replace a newer answer
+            if client_ts is not None and StudentAnswer.objects.filter(
+                attempt=attempt, question_id=q_id, client_ts__gt=client_ts
+            ).exists():
+                return Response({'status': 'superseded'})
 
-            # Get max marks from ExamQuestion config
-            try:
-                eq = ExamQuestion.objects.get(exam=attempt.exam, question_id=q_id)
-                max_marks = eq.marks
-            except ExamQuestion.DoesNotExist:
-                max_marks = 1 
-
-            defaults = {}
-            if question.question_type == 'DESCRIPTIVE':
-                defaults['answer_text'] = a_text
-                # Mock NLP Evaluation: if text is long enough, give some marks
-                word_count = len(a_text.split()) if a_text else 0
-                if word_count > 50:
-                    defaults['marks_awarded'] = max_marks
-                    defaults['is_correct'] = True
-                    defaults['feedback'] = "Strong answer with sufficient detail. (AI Evaluated)"
-                elif word_count > 10:
-                    defaults['marks_awarded'] = int(max_marks * 0.5)
-                    defaults['is_correct'] = False
-                    defaults['feedback'] = "Average answer. More detail required. (AI Evaluated)"
-                else:
-                    defaults['marks_awarded'] = 0
-                    defaults['is_correct'] = False
-                    defaults['feedback'] = "Answer too short. (AI Evaluated)"
-            else:
-                # MCQ or TF
-                if not c_id:
-                     return Response({'detail': 'Choice ID required for this question type'}, status=status.HTTP_400_BAD_REQUEST)
-                try:
-                    choice = Choice.objects.get(id=c_id, question=question)
-                except Choice.DoesNotExist:
-                    return Response({'detail': 'Invalid choice for this question'}, status=status.HTTP_400_BAD_REQUEST)
-                
-                defaults['selected_choice'] = choice
-                defaults['is_correct'] = choice.is_correct
-                if choice.is_correct:
-                    defaults['marks_awarded'] = max_marks
-                else:
-                    # Apply negative marking if configured
-                    defaults['marks_awarded'] = -attempt.exam.negative_marking
-            
             StudentAnswer.objects.update_or_create(
                 attempt=attempt,
-                question=question,
+                question_id=q_id,
                 defaults=defaults
             )
+            monitoring.answers_saved(attempt, [q_id])
 
             response_data = {'status': 'saved'}
             
             # Adaptive Logic Placeholder: If adaptive, suggest next question
             if attempt.exam.is_adaptive:
-                # Basic Logic: If correct, pick a HARDER question. If wrong, pick an EASIER one.
-                # Find current difficulty
-                current_diff = question.difficulty
-                target_diff = current_diff
-                if defaults['is_correct']:
-                    if current_diff == 'EASY': target_diff = 'MEDIUM'
-                    elif current_diff == 'MEDIUM': target_diff = 'HARD'
-                else:
-                    if current_diff == 'HARD': target_diff = 'MEDIUM'
-                    elif current_diff == 'MEDIUM': target_diff = 'EASY'
-                
-                # Find a question in the exam with target_diff that hasn't been answered
-                answered_ids = attempt.answers.values_list('question_id', flat=True)
-                next_q = ExamQuestion.objects.filter(
-                    exam=attempt.exam, 
-                    question__difficulty=target_diff
-                ).exclude(question_id__in=answered_ids).first()
-                
+                next_q = adaptive.next_question(
+                    attempt, paper, q_id, defaults['is_correct'],
+                    lambda: attempt.answers.values_list('question_id', flat=True)
+                )
                 if next_q:
-                    response_data['next_question_id'] = str(next_q.question_id)
+                    response_data['next_question_id'] = next_q
             
             return Response(response_data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _buffer_answer(self, attempt, q_id, c_id, a_text, client_ts):
+        """Write-behind autosave: validate against the frozen paper and acknowledge"""
+        paper = attempt_paper(attempt)
+        entry = paper.get(str(q_id))
+        error = answer_error(entry, c_id)
+        if error:
+            return Response({'detail': error[0]}, status=error[1])
+
+        answer = stored_answer(entry, c_id, a_text, client_ts)
+        buffer = get_answer_buffer()
+        stored = buffer.put(attempt.id, q_id, answer)
+        if stored is None:
+            # Buffer unavailable: fall back to a synchronous write
+            stale = set()
+            write_answers({str(attempt.id): {str(q_id): answer}}, stale)
+            stored = not stale
+        if not stored:
+            # A newer answer (by client ts) is already saved for this question
+            return Response({'status': 'superseded'})
+        monitoring.answers_saved(attempt, [q_id])
+
+        response_data = {'status': 'saved'}
+        if attempt.exam.is_adaptive:
+            is_correct = bool(answer['choice'] and entry['choices'][answer['choice']])
+            next_q = adaptive.next_question(
+                attempt, paper, q_id, is_correct,
+                lambda: set(attempt.answers.values_list('question_id', flat=True)) | buffer.question_ids(attempt.id)
+            )
+            if next_q:
+                response_data['next_question_id'] = next_q
+        return Response(response_data)
+
+    # Offline replays: one request for many autosaves, same rate-limit scope
+    @action(detail=True, methods=['post'], url_path='submit-answers', throttle_classes=[SubmitAnswerRateThrottle])
+    def submit_answers(self, request, pk=None):
+        """Save a list of answers in one transaction; each item gets its own status"""
+        attempt = self.get_object()
+        if not attempt.is_active:
+             return Response({'detail': 'Attempt is no longer active'}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch = SubmitAnswersSerializer(data=request.data)
+        if not batch.is_valid():
+            return Response(batch.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        paper = attempt_paper(attempt)
+        results = []
+        latest = {}
+        for index, item in enumerate(batch.validated_data['answers']):
+            serializer = SubmitAnswerItemSerializer(data=item)
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+                continue
+            q_id = str(serializer.validated_data['question_id'])
+            c_id = serializer.validated_data.get('selected_choice_id')
+            entry = paper.get(q_id)
+            error = answer_error(entry, c_id)
+            if error:
+                results.append({'index': index, 'question_id': q_id, 'status': 'error', 'detail': error[0]})
+                continue
+            answer = stored_answer(
+                entry, c_id, serializer.validated_data.get('answer_text'),
+                serializer.validated_data.get('client_ts')
+            )
+            results.append({'index': index, 'question_id': q_id, 'status': 'saved'})
+            # A replay may hold several saves of one question: the latest client_ts wins
+            # (list order when either has none)
+            if q_id in latest:
+                if is_stale(answer['ts'], latest[q_id][1]['ts']):
+                    results[-1]['status'] = 'superseded'
+                    continue
+                results[latest[q_id][0]]['status'] = 'superseded'
+            latest[q_id] = (len(results) - 1, answer)
+
+        answers = {q_id: answer for q_id, (_, answer) in latest.items()}
+        if answers:
+            # Written through, not buffered: write_answers drops saves older than the stored
+            # answers, while a buffer entry would simply be overwritten
+            stale = set()
+            write_answers({str(attempt.id): answers}, stale)
+            for _, q_id in stale:
+                results[latest[q_id][0]]['status'] = 'superseded'
+                del answers[q_id]
+        if answers:
+            if attempt.exam.is_adaptive:
+                adaptive.mark_answered(attempt, paper, answers)
+            monitoring.answers_saved(attempt, answers)
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response({
+            'status': 'saved' if not failed else 'partial',
+            'saved': len(results) - failed,
+            'failed': failed,
+            'results': results,
+        })
+
+    # Offline-capable exams: the client's answer log, uploaded in resumable chunks
+    @action(
+        detail=True, methods=['get', 'post'],
+        parser_classes=[CompressedJSONParser], throttle_classes=[SubmitAnswerRateThrottle]
+    )
+    def sync(self, request, pk=None):
+        """GET: the acknowledged sequence number to resume from. POST: apply a chunk of the log"""
+        attempt = self.get_object()
+        if not attempt.exam.is_offline_capable:
+            return Response({'detail': 'Exam is not offline capable'}, status=status.HTTP_403_FORBIDDEN)
+        if request.method == 'GET':
+            return Response(sync_state(attempt))
+
+        serializer = SyncLogSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = apply_log(attempt, serializer.validated_data['events'])
+        if result is None:
+            return Response(
+                {'detail': 'Attempt no longer accepts sync', 'ack_seq': attempt.sync_seq},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(result)
+
+    @action(detail=True, methods=['get'])
+    def paper(self, request, pk=None):
+        """The attempt's questions as pre-rendered JSON; conditional GETs get a 304"""
+        attempt = self.get_object()
+        body, etag = rendered_paper(attempt)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=True, methods=['post'], url_path='record-violation')
     def record_violation(self, request, pk=None):
+        """Single tab-switch violation; kept for older clients, see events"""
         attempt = self.get_object()
         if attempt.status != 'STARTED':
             return Response({'detail': 'Attempt not active'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        attempt.violation_count += 1
-        # Optionally auto-submit if violations > limit (e.g., 3)
-        if attempt.violation_count >= 3:
-             attempt.status = 'COMPLETED'
-             attempt.finish_time = timezone.now()
-             attempt.save()
-             return Response({'status': 'terminated', 'detail': 'Violation limit exceeded'})
-             
-        attempt.save()
-        return Response({'status': 'logged', 'count': attempt.violation_count})
+
+        count, terminated = proctoring.record_events(attempt, [{'type': 'TAB_SWITCH'}])
+        if count is None:
+            return Response({'detail': 'Attempt not active'}, status=status.HTTP_400_BAD_REQUEST)
+        if terminated:
+            return Response({'status': 'terminated', 'detail': 'Violation limit exceeded'})
+        return Response({'status': 'logged', 'count': count})
+
+    @action(detail=True, methods=['post'], throttle_classes=[ProctoringRateThrottle])
+    def events(self, request, pk=None):
+        """Batch of proctoring events: counted atomically, logged asynchronously"""
+        attempt = self.get_object()
+        if attempt.status != 'STARTED':
+            return Response({'detail': 'Attempt not active'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ProctoringEventsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        count, terminated = proctoring.record_events(attempt, serializer.validated_data['events'])
+        if count is None:
+            return Response({'detail': 'Attempt not active'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'status': 'terminated' if terminated else 'logged',
+            'accepted': len(serializer.validated_data['events']),
+            'count': count,
+            'limit': settings.PROCTORING['VIOLATION_LIMIT'],
+        })
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def finish(self, request, pk=None):
         attempt = self.get_object()
         if attempt.status != 'STARTED':
              return Response({'detail': 'Attempt already finished'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # EVALUATE ALL ANSWERS AT SUBMISSION TIME
-        total_score = 0.0
-        
-        for student_answer in attempt.answers.all():
-            question = student_answer.question
-            
-            # Get max marks for this question
-            try:
-                eq = ExamQuestion.objects.get(exam=attempt.exam, question=question)
-                max_marks = eq.marks
-            except ExamQuestion.DoesNotExist:
-                # Fallback: If Question was versioned, ExamQuestion might point to a newer version.
-                # Try finding by title match (assuming title doesn't change on versioning)
-                eq = ExamQuestion.objects.filter(exam=attempt.exam, question__title=question.title).first()
-                if eq:
-                    max_marks = eq.marks
-                else:
-                    max_marks = 1 # Default if absolutely no record found
-
-            # Evaluate based on question type
-            if question.question_type == 'DESCRIPTIVE':
-                # Mock NLP Evaluation based on word count
-                word_count = len(student_answer.answer_text.split()) if student_answer.answer_text else 0
-                if word_count > 50:
-                    student_answer.marks_awarded = max_marks
-                    student_answer.is_correct = True
-                    student_answer.feedback = "Strong answer with sufficient detail. (AI Evaluated)"
-                elif word_count > 10:
-                    student_answer.marks_awarded = max_marks * 0.5
-                    student_answer.is_correct = False
-                    student_answer.feedback = "Average answer. More detail required. (AI Evaluated)"
-                else:
-                    student_answer.marks_awarded = 0.0
-                    student_answer.is_correct = False
-                    student_answer.feedback = "Answer too short. (AI Evaluated)"
-            else:
-                # MCQ or TF
-                if student_answer.selected_choice:
-                    student_answer.is_correct = student_answer.selected_choice.is_correct
-                    if student_answer.is_correct:
-                        student_answer.marks_awarded = max_marks
-                    else:
-                        # Apply negative marking (Proportional)
-                        # Assumes negative_marking is e.g. 0.25 for 25% deduction
-                        # If user inputs "1.0", it deducts full marks?
-                        # User request: "update negative as per stage of each question marks awarded"
-                        # We will interpret the entered value as a multiplier if < 1, or absolute if > 1?
-                        # Safer: Just use what the user entered. If they entered "0.25", we give -0.25?
-                        # User said: "update negative as per stage of each question marks"
-                        # This strongly suggests Percentage.
-                        # I will assume the config is a Multiplier (e.g. 0.25).
-                        # But wait, existing default is 0.0.
-                        # If user enters "1", do they mean -1 mark or -100%?
-                        # Given "like 3, 3... show 1", user uses integers.
-                        # Let's try: If negative_marking <= 1.0 and > 0, treat as percentage.
-                        # If > 1.0, treat as absolute marks.
-                        neg = attempt.exam.negative_marking
-                        if 0 < neg <= 1.0:
-                             deduction = max_marks * neg
-                        else:
-                             deduction = neg
-                        
-                        student_answer.marks_awarded = -abs(deduction)
-                else:
-                    # No answer selected
-                    student_answer.is_correct = False
-                    student_answer.marks_awarded = 0.0
-            
-            student_answer.save()
-            total_score += student_answer.marks_awarded
-        
-        # Update attempt with final score
-        attempt.score = total_score
-        attempt.status = 'COMPLETED'
-        attempt.finish_time = timezone.now()
-        attempt.save()
+        # EVALUATE ALL ANSWERS AT SUBMISSION TIME (under the row lock: a racing finish gets None)
+        if finalize_attempt(attempt) is None:
+            return Response({'detail': 'Attempt already finished'}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(AttemptSerializer(attempt).data)
     @action(detail=True, methods=['get'])
     def certificate(self, request, pk=None):
+        """The attempt's certificate PDF, rendered once and served from disk"""
         attempt = self.get_object()
         if attempt.status != 'COMPLETED':
             return Response({'detail': 'Certificate only available for completed attempts'}, status=status.HTTP_400_BAD_REQUEST)
 
-        from io import BytesIO
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from django.http import HttpResponse
-
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        
-        # Draw certificate
-        p.setFont("Helvetica-Bold", 30)
-        p.drawCentredString(297, 700, "CERTIFICATE OF COMPLETION")
-        
-        p.setFont("Helvetica", 18)
-        p.drawCentredString(297, 600, "This is to certify that")
-        
-        p.setFont("Helvetica-Bold", 24)
-        p.drawCentredString(297, 550, attempt.user.username.upper())
-        
-        p.setFont("Helvetica", 18)
-        p.drawCentredString(297, 500, f"has successfully completed the exam")
-        
-        p.setFont("Helvetica-Bold", 20)
-        p.drawCentredString(297, 450, attempt.exam.title)
-        
-        p.setFont("Helvetica", 16)
-        p.drawCentredString(297, 400, f"Score: {attempt.score} / Pass Marks: {attempt.exam.pass_marks}")
-        
-        p.setFont("Helvetica-Oblique", 12)
-        p.drawCentredString(297, 300, f"Generated on: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        p.drawCentredString(297, 280, f"Certificate ID: {attempt.id}")
-
-        p.showPage()
-        p.save()
-
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="certificate_{attempt.id}.pdf"'
+        # Usually rendered in the background at completion; render now if not
+        path, key = ensure_certificate(certificate_fields(attempt))
+        etag = f'"{key}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = FileResponse(
+                open(path, 'rb'), content_type='application/pdf',
+                as_attachment=True, filename=f'certificate_{attempt.id}.pdf',
+            )
+        response['ETag'] = etag
+        # A re-grade changes the certificate, so revalidate (cheap: 304)
+        response['Cache-Control'] = 'private, no-cache'
         return response
 
     @action(detail=True, methods=['get'])
     def review(self, request, pk=None):
+        """The attempt's review document, stored when it finished (one read)"""
         # Allow Instructors/Admins to view any attempt, Students only their own
         if request.user.role.name in ['ADMIN', 'INSTRUCTOR']:
-            attempt = Attempt.objects.get(pk=pk)
+            queryset = Attempt.objects.exclude(status='PENDING')
         else:
-            attempt = self.get_object()
-            
-        from .serializers import AttemptReviewSerializer
-        return Response(AttemptReviewSerializer(attempt).data)
+            queryset = Attempt.objects.filter(user=request.user).exclude(status='PENDING')
+        attempt = get_object_or_404(queryset.select_related('exam').defer('paper'), pk=pk)
+        return HttpResponse(review_document(attempt), content_type='application/json')
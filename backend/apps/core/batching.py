@@ -0,0 +1,84 @@
+"""
+Background batch writer
+Collects small writes from request threads and hands them to a flush
+function in batches from a daemon thread, so the request path never
+waits on the database for them.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundBatcher:
+    """
+    add(item) queues an item; add(item, key=k) keeps only the latest item
+    per key. flush(items) runs every `interval` seconds, or sooner once
+    `max_batch` items are pending. A failed batch is logged and dropped.
+    """
+
+    def __init__(self, name, flush, interval=2.0, max_batch=500):
+        self.name = name
+        self._flush = flush
+        self.interval = interval
+        self.max_batch = max_batch
+        self._items = []
+        self._keyed = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.counters = {'queued': 0, 'flushed': 0, 'batches': 0, 'errors': 0}
+        atexit.register(self.flush_now)
+
+    def add(self, item, key=None):
+        self._ensure_thread()
+        with self._lock:
+            if key is None:
+                self._items.append(item)
+            else:
+                self._keyed[key] = item
+            self.counters['queued'] += 1
+            pending = len(self._items) + len(self._keyed)
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._items) + len(self._keyed)
+
+    def flush_now(self):
+        """Flush everything pending in the calling thread"""
+        with self._lock:
+            items = self._items + list(self._keyed.values())
+            self._items = []
+            self._keyed = {}
+        for start in range(0, len(items), self.max_batch):
+            batch = items[start:start + self.max_batch]
+            try:
+                self._flush(batch)
+                self.counters['flushed'] += len(batch)
+                self.counters['batches'] += 1
+            except Exception:
+                self.counters['errors'] += 1
+                logger.exception('Batch flush for %s failed (%s items dropped)', self.name, len(batch))
+
+    def _ensure_thread(self):
+        # Threads do not survive fork: each worker starts its own
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name=f'batcher-{self.name}', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush_now()
@@ -0,0 +1,258 @@
+"""
+Two-tier cache: per-process LRU (L1) in front of a shared cache (L2, Redis)
+
+Configured as a regular Django cache backend (see CACHES in settings).
+L1 entries live for a few seconds at most; anything that must be dropped
+everywhere at once should go through versioned namespaces:
+
+    key = versioned_key(exam_namespace(exam.id), 'paper')
+    paper = cache.get(key)
+    ...
+    bump_namespace(exam_namespace(exam.id))   # on save/delete (see signals.py)
+
+Bumping a namespace increments its version in L2 and tells every worker
+to drop its L1 copy of the version over the message bus, so stale keys
+are simply never read again and expire on their own.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.core.cache import caches, cache as default_cache
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from .lru import LRUCache
+from .pubsub import get_bus
+from .redis_client import get_breaker
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cache_invalidate'
+_MISSING = object()
+
+# Django builds one backend instance per thread; L1 and its metrics must be
+# shared by every thread of the worker, so they live at module level.
+_l1_stores = {}
+_metrics = {}
+_l1_pid = None
+_l1_lock = threading.Lock()
+
+
+def _new_metrics():
+    return {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'sets': 0, 'deletes': 0, 'l2_errors': 0}
+
+
+def _local_store(alias, max_entries, timeout):
+    global _l1_pid
+    with _l1_lock:
+        if _l1_pid != os.getpid():
+            # Forked worker: start empty and listen for invalidations ourselves
+            _l1_stores.clear()
+            _metrics.clear()
+            _l1_pid = os.getpid()
+            get_bus().subscribe(INVALIDATION_CHANNEL, _on_invalidate)
+        if alias not in _l1_stores:
+            _l1_stores[alias] = LRUCache(max_entries, timeout)
+            _metrics[alias] = _new_metrics()
+        return _l1_stores[alias], _metrics[alias]
+
+
+def _on_invalidate(message):
+    alias, _, key = message.partition(' ')
+    store = _l1_stores.get(alias)
+    if store is not None:
+        store.delete(key)
+
+
+class TwoTierCache(BaseCache):
+    """
+    LOCATION is the alias of the L2 cache. OPTIONS:
+        L1_MAX_ENTRIES  entries kept per process (default 1000)
+        L1_TIMEOUT      max seconds an entry stays in L1 (default 5)
+    L2 errors are counted and treated as misses; a circuit breaker keeps
+    a dead Redis from adding latency to every call.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._alias = f'{location}:{self.key_prefix}'
+        self._breaker = get_breaker('cache')
+
+    @property
+    def _l1(self):
+        return _local_store(self._alias, self._l1_max_entries, self._l1_timeout)[0]
+
+    @property
+    def _stats(self):
+        return _local_store(self._alias, self._l1_max_entries, self._l1_timeout)[1]
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_timeout_for(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self._l1_timeout
+        return min(self._l1_timeout, timeout)
+
+    def _guard(self, func, fallback=None):
+        def on_error():
+            self._stats['l2_errors'] += 1
+            return fallback
+        return self._breaker.run(func, on_error)
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._l1.get(l1_key, _MISSING)
+        if value is not _MISSING:
+            self._stats['l1_hits'] += 1
+            return value
+        value = self._guard(lambda: self.l2.get(key, _MISSING, version=version), _MISSING)
+        if value is _MISSING:
+            self._stats['misses'] += 1
+            return default
+        self._stats['l2_hits'] += 1
+        self._l1.set(l1_key, value, self._l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._stats['sets'] += 1
+        self._guard(lambda: self.l2.set(key, value, timeout=self.get_backend_timeout(timeout), version=version))
+        self._l1.set(l1_key, value, self._l1_timeout_for(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        added = self._guard(
+            lambda: self.l2.add(key, value, timeout=self.get_backend_timeout(timeout), version=version), None
+        )
+        if added is None:
+            # L2 unavailable: behave like a local cache
+            if l1_key in self._l1:
+                return False
+            added = True
+        if added:
+            self._stats['sets'] += 1
+            self._l1.set(l1_key, value, self._l1_timeout_for(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self._guard(
+            lambda: self.l2.touch(key, timeout=self.get_backend_timeout(timeout), version=version), False
+        ))
+
+    def delete(self, key, version=None):
+        """Delete from L2 and from the L1 of every worker"""
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._stats['deletes'] += 1
+        self._l1.delete(l1_key)
+        deleted = self._guard(lambda: self.l2.delete(key, version=version), False)
+        get_bus().publish(INVALIDATION_CHANNEL, f'{self._alias} {l1_key}')
+        return bool(deleted)
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic in L2; the local copy is dropped rather than updated"""
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._l1.delete(l1_key)
+        value = self.l2.incr(key, delta, version=version)
+        get_bus().publish(INVALIDATION_CHANNEL, f'{self._alias} {l1_key}')
+        return value
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self._l1.clear()
+        self._guard(self.l2.clear)
+
+    def metrics(self):
+        """Hit/miss/eviction counters for this worker"""
+        l1, stats = _local_store(self._alias, self._l1_max_entries, self._l1_timeout)
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        return {
+            **stats,
+            'l1_entries': len(l1),
+            'l1_evictions': l1.evictions,
+            'hit_ratio': round((stats['l1_hits'] + stats['l2_hits']) / lookups, 4) if lookups else None,
+            'breaker': self._breaker.stats(),
+        }
+
+
+# --- Versioned namespaces ---
+
+def exam_namespace(exam_id):
+    return f'exam:{exam_id}'
+
+
+def question_namespace(question_id):
+    return f'question:{question_id}'
+
+
+def _version_key(namespace):
+    return f'nsv:{namespace}'
+
+
+def _initial_version():
+    # Millisecond clock: if L2 ever loses a version key, the restarted
+    # counter is still ahead of every version handed out before
+    return int(time.time() * 1000)
+
+
+def namespace_version(namespace, cache=None):
+    cache = cache or default_cache
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), _initial_version(), None)
+        version = cache.get(_version_key(namespace)) or _initial_version()
+    return version
+
+
+def versioned_key(namespace, *parts, cache=None):
+    """Key that changes whenever the namespace is bumped"""
+    version = namespace_version(namespace, cache)
+    return ':'.join([namespace, f'v{version}', *map(str, parts)])
+
+
+def bump_namespace(namespace, cache=None):
+    """Invalidate every versioned key in namespace, in every worker"""
+    cache = cache or default_cache
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Never read yet (or lost): restart ahead of every earlier version
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+    except Exception as e:
+        # L2 down: at least forget the local copy
+        logger.warning('Could not bump cache namespace %s: %s', namespace, e)
+        cache.delete(key)
+        return None
+
+
+def get_or_build(namespace, key_parts, builder, timeout=DEFAULT_TIMEOUT, cache=None):
+    """Return the cached value for a versioned key, building it on a miss"""
+    cache = cache or default_cache
+    key = versioned_key(namespace, *key_parts, cache=cache)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cache_metrics():
+    """Metrics for every configured two-tier cache alias"""
+    from django.conf import settings
+    return {
+        alias: caches[alias].metrics()
+        for alias, config in settings.CACHES.items()
+        if config['BACKEND'].endswith('TwoTierCache')
+    }
@@ -0,0 +1,121 @@
+"""
+Idempotency-Key support
+A view wrapped in @idempotent runs once per (user, Idempotency-Key): the
+first request claims the key by inserting an IdempotencyRecord (the unique
+index settles races), and its response is stored on the record. A retry
+with the same key gets the stored response back, marked with an
+Idempotent-Replayed header, without the view (and e.g. grading) running
+again. A retry that arrives while the first request is still running gets
+409, and a key reused for a different request gets 422.
+
+Requests without the header behave as before. Server errors and
+exceptions release the claim so the request can be retried.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(request):
+    """Hash of what the request asks for: method, path and body"""
+    body = json.dumps(request.data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method}\n{request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim(user, key, digest):
+    """
+    (record, created): a new in-progress record for the key, or the one
+    already stored. Expired and abandoned records are replaced; record is
+    None when that keeps losing to concurrent requests.
+    """
+    config = settings.IDEMPOTENCY
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(user=user, key=key, fingerprint=digest), True
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Purged in between: claim again
+            continue
+        age = timezone.now() - record.created_at
+        expired = age > timedelta(hours=config['TTL_HOURS'])
+        abandoned = record.status_code is None and age > timedelta(seconds=config['IN_PROGRESS_TIMEOUT'])
+        if not (expired or abandoned):
+            return record, False
+        IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+    return None, False
+
+
+def replay(record):
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Make a DRF view method honour the Idempotency-Key header"""
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        digest = fingerprint(request)
+        record, created = claim(request.user, key, digest)
+        if not created:
+            if record is not None and record.fingerprint != digest:
+                return Response(
+                    {'detail': f'{HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record is None or record.status_code is None:
+                response = Response(
+                    {'detail': 'A request with this Idempotency-Key is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+            return replay(record)
+
+        try:
+            response = view(self, request, *args, **kwargs)
+        except BaseException:
+            record.delete()
+            raise
+        if not isinstance(response, Response) or response.status_code >= 500:
+            # Nothing to replay (or a failure worth retrying): give the key back
+            record.delete()
+            return response
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=['status_code', 'response'])
+        return response
+
+    return wrapper
+
+
+def purge(before=None):
+    """Delete records past the TTL; returns how many"""
+    before = before or timezone.now() - timedelta(hours=settings.IDEMPOTENCY['TTL_HOURS'])
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=before).delete()
+    return deleted
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.idempotency import purge
+from apps.core.periodic import run_periodically
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored Idempotency-Key responses older than IDEMPOTENCY_TTL_HOURS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running as a periodic task')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        run_periodically('purge_idempotency_records', lambda: self.run_once(options), options)
+
+    def run_once(self, options):
+        deleted = purge()
+        if deleted or not options['loop']:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idempotency records'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import OutboxEmail
+from apps.core.outbox import deliver_batch, due
+from apps.core.periodic import run_periodically
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbox emails over one SMTP connection per batch, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per SMTP connection (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the queue')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a periodic task')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        run_periodically('send_outbox', lambda: self.run_once(options), options)
+
+    def run_once(self, options):
+        if options['dry_run']:
+            pending = OutboxEmail.objects.filter(status='PENDING').count()
+            failed = OutboxEmail.objects.filter(status='FAILED').count()
+            self.stdout.write(f'{due().count()} due, {pending} pending, {failed} failed')
+            return
+
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+        while True:
+            result = deliver_batch(options['batch_size'])
+            for name, count in result.items():
+                totals[name] += count
+            # Stop on an empty queue, or when nothing goes through (SMTP down)
+            if result['sent'] == 0:
+                break
+
+        if any(totals.values()) or not options['loop']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {totals['sent']} emails, {totals['retrying']} to retry, {totals['failed']} given up"
+            ))
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued in the same transaction as the change it reports and
+    delivered later by send_outbox (see outbox.py). dedupe_key makes
+    enqueueing idempotent, e.g. one completion email per attempt.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    dedupe_key = models.CharField(max_length=200, unique=True)
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    tries = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Stored response of a request sent with an Idempotency-Key header, so a
+    retry of it is answered without running the view again (see
+    idempotency.py). status_code is null while the first request runs.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # Hash of method, path and body: a key reused for another request is refused
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'idempotency_records'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
@@ -0,0 +1,94 @@
+"""
+Transactional email outbox
+enqueue() inserts an OutboxEmail row, so the email commits or rolls back
+with the change it reports; nothing talks to SMTP on the request path.
+deliver_batch() (run by `manage.py send_outbox --loop`) claims due rows
+with SKIP LOCKED, sends them over a single SMTP connection and retries
+failures with exponential backoff until MAX_TRIES.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(dedupe_key, to, subject, body):
+    """Queue an email unless one with dedupe_key was already queued"""
+    if not to:
+        return
+    OutboxEmail.objects.bulk_create(
+        [OutboxEmail(dedupe_key=dedupe_key, to=to, subject=subject, body=body, next_attempt_at=timezone.now())],
+        ignore_conflicts=True,
+    )
+
+
+def backoff(tries):
+    config = settings.OUTBOX
+    return timedelta(seconds=min(config['BACKOFF_BASE'] * 2 ** (tries - 1), config['BACKOFF_MAX']))
+
+
+def due(now=None):
+    return OutboxEmail.objects.filter(status='PENDING', next_attempt_at__lte=now or timezone.now())
+
+
+def deliver_batch(batch_size=None):
+    """Send up to batch_size due emails; returns {'sent', 'retrying', 'failed'}"""
+    config = settings.OUTBOX
+    batch_size = batch_size or config['BATCH_SIZE']
+    result = {'sent': 0, 'retrying': 0, 'failed': 0}
+    with transaction.atomic():
+        # Rows stay locked while they are sent, so parallel workers skip them
+        rows = list(
+            due().select_for_update(skip_locked=True).order_by('next_attempt_at')[:batch_size]
+        )
+        if not rows:
+            return result
+
+        now = timezone.now()
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for row in rows:
+                message = EmailMessage(row.subject, row.body, config['FROM_EMAIL'], [row.to], connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    row.tries += 1
+                    row.last_error = str(e)[:1000]
+                    if row.tries >= config['MAX_TRIES']:
+                        row.status = 'FAILED'
+                        result['failed'] += 1
+                        logger.error('Giving up on outbox email %s after %s tries: %s', row.dedupe_key, row.tries, e)
+                    else:
+                        row.next_attempt_at = now + backoff(row.tries)
+                        result['retrying'] += 1
+                else:
+                    row.tries += 1
+                    row.status = 'SENT'
+                    row.sent_at = timezone.now()
+                    row.last_error = ''
+                    result['sent'] += 1
+        except Exception as e:
+            # Could not even connect: push the whole batch back
+            logger.warning('Outbox connection failed: %s', e)
+            for row in rows:
+                if row.status == 'PENDING' and row.next_attempt_at <= now:
+                    row.tries += 1
+                    row.last_error = str(e)[:1000]
+                    row.next_attempt_at = now + backoff(row.tries)
+                    result['retrying'] += 1
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        OutboxEmail.objects.bulk_update(rows, ['status', 'tries', 'next_attempt_at', 'last_error', 'sent_at'])
+    return result
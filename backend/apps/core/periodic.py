@@ -0,0 +1,28 @@
+"""
+Periodic management commands
+run_periodically() is the --loop driver shared by the maintenance commands
+(send_outbox, sweep_expired_attempts, the purges, ...). A run that raises,
+e.g. during a database failover or a Redis outage, is logged and retried
+on the next tick instead of ending the process.
+"""
+import logging
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def run_periodically(name, run_once, options):
+    """Call run_once() once, or every options['interval'] seconds with options['loop']"""
+    if not options['loop']:
+        run_once()
+        return
+    while True:
+        try:
+            run_once()
+        except Exception:
+            logger.exception('%s failed; retrying in %ss', name, options['interval'])
+        time.sleep(options['interval'])
+        # Drops connections a failed run left unusable
+        close_old_connections()
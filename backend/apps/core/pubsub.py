@@ -0,0 +1,167 @@
+"""
+Process-local message bus with a Redis pub/sub transport
+Used to fan out rare state changes (token revocations, cache invalidations)
+to every gunicorn worker without a network hop on the read path
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+
+from .redis_client import get_breaker
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBus:
+    """
+    In-process bus: publish() dispatches synchronously to local handlers.
+    Stands in for Redis in tests and single-process deployments.
+    """
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._reconnect_hooks = []
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self):
+        """True while every published message is guaranteed to reach handlers"""
+        return True
+
+    def subscribe(self, channel, handler):
+        """Register handler(message) for channel; returns an unsubscribe callable"""
+        with self._lock:
+            self._handlers[channel].append(handler)
+        return lambda: self.unsubscribe(channel, handler)
+
+    def unsubscribe(self, channel, handler):
+        with self._lock:
+            handlers = self._handlers.get(channel, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def add_reconnect_hook(self, hook):
+        """hook() runs after the transport reconnects, to resync missed state"""
+        self._reconnect_hooks.append(hook)
+
+    def publish(self, channel, message):
+        self._dispatch(channel, message)
+
+    def _dispatch(self, channel, message):
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('Bus handler for %s failed', channel)
+
+    def _run_reconnect_hooks(self):
+        for hook in self._reconnect_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception('Bus reconnect hook failed')
+
+
+class RedisBus(InMemoryBus):
+    """
+    Redis pub/sub transport. Each process holds a single pattern
+    subscription on the channel prefix and dispatches to local handlers
+    from a daemon listener thread.
+    """
+
+    def __init__(self, prefix=None):
+        super().__init__()
+        self.prefix = prefix or settings.MESSAGE_BUS_PREFIX
+        self._breaker = get_breaker('pubsub')
+        self._connected = threading.Event()
+        self._listener = None
+
+    @property
+    def healthy(self):
+        return self._connected.is_set()
+
+    def subscribe(self, channel, handler):
+        self._ensure_listener()
+        return super().subscribe(channel, handler)
+
+    def publish(self, channel, message):
+        delivered = self._breaker.call(
+            lambda r: r.publish(self.prefix + channel, message) is not None,
+            lambda: False
+        )
+        if not delivered:
+            # At least keep this process consistent while Redis is down
+            self._dispatch(channel, message)
+
+    def _ensure_listener(self):
+        if self._listener is None or not self._listener.is_alive():
+            with self._lock:
+                if self._listener is None or not self._listener.is_alive():
+                    self._listener = threading.Thread(
+                        target=self._listen, name='redis-bus-listener', daemon=True
+                    )
+                    self._listener.start()
+
+    def _listen(self):
+        backoff = 0.5
+        while True:
+            try:
+                # Dedicated connection: pub/sub blocks, so it must not share
+                # the short socket timeout of the request-path pool
+                client = redis.Redis(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    db=settings.REDIS_DB,
+                    decode_responses=True,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=30,
+                )
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                backoff = 0.5
+                # Anything published before the subscription was live is
+                # missed, so let subscribers resync on every (re)connect.
+                # Messages arriving meanwhile stay buffered on the socket.
+                self._run_reconnect_hooks()
+                self._connected.set()
+                for msg in pubsub.listen():
+                    if msg.get('type') != 'pmessage':
+                        continue
+                    self._dispatch(msg['channel'][len(self.prefix):], msg['data'])
+            except redis.RedisError as e:
+                logger.warning('Redis bus disconnected: %s', e)
+            self._connected.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 10)
+
+
+_buses = {}
+_bus_pid = None
+
+
+def get_bus(prefix=None):
+    """
+    Return this process's bus for a channel prefix (default
+    MESSAGE_BUS_PREFIX), recreated after fork so each worker listens.
+    Busy fan-outs get their own prefix so workers only receive them once
+    they subscribe.
+    """
+    global _buses, _bus_pid
+    if _bus_pid != os.getpid():
+        _buses = {}
+        _bus_pid = os.getpid()
+    bus = _buses.get(prefix)
+    if bus is None:
+        if settings.MESSAGE_BUS == 'memory':
+            bus = InMemoryBus()
+        else:
+            bus = RedisBus(prefix)
+        _buses[prefix] = bus
+    return bus
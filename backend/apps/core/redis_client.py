@@ -0,0 +1,154 @@
+"""
+Shared Redis connection pool and circuit breaker
+One pool per process so hot paths cost a pooled round trip, not a TCP handshake
+"""
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    redis-py resets the pool's connections itself after a fork, so gunicorn
+    workers can share this module-level instance safely.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    db=settings.REDIS_DB,
+                    decode_responses=True,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=30,
+                )
+    return _pool
+
+
+def get_redis():
+    """Return a client bound to the shared pool (cheap, no connection is opened)"""
+    return redis.Redis(connection_pool=get_pool())
+
+
+class CircuitBreaker:
+    """
+    Simple circuit breaker around Redis calls.
+
+    CLOSED:    calls go through; consecutive failures are counted.
+    OPEN:      calls are short-circuited to the fallback until the cooldown ends.
+    HALF_OPEN: one probe call is let through; success closes, failure re-opens.
+    """
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.REDIS_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.REDIS_CIRCUIT_RESET_SECONDS
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self.counters = {
+            'opened': 0,           # transitions into OPEN
+            'closed': 0,           # transitions back into CLOSED
+            'short_circuited': 0,  # calls served by the fallback while OPEN
+            'failures': 0,
+            'successes': 0,
+        }
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        """Return True if a call may hit Redis right now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Cooldown over: let a single probe through
+                self._state = self.HALF_OPEN
+                return True
+            self.counters['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.counters['successes'] += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self.counters['closed'] += 1
+                logger.info('Circuit %s closed', self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters['failures'] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.counters['opened'] += 1
+                    logger.warning('Circuit %s opened after %s failures', self.name, self._consecutive_failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func, fallback):
+        """
+        Run func(client) against the shared pool, or fallback() when the
+        circuit is open or Redis raises.
+        """
+        return self.run(lambda: func(get_redis()), fallback)
+
+    def run(self, func, fallback):
+        """Run func() (anything that talks to Redis) behind the breaker"""
+        if not self.allow():
+            return fallback()
+        try:
+            result = func()
+        except redis.RedisError as e:
+            logger.debug('Redis call via %s failed: %s', self.name, e)
+            self.record_failure()
+            return fallback()
+        except BaseException:
+            # Not Redis' fault, but a failed probe must not leave the circuit
+            # HALF_OPEN (where allow() refuses everything): re-open it
+            if self._state == self.HALF_OPEN:
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state, **self.counters}
+
+
+_breakers = {}
+
+
+def get_breaker(name):
+    """Return the process-wide breaker registered under name"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _pool_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def breaker_stats():
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
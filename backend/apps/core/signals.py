@@ -0,0 +1,55 @@
+"""
+Cache invalidation on model changes
+Bumps the versioned cache namespaces of exams and questions whenever the
+rows an exam paper is built from change.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .cache import bump_namespace, exam_namespace, question_namespace
+
+
+def _bump_after_commit(*namespaces):
+    # Readers inside the same transaction would otherwise re-cache old rows
+    transaction.on_commit(lambda: [bump_namespace(ns) for ns in namespaces])
+
+
+def invalidate_exams_for_questions(question_ids):
+    """Bump every exam containing one of question_ids (plus the questions themselves)"""
+    ExamQuestion = apps.get_model('exams', 'ExamQuestion')
+    exam_ids = set(
+        ExamQuestion.objects.filter(question_id__in=question_ids).values_list('exam_id', flat=True)
+    )
+    _bump_after_commit(
+        *[question_namespace(qid) for qid in question_ids],
+        *[exam_namespace(eid) for eid in exam_ids],
+    )
+
+
+def _exam_changed(sender, instance, **kwargs):
+    _bump_after_commit(exam_namespace(instance.pk))
+
+
+def _exam_question_changed(sender, instance, **kwargs):
+    _bump_after_commit(exam_namespace(instance.exam_id))
+
+
+def _question_changed(sender, instance, **kwargs):
+    invalidate_exams_for_questions([instance.pk])
+
+
+def _choice_changed(sender, instance, **kwargs):
+    invalidate_exams_for_questions([instance.question_id])
+
+
+def connect_invalidation_signals():
+    handlers = [
+        (apps.get_model('exams', 'Exam'), _exam_changed),
+        (apps.get_model('exams', 'ExamQuestion'), _exam_question_changed),
+        (apps.get_model('question_bank', 'Question'), _question_changed),
+        (apps.get_model('question_bank', 'Choice'), _choice_changed),
+    ]
+    for model, handler in handlers:
+        post_save.connect(handler, sender=model, dispatch_uid=f'cache_invalidate_{model._meta.label}_save')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'cache_invalidate_{model._meta.label}_delete')
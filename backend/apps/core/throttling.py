@@ -0,0 +1,182 @@
+"""
+Shared token-bucket rate limiting for DRF
+Bucket state lives in Redis and is updated atomically by a Lua script, so
+limits hold across all gunicorn workers and each check is O(1) regardless
+of request history. LocalTokenBucket is the in-process stand-in used in
+tests and while Redis is unavailable.
+"""
+import math
+import threading
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.throttling import (
+    SimpleRateThrottle, AnonRateThrottle, UserRateThrottle, ScopedRateThrottle
+)
+
+from .redis_client import get_breaker, get_redis
+
+# KEYS[1] bucket; ARGV: capacity, refill rate (tokens/sec), key ttl (sec)
+# Uses the Redis clock so workers with skewed clocks agree.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {allowed, tostring(wait)}
+"""
+
+
+class LocalTokenBucket:
+    """In-process implementation of the same algorithm as TOKEN_BUCKET_LUA"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, duration):
+        rate = capacity / duration
+        now = time.time()
+        with self._lock:
+            tokens, ts, expires_at = self._buckets.get(key, (capacity, now, now))
+            if expires_at < now:
+                tokens, ts = capacity, now
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                allowed, wait = True, 0.0
+            else:
+                allowed, wait = False, (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, now + duration + 1)
+            if len(self._buckets) > 100000:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] >= now}
+        return allowed, wait
+
+
+class RedisTokenBucket:
+    """Token buckets stored as Redis hashes; per-worker fallback while Redis is down"""
+
+    def __init__(self):
+        self._breaker = get_breaker('throttle')
+        self._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+        self._fallback = LocalTokenBucket()
+
+    def consume(self, key, capacity, duration):
+        result = self._breaker.call(
+            lambda r: self._script(
+                keys=[key], args=[capacity, capacity / duration, int(math.ceil(duration)) + 1], client=r
+            ),
+            lambda: None
+        )
+        if result is None:
+            return self._fallback.consume(key, capacity, duration)
+        allowed, wait = result
+        return bool(int(allowed)), float(wait)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if settings.RATE_LIMIT_BACKEND == 'memory':
+                    _limiter = LocalTokenBucket()
+                else:
+                    _limiter = RedisTokenBucket()
+    return _limiter
+
+
+class TokenBucketRateThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle with the request history replaced by a token bucket:
+    a rate of N/period allows bursts of N and refills at N per period.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self._wait = get_limiter().consume(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class RedisAnonRateThrottle(AnonRateThrottle, TokenBucketRateThrottle):
+    pass
+
+
+class RedisUserRateThrottle(UserRateThrottle, TokenBucketRateThrottle):
+    pass
+
+
+class RedisScopedRateThrottle(ScopedRateThrottle, TokenBucketRateThrottle):
+    """Uses the view's throttle_scope, like DRF's ScopedRateThrottle"""
+    pass
+
+
+class LoginRateThrottle(TokenBucketRateThrottle):
+    """
+    Strict limit on login attempts per (client IP, submitted username).
+    Keying by username alone would let anyone lock a student out; keying by
+    IP alone would lock out a whole exam centre behind one NAT. Password
+    spraying across usernames is capped by LoginIPRateThrottle.
+    """
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        # A non-object body has no username; the IP alone keys it and the view rejects it
+        data = request.data if isinstance(request.data, Mapping) else {}
+        username = str(data.get('username') or '').strip().lower()
+        ident = f'{self.get_ident(request)}:{username}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIPRateThrottle(TokenBucketRateThrottle):
+    """
+    Per-IP ceiling on login attempts, whatever the username. Sized for an
+    exam centre's students all logging in through one address
+    (LOGIN_IP_THROTTLE_RATE).
+    """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class SubmitAnswerRateThrottle(UserRateThrottle, TokenBucketRateThrottle):
+    """Generous per-user limit for answer autosaves"""
+    scope = 'submit_answer'
+
+
+class ProctoringRateThrottle(UserRateThrottle, TokenBucketRateThrottle):
+    """Per-user limit for batched proctoring event uploads"""
+    scope = 'proctoring'
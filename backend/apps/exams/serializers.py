@@ -44,3 +44,8 @@ class ProvideQuestionToExamSerializer(serializers.Serializer):
     question_id = serializers.PrimaryKeyRelatedField(queryset=Question.objects.all())
     marks = serializers.IntegerField(default=1)
     order = serializers.IntegerField(default=0)
+
+class PrepareSessionSerializer(serializers.Serializer):
+    """Roster for a prepared exam session; all active students when both lists are empty"""
+    user_ids = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list)
@@ -2,13 +2,20 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from django.http import StreamingHttpResponse
 from .models import Exam, ExamQuestion
-from .serializers import ExamSerializer, ExamQuestionSerializer, ProvideQuestionToExamSerializer
+from .serializers import ExamSerializer, ExamQuestionSerializer, PrepareSessionSerializer, ProvideQuestionToExamSerializer
 from .permissions import IsExamOwnerOrReadOnly
 from apps.users.permissions import IsAdminOrInstructor
 from django_filters.rest_framework import DjangoFilterBackend
+from apps.attempts import sessions
 from apps.attempts.models import Attempt
 from apps.attempts.analytics_serializers import ExamAttemptAnalyticsSerializer
+from apps.attempts.certificates import exam_certificates, stream_zip
+from apps.attempts.monitoring import EventStreamRenderer, open_stream, snapshot
+from apps.attempts.regrade import regrade_exam
+from apps.users.authentication import JWTAuthentication, QueryParamJWTAuthentication
 from apps.users.models import AuditLog
 
 class ExamViewSet(viewsets.ModelViewSet):
@@ -17,7 +24,7 @@ class ExamViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy', 'add_question', 'remove_question']:
             return [IsAdminOrInstructor()]
-        if self.action in ['analytics', 'monitoring']:
+        if self.action in ['analytics', 'monitoring', 'monitoring_stream', 'certificates', 'prepare_session', 'regrade']:
             return [IsAdminOrInstructor()]
         return [IsAuthenticated()]
 
@@ -63,26 +70,86 @@ class ExamViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='analytics')
     def analytics(self, request, pk=None):
         exam = self.get_object()
-        attempts = Attempt.objects.filter(exam=exam).select_related('user')
+        attempts = Attempt.objects.filter(exam=exam).exclude(status='PENDING').select_related('user')
         serializer = ExamAttemptAnalyticsSerializer(attempts, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='monitoring')
     def monitoring(self, request, pk=None):
-        """Live monitoring of active attempts"""
+        """Live monitoring of active attempts (polling; see monitoring_stream)"""
         exam = self.get_object()
-        active_attempts = Attempt.objects.filter(
-            exam=exam, 
-            status='STARTED'
-        ).select_related('user')
-        
-        # We can use the same analytics serializer or a more compact one
-        serializer = ExamAttemptAnalyticsSerializer(active_attempts, many=True)
-        return Response({
-            'exam_title': exam.title,
-            'active_count': active_attempts.count(),
-            'students': serializer.data
-        })
+        return Response(snapshot(exam))
+
+    @action(
+        detail=True, methods=['get'], url_path='monitoring/stream',
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+        authentication_classes=[JWTAuthentication, QueryParamJWTAuthentication],
+    )
+    def monitoring_stream(self, request, pk=None):
+        """Server-Sent Events: a snapshot of active attempts, then deltas as they happen"""
+        exam = self.get_object()
+        stream = open_stream(exam)
+        if stream is None:
+            response = Response(
+                {'detail': 'Too many monitoring streams, poll the monitoring endpoint instead'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = '30'
+            return response
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='certificates')
+    def certificates(self, request, pk=None):
+        """ZIP of every completed attempt's certificate, streamed as it is built"""
+        exam = self.get_object()
+        response = StreamingHttpResponse(
+            stream_zip(exam_certificates(exam)), content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="certificates_{exam.id}.zip"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='prepare-session')
+    def prepare_session(self, request, pk=None):
+        """Pre-create pending attempts (with frozen papers) for the roster before the exam opens"""
+        exam = self.get_object()
+        if exam.status != 'PUBLISHED':
+            return Response({'detail': 'Exam is not published'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = PrepareSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report = sessions.prepare_session(exam, sessions.roster(**serializer.validated_data))
+        AuditLog.objects.create(
+            user=request.user,
+            action='PREPARE_SESSION',
+            resource='EXAM',
+            resource_id=str(exam.id),
+            details={k: report[k] for k in ['rostered', 'created', 'refreshed']},
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+        return Response(report)
+
+    @action(detail=True, methods=['post'], url_path='regrade')
+    def regrade(self, request, pk=None):
+        """Re-score finished attempts after a key or negative marking change"""
+        exam = self.get_object()
+        dry_run = str(request.data.get('dry_run', False)).lower() in ['true', '1']
+        # In-process: forking a process pool from a multithreaded web worker would hand the
+        # children other threads' open sockets (manage.py regrade_exam uses the pool)
+        report = regrade_exam(exam.id, dry_run=dry_run, workers=1)
+        if not dry_run:
+            AuditLog.objects.create(
+                user=request.user,
+                action='REGRADE_EXAM',
+                resource='EXAM',
+                resource_id=str(exam.id),
+                details={k: report[k] for k in ['attempts', 'changed_attempts', 'changed_answers', 'mean_delta']},
+                ip_address=request.META.get('REMOTE_ADDR')
+            )
+        return Response(report)
 
     def perform_destroy(self, instance):
         AuditLog.objects.create(
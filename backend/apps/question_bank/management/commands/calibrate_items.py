@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.question_bank.calibration import calibrate
+
+
+class Command(BaseCommand):
+    help = (
+        'Fits IRT difficulty/discrimination for questions from attempts graded since the '
+        'last calibration run and stores them on the questions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['1PL', '2PL'], default='2PL', help='Item response model')
+        parser.add_argument('--full', action='store_true', help='Ignore previous runs and refit from all attempts')
+        parser.add_argument('--iterations', type=int, default=25, help='Maximum Newton iterations')
+        parser.add_argument('--chunk-size', type=int, default=500000, help='Responses processed per vectorized chunk')
+        parser.add_argument('--settle-minutes', type=float, default=5, help='Skip attempts graded this recently')
+        parser.add_argument('--dry-run', action='store_true', help='Fit and report without saving')
+
+    def handle(self, *args, **options):
+        summary = calibrate(
+            model=options['model'],
+            full=options['full'],
+            iterations=options['iterations'],
+            chunk_size=options['chunk_size'],
+            settle=timedelta(minutes=options['settle_minutes']),
+            dry_run=options['dry_run'],
+        )
+        if not summary['responses']:
+            self.stdout.write(f"No new responses since {summary['since'] or 'the beginning'}")
+            return
+
+        for item in summary['items_preview']:
+            self.stdout.write(f"  {item['question_id']} [{item['label']}]: b={item['b']:+.3f} a={item['a']:.3f}")
+        verb = 'Fitted' if options['dry_run'] else 'Calibrated'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['items']} items ({summary['new_items']} new, {summary['model']}) from "
+            f"{summary['responses']} responses in {summary['attempts']} attempts in {summary['seconds']}s; "
+            f"difficulty range {summary['difficulty_range'][0]:+.2f}..{summary['difficulty_range'][1]:+.2f}"
+        ))
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0002_alter_question_question_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalibrationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('1PL', 'Rasch / 1PL'), ('2PL', '2PL')], max_length=3)),
+                ('watermark', models.DateTimeField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'qb_calibration_runs',
+                'ordering': ['-watermark'],
+            },
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_calibrated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_difficulty',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_discrimination',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_precision',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_responses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
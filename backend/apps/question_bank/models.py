@@ -50,6 +50,13 @@ class Question(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Item response theory parameters fitted by the calibrate_items job
+    irt_difficulty = models.FloatField(null=True, blank=True)  # b
+    irt_discrimination = models.FloatField(null=True, blank=True)  # a (1.0 under 1PL)
+    irt_precision = models.FloatField(default=0.0)  # Fisher information behind b, the prior weight for the next run
+    irt_responses = models.PositiveIntegerField(default=0)
+    irt_calibrated_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         db_table = 'qb_questions'
         ordering = ['-created_at']
@@ -70,3 +77,23 @@ class Choice(models.Model):
 
     def __str__(self):
         return f"Choice({self.text[:50]}) for {self.question_id}"
+
+
+class CalibrationRun(models.Model):
+    """One calibrate_items pass; watermark is the graded_at up to which attempts were used"""
+    MODEL_CHOICES = [('1PL', 'Rasch / 1PL'), ('2PL', '2PL')]
+
+    model = models.CharField(max_length=3, choices=MODEL_CHOICES)
+    watermark = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'qb_calibration_runs'
+        ordering = ['-watermark']
+
+    def __str__(self):
+        return f"{self.model} calibration up to {self.watermark:%Y-%m-%d %H:%M}"
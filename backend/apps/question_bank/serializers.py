@@ -36,8 +36,8 @@ class QuestionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Question
-        fields = ['id', 'title', 'question_text', 'question_type', 'difficulty', 'subject', 'topic', 'status', 'version', 'choices', 'created_by', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'version', 'created_by', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'question_text', 'question_type', 'difficulty', 'subject', 'topic', 'status', 'version', 'choices', 'created_by', 'created_at', 'updated_at', 'irt_difficulty', 'irt_discrimination', 'irt_responses']
+        read_only_fields = ['id', 'version', 'created_by', 'created_at', 'updated_at', 'irt_difficulty', 'irt_discrimination', 'irt_responses']
 
     def validate(self, data):
         qtype = data.get('question_type') or getattr(self.instance, 'question_type', None)
@@ -132,3 +132,7 @@ class QuestionSerializer(serializers.ModelSerializer):
         
         ExamQuestion.objects.filter(question=old_question).update(question=new_question)
 
+        # .update() sends no signals: invalidate cached papers explicitly
+        from apps.core.signals import invalidate_exams_for_questions
+        invalidate_exams_for_questions([new_question.id])
+
@@ -0,0 +1,116 @@
+"""
+Login admission control
+Bounds how many PBKDF2 password checks a worker runs at once. Callers
+beyond the bounded queue are turned away immediately with a queue
+position and a Retry-After hint instead of piling onto the CPU.
+last_login updates are written asynchronously in batches.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from apps.core.batching import BackgroundBatcher
+from .models import User
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, queue_position, retry_after):
+        super().__init__('Login queue is full')
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Semaphore for concurrent work plus a bounded wait queue"""
+
+    def __init__(self, concurrency, max_queue, wait_timeout):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._avg_hold = 0.1  # EWMA of seconds a slot is held
+        self.counters = {'admitted': 0, 'rejected_full': 0, 'rejected_timeout': 0}
+
+    def retry_after(self, position):
+        """Seconds until a caller at `position` could expect a slot (at least 1)"""
+        return max(1, int(round(position * self._avg_hold / self.concurrency)) + 1)
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.counters['rejected_full'] += 1
+                raise AdmissionRejected(self._waiting + 1, self.retry_after(self._waiting + 1))
+            self._waiting += 1
+            position = self._waiting
+
+        acquired = self._semaphore.acquire(timeout=self.wait_timeout)
+        with self._lock:
+            self._waiting -= 1
+        if not acquired:
+            self.counters['rejected_timeout'] += 1
+            raise AdmissionRejected(position, self.retry_after(position))
+
+        self.counters['admitted'] += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+            self._semaphore.release()
+
+    def stats(self):
+        return {'waiting': self._waiting, 'avg_hold_seconds': round(self._avg_hold, 4), **self.counters}
+
+
+class _OpenGate:
+    """Used when admission control is disabled"""
+
+    @contextmanager
+    def slot(self):
+        yield
+
+    def stats(self):
+        return {'enabled': False}
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_login_gate():
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                config = settings.LOGIN_ADMISSION
+                if config['ENABLED']:
+                    _gate = AdmissionGate(config['CONCURRENCY'], config['MAX_QUEUE'], config['WAIT_TIMEOUT'])
+                else:
+                    _gate = _OpenGate()
+    return _gate
+
+
+def _write_last_logins(items):
+    # bulk_update sends no signals, so the principal cache is left alone
+    User.objects.bulk_update(
+        [User(id=user_id, last_login=when) for user_id, when in items],
+        ['last_login'],
+    )
+
+
+last_login_writer = BackgroundBatcher(
+    'last_login', _write_last_logins,
+    interval=settings.LOGIN_ADMISSION['LAST_LOGIN_FLUSH_SECONDS'],
+)
+
+
+def record_last_login(user, when):
+    """Queue a last_login update; repeated logins of one user coalesce"""
+    user.last_login = when
+    last_login_writer.add((user.id, when), key=user.id)
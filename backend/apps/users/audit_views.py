@@ -42,8 +42,8 @@ class PlatformStatsViewSet(viewsets.ViewSet):
             stats = {
                 'total_users': User.objects.count(),
                 'total_exams': Exam.objects.count(),
-                'total_attempts': Attempt.objects.count(),
-                'active_exams_24h': Attempt.objects.filter(start_time__gte=last_24h).count(),
+                'total_attempts': Attempt.objects.exclude(status='PENDING').count(),
+                'active_exams_24h': Attempt.objects.filter(start_time__gte=last_24h).exclude(status='PENDING').count(),
                 'new_users_24h': User.objects.filter(created_at__gte=last_24h).count(),
                 'system_status': 'ONLINE',
                 'role_distribution': {
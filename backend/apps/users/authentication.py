@@ -2,6 +2,9 @@
 Custom JWT Authentication and Token Management
 Uses PyJWT for token creation/verification
 Tokens stored in PostgreSQL blacklist for logout
+Redis lookups share one pooled client guarded by a circuit breaker
+Revocation checks are answered by a per-worker replica (see revocation.py)
+Users are resolved through a per-worker principal cache (see principals.py)
 """
 
 import jwt
@@ -12,9 +15,14 @@ from django.conf import settings
 from django.utils import timezone
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-import redis
 
+from apps.core.redis_client import get_breaker
 from .models import User, TokenBlacklist
+from .revocation import get_replica
+from .principals import get_principal_cache
+
+# Shared by the authenticator and JWTTokenManager.revoke_tokens
+blacklist_breaker = get_breaker('token_blacklist')
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -33,7 +41,10 @@ class JWTAuthentication(BaseAuthentication):
             return None
 
         token = auth_header[7:]  # Remove 'Bearer ' prefix
+        return self.authenticate_token(token)
 
+    def authenticate_token(self, token):
+        """Validate an access token and return (user, token)"""
         try:
             payload = jwt.decode(
                 token,
@@ -49,16 +60,18 @@ class JWTAuthentication(BaseAuthentication):
         if self._is_token_blacklisted(payload.get('jti')):
             raise AuthenticationFailed('Token has been revoked')
 
-        # Get user from token
-        try:
-            # Optimization: Select related role to avoid N+1 query (role checks are common)
-            user = User.objects.select_related('role').get(id=payload['user_id'])
-        except User.DoesNotExist:
+        # Get user from token (cached with its role; invalidated on save)
+        user = get_principal_cache().get(payload['user_id'])
+        if user is None:
             raise AuthenticationFailed('User not found')
 
         if not user.is_active:
             raise AuthenticationFailed('User is inactive')
 
+        # Deactivation or a role change bumps the generation
+        if payload.get('gen', 0) < user.token_generation:
+            raise AuthenticationFailed('Token has been revoked')
+
         return (user, token)
 
     def authenticate_header(self, request):
@@ -70,19 +83,32 @@ class JWTAuthentication(BaseAuthentication):
         if not jti:
             return False
 
-        try:
-            r = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            # Try Redis first (fast)
-            is_blacklisted = r.exists(f'token_blacklist:{jti}')
-            return bool(is_blacklisted)
-        except redis.ConnectionError:
-            # Fall back to database if Redis unavailable
-            return TokenBlacklist.objects.filter(token_jti=jti).exists()
+        # Local replica answers most checks; only Bloom filter hits reach the store
+        return get_replica().is_revoked(jti, JWTAuthentication._lookup_blacklist)
+
+    @staticmethod
+    def _lookup_blacklist(jti):
+        """Authoritative blacklist lookup"""
+        # Try Redis first (fast); fall back to database if Redis is
+        # unavailable or the circuit is open after repeated failures
+        return bool(blacklist_breaker.call(
+            lambda r: r.exists(f'token_blacklist:{jti}'),
+            lambda: TokenBlacklist.objects.filter(token_jti=jti).exists()
+        ))
+
+
+class QueryParamJWTAuthentication(JWTAuthentication):
+    """
+    Access token from the ?access_token= query parameter, for EventSource
+    clients that cannot set headers. Only enable it on streaming endpoints:
+    query strings end up in access logs.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get('access_token')
+        if not token:
+            return None
+        return self.authenticate_token(token)
 
 
 class JWTTokenManager:
@@ -107,6 +133,7 @@ class JWTTokenManager:
             'user_id': str(user.id),
             'username': user.username,
             'role': user.role.name,
+            'gen': user.token_generation,
             'jti': jti_access,
             'type': 'access',
             # Use integer timestamps for iat/exp to avoid naive datetime issues
@@ -116,6 +143,7 @@ class JWTTokenManager:
 
         refresh_payload = {
             'user_id': str(user.id),
+            'gen': user.token_generation,
             'jti': jti_refresh,
             'type': 'refresh',
             'iat': int(now.timestamp()),
@@ -171,6 +199,9 @@ class JWTTokenManager:
         except User.DoesNotExist:
             raise AuthenticationFailed('User not found')
 
+        if payload.get('gen', 0) < user.token_generation:
+            raise AuthenticationFailed('Refresh token has been revoked')
+
         # Create new access token
         # Use timezone-aware UTC for new token timestamps
         now = datetime.now(dt_timezone.utc)
@@ -180,6 +211,7 @@ class JWTTokenManager:
             'user_id': str(user.id),
             'username': user.username,
             'role': user.role.name,
+            'gen': user.token_generation,
             'jti': new_jti,
             'type': 'access',
             'iat': int(now.timestamp()),
@@ -204,25 +236,18 @@ class JWTTokenManager:
         Revoke tokens by adding to blacklist
         Used on logout
         """
-        # Add to Redis for fast lookup
-        try:
-            r = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
+        # Ensure expiry_time is timezone-aware in UTC
+        if expiry_time.tzinfo is None:
+            # assume expiry_time is in UTC if naive
+            expiry_time = timezone.make_aware(expiry_time, dt_timezone.utc)
+
+        # Add to Redis for fast lookup (continue even if Redis fails)
+        ttl = int((expiry_time - timezone.now()).total_seconds())
+        if ttl > 0:
+            blacklist_breaker.call(
+                lambda r: r.setex(f'token_blacklist:{token_jti}', ttl, '1'),
+                lambda: None
             )
-            # Ensure expiry_time is timezone-aware in UTC
-            if expiry_time.tzinfo is None:
-                # assume expiry_time is in UTC if naive
-                expiry_time = timezone.make_aware(expiry_time, dt_timezone.utc)
-
-            now = timezone.now()
-            ttl = int((expiry_time - now).total_seconds())
-            if ttl > 0:
-                r.setex(f'token_blacklist:{token_jti}', ttl, '1')
-        except redis.ConnectionError:
-            pass  # Continue even if Redis fails
 
         # Also store in database for persistence
         TokenBlacklist.objects.create(
@@ -230,3 +255,6 @@ class JWTTokenManager:
             token_jti=token_jti,
             expires_at=expiry_time
         )
+
+        # Tell every worker's replica about the revocation
+        get_replica().publish(token_jti, expiry_time.timestamp())
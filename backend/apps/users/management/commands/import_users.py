@@ -0,0 +1,55 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.users.provisioning import parse_roster, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Bulk-creates users from a CSV (username,email,password,role) or JSON roster'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv or .json)')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk_create chunk')
+        parser.add_argument('--workers', type=int, help='Password hashing processes')
+        parser.add_argument('--report', help='Write the per-row report (JSON lines) to this file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise CommandError(str(e))
+
+        try:
+            rows = parse_roster(data, fmt)
+        except ValueError as e:
+            raise CommandError(f'Invalid roster: {e}')
+
+        report = open(options['report'], 'w') if options['report'] else None
+        started = time.monotonic()
+        try:
+            for result in provision_users(
+                rows,
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+                processes=True
+            ):
+                if report:
+                    report.write(json.dumps(result) + '\n')
+                if 'summary' in result:
+                    summary = result['summary']
+                elif result['status'] == 'error':
+                    self.stdout.write(self.style.WARNING(
+                        f"Row {result['row']} ({result['username']}): {result['errors']}"
+                    ))
+        finally:
+            if report:
+                report.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['created']} of {summary['total']} users "
+            f"({summary['failed']} failed) in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.core.periodic import run_periodically
+from apps.users.models import TokenBlacklist
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired token blacklist rows in bounded batches. '
+        'An expired token is rejected by its exp claim anyway, so its row is dead weight.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Pause between batches (seconds)')
+        parser.add_argument(
+            '--retention-hours', type=float, default=settings.TOKEN_BLACKLIST_RETENTION_HOURS,
+            help='Keep rows this long past expiry'
+        )
+        parser.add_argument(
+            '--by-month', action='store_true',
+            help='Rotate out whole expiry months, oldest first, reporting each month'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a periodic task')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        run_periodically('purge_token_blacklist', lambda: self.run_once(options), options)
+
+    def run_once(self, options):
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(hours=options['retention_hours'])
+        expired = TokenBlacklist.objects.filter(expires_at__lt=cutoff)
+
+        if options['by_month'] or options['dry_run']:
+            months = (
+                expired.annotate(month=TruncMonth('expires_at'))
+                .values('month').annotate(rows=Count('id')).order_by('month')
+            )
+            for entry in months:
+                self.stdout.write(f"  {entry['month']:%Y-%m}: {entry['rows']} expired rows")
+            if options['dry_run']:
+                return
+
+        if options['by_month']:
+            deleted = 0
+            for month_start, month_end in self._months(expired, cutoff):
+                rows = self._purge(
+                    expired.filter(expires_at__gte=month_start, expires_at__lt=month_end), options
+                )
+                self.stdout.write(f'  rotated out {month_start:%Y-%m}: {rows} rows')
+                deleted += rows
+        else:
+            deleted = self._purge(expired, options)
+
+        remaining = TokenBlacklist.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reclaimed {deleted} expired blacklist rows in {time.monotonic() - started:.2f}s '
+            f'({remaining} remaining)'
+        ))
+
+    @staticmethod
+    def _months(expired, cutoff):
+        first = expired.order_by('expires_at').values_list('expires_at', flat=True).first()
+        if first is None:
+            return
+        start = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while start < cutoff:
+            end = (start + timedelta(days=32)).replace(day=1)
+            yield start, min(end, cutoff)
+            start = end
+
+    @staticmethod
+    def _purge(queryset, options):
+        """Delete in id batches walked along the expires_at index"""
+        deleted = 0
+        while True:
+            ids = list(
+                queryset.order_by('expires_at').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                return deleted
+            count, _ = TokenBlacklist.objects.filter(id__in=ids).delete()
+            deleted += count
+            if len(ids) < options['batch_size']:
+                return deleted
+            time.sleep(options['sleep'])
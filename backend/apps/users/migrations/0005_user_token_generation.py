@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_auditlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
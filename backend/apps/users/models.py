@@ -99,6 +99,8 @@ class User(AbstractBaseUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_login = models.DateTimeField(null=True, blank=True)
+    # Bumped on deactivation/role change; tokens from older generations are rejected
+    token_generation = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
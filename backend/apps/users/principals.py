@@ -0,0 +1,156 @@
+"""
+Cached principal resolution for JWTAuthentication
+Resolved users (with their role) are kept per worker in a bounded TTL/LRU
+cache and optionally in Redis, so authenticated requests skip the
+users/roles join. Saves to User and Role invalidate entries (see signals.py).
+"""
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.core.lru import LRUCache
+from apps.core.pubsub import get_bus
+from apps.core.redis_client import get_breaker
+from .models import User, Role
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'principal_invalidate'
+ALL = '*'
+
+# The password hash never leaves the database
+_USER_FIELDS = [f for f in User._meta.concrete_fields if f.attname != 'password']
+_ROLE_FIELDS = list(Role._meta.concrete_fields)
+
+
+def _dump(user):
+    return {
+        'user': {f.attname: getattr(user, f.attname) for f in _USER_FIELDS},
+        'role': {f.attname: getattr(user.role, f.attname) for f in _ROLE_FIELDS},
+    }
+
+
+def _build(data):
+    """Materialize a fresh User instance so request code can't mutate the cache"""
+    role = Role.from_db(
+        DEFAULT_DB_ALIAS,
+        [f.attname for f in _ROLE_FIELDS],
+        [f.to_python(data['role'][f.attname]) for f in _ROLE_FIELDS],
+    )
+    user = User.from_db(
+        DEFAULT_DB_ALIAS,
+        [f.attname for f in _USER_FIELDS],
+        [f.to_python(data['user'][f.attname]) for f in _USER_FIELDS],
+    )
+    user.role = role
+    return user
+
+
+class PrincipalCache:
+    """
+    Lookup order: local LRU -> Redis (if enabled) -> database.
+    The local tier is bypassed while the bus is down, since invalidations
+    from other workers could be missed.
+    """
+
+    def __init__(self, bus=None):
+        config = settings.PRINCIPAL_CACHE
+        self.ttl = config['TTL']
+        self.use_redis = config['USE_REDIS']
+        self._local = LRUCache(config['MAX_ENTRIES'], self.ttl)
+        self._breaker = get_breaker('principal_cache')
+        self.counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+        self.bus = bus or get_bus()
+        self.bus.subscribe(INVALIDATION_CHANNEL, self._on_message)
+        self.bus.add_reconnect_hook(self._local.clear)
+
+    def get(self, user_id):
+        """Return the user for user_id or None if it does not exist"""
+        key = str(user_id)
+        use_local = self.bus.healthy
+        if use_local:
+            data = self._local.get(key)
+            if data is not None:
+                self.counters['local_hits'] += 1
+                return _build(data)
+
+        data = self._get_redis(key)
+        if data is not None:
+            self.counters['redis_hits'] += 1
+        else:
+            self.counters['misses'] += 1
+            try:
+                user = User.objects.select_related('role').get(id=user_id)
+            except (User.DoesNotExist, ValueError):
+                return None
+            data = _dump(user)
+            self._set_redis(key, data)
+
+        if use_local:
+            self._local.set(key, data)
+        return _build(data)
+
+    def invalidate(self, user_id=ALL):
+        """Drop a user (or everyone) from every worker and from Redis"""
+        key = str(user_id)
+        self._drop_local(key)
+        if self.use_redis:
+            if key == ALL:
+                self._breaker.call(self._flush_redis, lambda: None)
+            else:
+                self._breaker.call(lambda r: r.delete(self._redis_key(key)), lambda: None)
+        self.bus.publish(INVALIDATION_CHANNEL, key)
+
+    def stats(self):
+        return {'entries': len(self._local), 'evictions': self._local.evictions, **self.counters}
+
+    def _on_message(self, key):
+        self._drop_local(key)
+
+    def _drop_local(self, key):
+        if key == ALL:
+            self._local.clear()
+        else:
+            self._local.delete(key)
+
+    @staticmethod
+    def _redis_key(key):
+        return f'principal:{key}'
+
+    def _get_redis(self, key):
+        if not self.use_redis:
+            return None
+        raw = self._breaker.call(lambda r: r.get(self._redis_key(key)), lambda: None)
+        return json.loads(raw) if raw else None
+
+    def _set_redis(self, key, data):
+        if self.use_redis:
+            raw = json.dumps(data, cls=DjangoJSONEncoder)
+            self._breaker.call(lambda r: r.setex(self._redis_key(key), self.ttl, raw), lambda: None)
+
+    def _flush_redis(self, r):
+        keys = list(r.scan_iter(match=self._redis_key('*'), count=1000))
+        if keys:
+            r.delete(*keys)
+
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_principal_cache():
+    """Return this worker's principal cache, building it lazily after fork"""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        with _cache_lock:
+            if _cache is None or _cache_pid != os.getpid():
+                _cache = PrincipalCache()
+                _cache_pid = os.getpid()
+    return _cache
@@ -0,0 +1,201 @@
+"""
+Bulk student provisioning
+Validates a roster with set-based uniqueness queries, hashes passwords in
+parallel and inserts users with chunked bulk_create. provision_users()
+yields one result per row as it goes, so callers can stream the report
+back instead of holding it all in memory.
+
+The import_users command hashes across a process pool. Web requests use
+a thread pool instead (PBKDF2 releases the GIL): forking a multithreaded
+gunicorn worker mid-request would copy other threads' locks and sockets.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import User, Role
+
+
+def parse_roster(data, fmt):
+    """
+    Row dicts from CSV (with a header row) or JSON (a list of objects, or
+    {"users": [...]}). data may be str or bytes. Raises ValueError when the
+    JSON is malformed or not one of those shapes.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if fmt == 'json':
+        return roster_rows(json.loads(data))
+    return _csv_rows(data)
+
+
+def roster_rows(data):
+    """
+    Row dicts from an already decoded JSON roster; entries that are not
+    objects become empty rows (reported as invalid). Raises ValueError for
+    anything but a list or {"users": [...]}.
+    """
+    if isinstance(data, dict):
+        data = data.get('users', [])
+    if not isinstance(data, list):
+        raise ValueError('Roster must be a list of users or {"users": [...]}')
+    return (row if isinstance(row, dict) else {} for row in data)
+
+
+def _csv_rows(data):
+    for row in csv.DictReader(io.StringIO(data)):
+        yield {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+
+
+def _hash_password(password):
+    # Runs in pool workers; settings are inherited through fork
+    return make_password(password)
+
+
+def _init_worker():
+    import django
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def _validate_row(row, allowed_roles):
+    """Field-level checks (same rules as RegisterSerializer); returns (cleaned, errors)"""
+    errors = {}
+    username = str(row.get('username') or '').strip()
+    email = User.objects.normalize_email(str(row.get('email') or '').strip())
+    password = str(row.get('password') or '')
+    role = str(row.get('role') or 'STUDENT').strip().upper()
+
+    if not username:
+        errors['username'] = 'This field is required.'
+    elif len(username) > 150:
+        errors['username'] = 'Ensure this field has no more than 150 characters.'
+    elif not username.isalnum() and '_' not in username:
+        errors['username'] = 'Username can only contain alphanumeric characters and underscores'
+    try:
+        validate_email(email)
+    except ValidationError:
+        errors['email'] = 'Enter a valid email address.'
+    if len(password) < 8:
+        errors['password'] = 'Password must be at least 8 characters'
+    if role not in allowed_roles:
+        errors['role'] = 'Invalid role'
+
+    return {'username': username, 'email': email, 'password': password, 'role': role}, errors
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def provision_users(rows, chunk_size=None, workers=None, processes=False):
+    """
+    Create users from roster rows. Yields
+        {'row': n, 'username': ..., 'status': 'created'|'error', 'errors': {...}}
+    per row, then a final {'summary': {...}}. Passwords are hashed in a
+    thread pool, or a process pool with processes=True (commands only).
+    """
+    chunk_size = chunk_size or settings.USER_IMPORT['CHUNK_SIZE']
+    if processes:
+        workers = workers or settings.USER_IMPORT['WORKERS'] or os.cpu_count()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        workers = workers or settings.USER_IMPORT['REQUEST_WORKERS']
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='provisioning')
+    allowed_roles = [c[0] for c in Role._meta.get_field('name').choices]
+    roles = {}
+    seen_usernames = set()
+    seen_emails = set()
+    created = failed = 0
+
+    with executor as pool:
+        numbered = enumerate(rows, start=1)
+        for chunk in _chunks(numbered, chunk_size):
+            results = {}
+            candidates = []
+            for n, row in chunk:
+                cleaned, errors = _validate_row(row, allowed_roles)
+                if not errors:
+                    # Duplicates within the roster itself
+                    if cleaned['username'] in seen_usernames:
+                        errors['username'] = 'Duplicate username in roster'
+                    if cleaned['email'] in seen_emails:
+                        errors['email'] = 'Duplicate email in roster'
+                seen_usernames.add(cleaned['username'])
+                seen_emails.add(cleaned['email'])
+                results[n] = {'row': n, 'username': cleaned['username'], 'status': 'error', 'errors': errors}
+                if not errors:
+                    candidates.append((n, cleaned))
+
+            # Set-based uniqueness against the database: two queries per chunk
+            taken_usernames = set(User.objects.filter(
+                username__in=[c['username'] for _, c in candidates]
+            ).values_list('username', flat=True))
+            taken_emails = set(User.objects.filter(
+                email__in=[c['email'] for _, c in candidates]
+            ).values_list('email', flat=True))
+            valid = []
+            for n, cleaned in candidates:
+                if cleaned['username'] in taken_usernames:
+                    results[n]['errors']['username'] = 'Username already exists'
+                if cleaned['email'] in taken_emails:
+                    results[n]['errors']['email'] = 'Email already registered'
+                if not results[n]['errors']:
+                    valid.append((n, cleaned))
+
+            for name in {c['role'] for _, c in valid} - set(roles):
+                roles[name], _ = Role.objects.get_or_create(
+                    name=name, defaults={'description': f'{name.title()} role'}
+                )
+
+            hashes = pool.map(_hash_password, [c['password'] for _, c in valid], chunksize=16)
+            users = [
+                User(username=c['username'], email=c['email'], role=roles[c['role']], password=h)
+                for (_, c), h in zip(valid, hashes)
+            ]
+            _insert(users, valid, results)
+
+            for n in sorted(results):
+                result = results[n]
+                if result['status'] == 'created':
+                    created += 1
+                else:
+                    failed += 1
+                if not result['errors']:
+                    result.pop('errors')
+                yield result
+
+    yield {'summary': {'total': created + failed, 'created': created, 'failed': failed}}
+
+
+def _insert(users, valid, results):
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+        for n, _ in valid:
+            results[n]['status'] = 'created'
+    except IntegrityError:
+        # Lost a race with a concurrent registration: find the offending rows
+        for user, (n, _) in zip(users, valid):
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                results[n]['status'] = 'created'
+            except IntegrityError:
+                results[n]['errors']['username'] = 'Username or email already exists'
@@ -0,0 +1,162 @@
+"""
+In-process replica of the token revocation set
+Each worker keeps a Bloom filter plus an exact jti -> exp map, fed by the
+message bus. Only Bloom filter hits consult the authoritative store
+(Redis, then PostgreSQL), so almost every request checks revocation locally.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.pubsub import get_bus
+from .models import TokenBlacklist
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = 'token_revoked'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationReplica:
+    """
+    Local copy of unexpired revocations. Entries drop out when the token's
+    own exp passes; the Bloom filter is rebuilt from the exact map on prune.
+    """
+
+    def __init__(self, bus=None):
+        config = settings.TOKEN_REVOCATION_CONFIG
+        self.error_rate = config['BLOOM_ERROR_RATE']
+        self.min_capacity = config['BLOOM_CAPACITY']
+        self.prune_interval = config['PRUNE_INTERVAL_SECONDS']
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._bloom = BloomFilter(self.min_capacity, self.error_rate)
+        self._next_prune = time.time() + self.prune_interval
+        self.counters = {'local_negative': 0, 'local_positive': 0, 'authoritative': 0}
+
+        self.bus = bus or get_bus()
+        self.bus.subscribe(REVOCATION_CHANNEL, self._on_message)
+        self.bus.add_reconnect_hook(self.load)
+        self.load()
+
+    def load(self):
+        """(Re)build from the database copy of the blacklist"""
+        now = timezone.now()
+        rows = TokenBlacklist.objects.filter(expires_at__gt=now).values_list('token_jti', 'expires_at')
+        exact = {jti: expires_at.timestamp() for jti, expires_at in rows.iterator()}
+        with self._lock:
+            # Keep anything that arrived over the bus while we were loading
+            exact.update(self._exact)
+            self._rebuild(exact)
+
+    def add(self, jti, exp):
+        if not jti or exp <= time.time():
+            return
+        with self._lock:
+            self._exact[jti] = exp
+            if len(self._exact) > self._bloom.capacity:
+                self._rebuild(self._exact)
+            else:
+                self._bloom.add(jti)
+
+    def publish(self, jti, exp):
+        """Record a revocation locally and fan it out to the other workers"""
+        self.add(jti, exp)
+        self.bus.publish(REVOCATION_CHANNEL, f'{jti} {int(exp)}')
+
+    def is_revoked(self, jti, authoritative):
+        """
+        authoritative(jti) is only called on a Bloom filter hit that the
+        exact map cannot confirm, or while the bus is disconnected (we may
+        have missed revocations in the meantime).
+        """
+        self._maybe_prune()
+        if self.bus.healthy:
+            if jti not in self._bloom:
+                self.counters['local_negative'] += 1
+                return False
+            exp = self._exact.get(jti)
+            if exp is not None and exp > time.time():
+                self.counters['local_positive'] += 1
+                return True
+        self.counters['authoritative'] += 1
+        return authoritative(jti)
+
+    def stats(self):
+        return {
+            'entries': len(self._exact),
+            'bloom_bits': self._bloom.size,
+            'bus_healthy': self.bus.healthy,
+            **self.counters,
+        }
+
+    def _on_message(self, message):
+        try:
+            jti, exp = message.rsplit(' ', 1)
+            self.add(jti, float(exp))
+        except ValueError:
+            logger.warning('Ignoring malformed revocation message: %r', message)
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now < self._next_prune:
+            return
+        with self._lock:
+            self._next_prune = now + self.prune_interval
+            live = {jti: exp for jti, exp in self._exact.items() if exp > now}
+            if len(live) != len(self._exact):
+                self._rebuild(live)
+
+    def _rebuild(self, exact):
+        # Caller holds the lock
+        bloom = BloomFilter(max(self.min_capacity, len(exact) * 2), self.error_rate)
+        for jti in exact:
+            bloom.add(jti)
+        self._exact = exact
+        self._bloom = bloom
+
+
+_replica = None
+_replica_pid = None
+_replica_lock = threading.Lock()
+
+
+def get_replica():
+    """Return this worker's replica, building it lazily after fork"""
+    global _replica, _replica_pid
+    if _replica is None or _replica_pid != os.getpid():
+        with _replica_lock:
+            if _replica is None or _replica_pid != os.getpid():
+                _replica = RevocationReplica()
+                _replica_pid = os.getpid()
+    return _replica
@@ -0,0 +1,49 @@
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import User, Role
+from .principals import get_principal_cache
+
+# Changes that must take effect on already-issued tokens
+_SECURITY_FIELDS = {'is_active', 'role', 'role_id'}
+
+
+@receiver(pre_save, sender=User)
+def detect_security_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Flag deactivation or role changes so post_save can bump token_generation.
+    Saves limited to other fields (e.g. last_login) skip the lookup.
+    """
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not (set(update_fields) & _SECURITY_FIELDS):
+        return
+    old = User.objects.filter(pk=instance.pk).values('is_active', 'role_id').first()
+    instance._security_changed = bool(old) and (
+        old['is_active'] != instance.is_active or old['role_id'] != instance.role_id
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_principal(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_security_changed', False):
+        # Tokens carrying an older generation are rejected from now on
+        User.objects.filter(pk=instance.pk).update(token_generation=F('token_generation') + 1)
+        instance.token_generation += 1
+        instance._security_changed = False
+    if not created:
+        get_principal_cache().invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def drop_deleted_user_principal(sender, instance, **kwargs):
+    get_principal_cache().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_principals(sender, instance, **kwargs):
+    # Roles change rarely; dropping every cached principal is simplest
+    get_principal_cache().invalidate()
@@ -3,7 +3,7 @@ Authentication API Views
 Handles user registration, login, logout, and token refresh
 """
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
@@ -16,6 +16,8 @@ from .serializers import (
     LogoutSerializer, TokenResponseSerializer, UserSerializer
 )
 from .authentication import JWTTokenManager
+from .admission import AdmissionRejected, get_login_gate, record_last_login
+from apps.core.throttling import LoginIPRateThrottle, LoginRateThrottle
 import logging
 
 logger = logging.getLogger(__name__)
@@ -69,6 +71,7 @@ def register_view(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPRateThrottle, LoginRateThrottle])
 def login_view(request):
     """
     Login Endpoint
@@ -110,7 +113,21 @@ def login_view(request):
             'detail': 'Invalid username or password'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    if not user.check_password(password):
+    # Admission control: bound concurrent PBKDF2 checks during login storms
+    try:
+        with get_login_gate().slot():
+            password_ok = user.check_password(password)
+    except AdmissionRejected as e:
+        response = Response({
+            'status': 'error',
+            'detail': 'Login queue is full, please retry shortly',
+            'queue_position': e.queue_position,
+            'retry_after': e.retry_after
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+
+    if not password_ok:
         return Response({
             'status': 'error',
             'detail': 'Invalid username or password'
@@ -122,9 +139,8 @@ def login_view(request):
             'detail': 'User account is disabled'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    # Update last login
-    user.last_login = timezone.now()
-    user.save(update_fields=['last_login'])
+    # Update last login (written asynchronously in batches)
+    record_last_login(user, timezone.now())
 
     # Create tokens
     tokens = JWTTokenManager.create_tokens(user)
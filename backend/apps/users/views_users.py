@@ -2,8 +2,12 @@
 User Management API Views
 Handles user profile, listing, and basic user operations
 """
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
@@ -11,6 +15,7 @@ from rest_framework.pagination import PageNumberPagination
 from .models import User, AuditLog
 from .serializers import UserSerializer, ProfileSerializer, UserManagementSerializer
 from .permissions import IsAdmin, IsAdminOrInstructor, IsAdminOrSelf
+from .provisioning import parse_roster, provision_users, roster_rows
 
 
 @api_view(['GET'])
@@ -192,6 +197,57 @@ def delete_user_view(request, user_id):
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+@parser_classes([MultiPartParser, JSONParser])
+def bulk_import_view(request):
+    """
+    Bulk Import Users (Admin Only)
+    POST /api/users/bulk-import/
+
+    Requires: Role = ADMIN
+
+    Body: multipart "file" (.csv with header username,email,password,role
+    or .json list), or a JSON list / {"users": [...]} of the same fields.
+
+    Response (streamed, one JSON object per line):
+    {"row": 1, "username": "student1", "status": "created"}
+    {"row": 2, "username": "student2", "status": "error", "errors": {"email": "Email already registered"}}
+    {"summary": {"total": 2, "created": 1, "failed": 1}}
+    """
+    upload = request.FILES.get('file')
+    try:
+        if upload is not None:
+            fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            rows = parse_roster(upload.read(), fmt)
+        elif not (isinstance(request.data, dict) and 'file' in request.data):
+            rows = roster_rows(request.data)
+        else:
+            raise ValueError('Provide a roster file or a JSON list of users')
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    admin = request.user
+    ip_address = request.META.get('REMOTE_ADDR')
+
+    def report():
+        for result in provision_users(rows):
+            if 'summary' in result:
+                AuditLog.objects.create(
+                    user=admin,
+                    action='BULK_IMPORT_USERS',
+                    resource='USER',
+                    details=result['summary'],
+                    ip_address=ip_address
+                )
+            yield json.dumps(result) + '\n'
+
+    return StreamingHttpResponse(report(), content_type='application/x-ndjson')
+
+
 @api_view(['GET'])
 @permission_classes([IsAdmin])
 def platform_stats_view(request):
@@ -203,16 +259,19 @@ def platform_stats_view(request):
     """
     from apps.exams.models import Exam
     from apps.attempts.models import Attempt
+    from apps.core.cache import cache_metrics
     
     total_users = User.objects.count()
     total_exams = Exam.objects.count()
-    total_attempts = Attempt.objects.count()
+    # PENDING rows are pre-provisioned, not attempts anyone made
+    total_attempts = Attempt.objects.exclude(status='PENDING').count()
     
     return Response({
         'status': 'success',
         'total_users': total_users,
         'total_exams': total_exams,
         'total_attempts': total_attempts,
+        'cache': cache_metrics(),
         'system_status': 'HEALTHY'
     }, status=status.HTTP_200_OK)
 
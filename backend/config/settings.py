@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'django_filters',
+    'apps.core',
     'apps.users',
     'apps.question_bank',
     'apps.exams',
@@ -131,13 +132,21 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Token buckets shared by all workers through Redis (apps.core.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'apps.core.throttling.RedisAnonRateThrottle',
+        'apps.core.throttling.RedisUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        # Login limits per (IP, username) and per IP. The per-IP bucket must admit an
+        # exam centre's students logging in together through one NAT address.
+        # An empty value disables the limit (e.g. for scripts/bench_login.py).
+        'login': os.getenv('LOGIN_THROTTLE_RATE', '10/min') or None,
+        'login_ip': os.getenv('LOGIN_IP_THROTTLE_RATE', '3000/min') or None,
+        'submit_answer': '120/min',
+        'proctoring': '60/min',
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -159,6 +168,181 @@ JWT_CONFIG = {
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
 REDIS_DB = int(os.getenv('REDIS_DB', '0'))
+# Shared connection pool (see apps.core.redis_client)
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.25'))
+# Circuit breaker: fall back to the database for a cooldown after repeated failures
+REDIS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('REDIS_CIRCUIT_FAILURE_THRESHOLD', '5'))
+REDIS_CIRCUIT_RESET_SECONDS = float(os.getenv('REDIS_CIRCUIT_RESET_SECONDS', '30'))
+
+# Cache: per-process LRU (L1) in front of Redis (L2), see apps.core.cache
+# CACHE_L2=memory swaps Redis for a local cache (tests, single process)
+CACHES = {
+    'default': {
+        'BACKEND': 'apps.core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', '5000')),
+            'L1_TIMEOUT': float(os.getenv('CACHE_L1_TIMEOUT', '5')),
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}',
+        'KEY_PREFIX': 'examplatform',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+        },
+    },
+}
+if os.getenv('CACHE_L2', 'redis') == 'memory':
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+
+# Rate limiter storage: 'redis' (shared by all workers) or 'memory' (tests)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'redis')
+
+# Message bus for cross-worker notifications: 'redis' (pub/sub) or 'memory' (tests)
+MESSAGE_BUS = os.getenv('MESSAGE_BUS', 'redis')
+MESSAGE_BUS_PREFIX = os.getenv('MESSAGE_BUS_PREFIX', 'examplatform:')
+
+# Expired token_blacklist rows are purged (manage.py purge_token_blacklist) after this
+# grace period, matching the TTLs on the Redis copy
+TOKEN_BLACKLIST_RETENTION_HOURS = float(os.getenv('TOKEN_BLACKLIST_RETENTION_HOURS', '24'))
+
+# Per-worker replica of revoked token JTIs
+TOKEN_REVOCATION_CONFIG = {
+    'BLOOM_CAPACITY': int(os.getenv('TOKEN_REVOCATION_BLOOM_CAPACITY', '100000')),
+    'BLOOM_ERROR_RATE': float(os.getenv('TOKEN_REVOCATION_BLOOM_ERROR_RATE', '0.001')),
+    'PRUNE_INTERVAL_SECONDS': 60,
+}
+
+# Login admission control (per worker): concurrent password checks and queue bound
+LOGIN_ADMISSION = {
+    'ENABLED': os.getenv('LOGIN_ADMISSION_ENABLED', 'True') == 'True',
+    'CONCURRENCY': int(os.getenv('LOGIN_ADMISSION_CONCURRENCY', '2')),
+    'MAX_QUEUE': int(os.getenv('LOGIN_ADMISSION_MAX_QUEUE', '16')),
+    'WAIT_TIMEOUT': float(os.getenv('LOGIN_ADMISSION_WAIT_TIMEOUT', '3')),
+    'LAST_LOGIN_FLUSH_SECONDS': float(os.getenv('LAST_LOGIN_FLUSH_SECONDS', '5')),
+}
+
+# Bulk user import: rows per bulk_create chunk, password hashing processes (0 = CPU count)
+USER_IMPORT = {
+    'CHUNK_SIZE': int(os.getenv('USER_IMPORT_CHUNK_SIZE', '1000')),
+    # Hashing processes for the import_users command (0: one per CPU)
+    'WORKERS': int(os.getenv('USER_IMPORT_WORKERS', '0')),
+    # Hashing threads for the bulk-import endpoint
+    'REQUEST_WORKERS': int(os.getenv('USER_IMPORT_REQUEST_WORKERS', '4')),
+}
+
+# Per-worker cache of authenticated users (optionally shared through Redis)
+PRINCIPAL_CACHE = {
+    'TTL': int(os.getenv('PRINCIPAL_CACHE_TTL', '60')),
+    'MAX_ENTRIES': int(os.getenv('PRINCIPAL_CACHE_MAX_ENTRIES', '10000')),
+    'USE_REDIS': os.getenv('PRINCIPAL_CACHE_USE_REDIS', 'False') == 'True',
+}
+
+# Answer autosaves: write_through (one upsert per save) or write_behind
+# (buffered in Redis, bulk-flushed by a background flusher)
+ANSWER_BUFFER = {
+    'MODE': os.getenv('ANSWER_BUFFER_MODE', 'write_through'),
+    'BACKEND': os.getenv('ANSWER_BUFFER_BACKEND', 'redis'),
+    'FLUSH_INTERVAL': float(os.getenv('ANSWER_BUFFER_FLUSH_INTERVAL', '5')),
+    'FLUSH_BATCH': int(os.getenv('ANSWER_BUFFER_FLUSH_BATCH', '200')),
+    # Flush from a thread in every web worker; disable when running flush_answer_buffer --loop
+    'IN_PROCESS_FLUSHER': os.getenv('ANSWER_BUFFER_IN_PROCESS_FLUSHER', 'True') == 'True',
+}
+
+# Adaptive exams: next-question strategy and per-process pool cache
+ADAPTIVE = {
+    'SELECTOR': os.getenv('ADAPTIVE_SELECTOR', 'apps.attempts.adaptive.StepSelector'),
+    'POOL_CACHE_ENTRIES': int(os.getenv('ADAPTIVE_POOL_CACHE_ENTRIES', '10000')),
+    'POOL_CACHE_TTL': int(os.getenv('ADAPTIVE_POOL_CACHE_TTL', '3600')),
+    # Served/answered question sets per attempt: 'redis' (shared) or 'memory' (tests)
+    'STATE_BACKEND': os.getenv('ADAPTIVE_STATE_BACKEND', 'redis'),
+}
+
+# Proctoring events: which types count as violations, the limit that ends an
+# attempt, and how event rows are batched into the database
+PROCTORING = {
+    'VIOLATION_LIMIT': int(os.getenv('PROCTORING_VIOLATION_LIMIT', '3')),
+    'VIOLATION_EVENTS': os.getenv('PROCTORING_VIOLATION_EVENTS', 'TAB_SWITCH,FULLSCREEN_EXIT,COPY_PASTE').split(','),
+    'MAX_EVENTS': int(os.getenv('PROCTORING_MAX_EVENTS', '200')),
+    'FLUSH_INTERVAL': float(os.getenv('PROCTORING_FLUSH_INTERVAL', '2')),
+    'FLUSH_BATCH': int(os.getenv('PROCTORING_FLUSH_BATCH', '1000')),
+}
+
+# Live exam monitoring stream (SSE): attempt changes are published per exam on
+# their own bus prefix (it must not start with MESSAGE_BUS_PREFIX)
+MONITORING = {
+    'ENABLED': os.getenv('MONITORING_ENABLED', 'True') == 'True',
+    'CHANNEL_PREFIX': os.getenv('MONITORING_CHANNEL_PREFIX', 'examplatform-monitor:'),
+    'SNAPSHOT_INTERVAL': float(os.getenv('MONITORING_SNAPSHOT_INTERVAL', '30')),
+    'SNAPSHOT_CACHE_TIMEOUT': int(os.getenv('MONITORING_SNAPSHOT_CACHE_TIMEOUT', '2')),
+    'HEARTBEAT': float(os.getenv('MONITORING_HEARTBEAT', '15')),
+    # Streams hold a gunicorn thread: end them periodically (EventSource reconnects)
+    # and let them take at most a quarter of a worker's threads (GUNICORN_THREADS,
+    # as in entrypoint.sh); clients over the cap get 503 and poll instead
+    'MAX_DURATION': float(os.getenv('MONITORING_MAX_DURATION', '300')),
+    'MAX_STREAMS': max(1, min(
+        int(os.getenv('MONITORING_MAX_STREAMS', '16')),
+        int(os.getenv('GUNICORN_THREADS', '8')) // 4,
+    )),
+    'QUEUE_SIZE': int(os.getenv('MONITORING_QUEUE_SIZE', '2000')),
+}
+
+# Completion certificates: rendered by a per-process thread pool when an attempt
+# completes and stored on disk by content hash
+CERTIFICATES = {
+    'ROOT': os.getenv('CERTIFICATE_ROOT', str(BASE_DIR / 'media' / 'certificates')),
+    'WORKERS': int(os.getenv('CERTIFICATE_WORKERS', '2')),
+    'RENDER_ON_COMPLETE': os.getenv('CERTIFICATE_RENDER_ON_COMPLETE', 'True') == 'True',
+}
+
+# Outgoing email: queued in the email_outbox table and delivered by
+# `manage.py send_outbox --loop` (console/file backends work for local runs)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@examplatform.local')
+OUTBOX = {
+    'FROM_EMAIL': DEFAULT_FROM_EMAIL,
+    'BATCH_SIZE': int(os.getenv('OUTBOX_BATCH_SIZE', '100')),
+    'MAX_TRIES': int(os.getenv('OUTBOX_MAX_TRIES', '8')),
+    'BACKOFF_BASE': float(os.getenv('OUTBOX_BACKOFF_BASE', '30')),
+    'BACKOFF_MAX': float(os.getenv('OUTBOX_BACKOFF_MAX', '3600')),
+}
+
+# Idempotency-Key support on attempt start / submit-answer / finish: stored
+# responses are replayed for TTL_HOURS, then purged by purge_idempotency_records
+IDEMPOTENCY = {
+    'TTL_HOURS': float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24')),
+    # A claim still unanswered after this long belongs to a crashed request
+    'IN_PROGRESS_TIMEOUT': float(os.getenv('IDEMPOTENCY_IN_PROGRESS_TIMEOUT', '60')),
+}
+
+# Offline sync (attempt sync endpoint) for is_offline_capable exams
+OFFLINE_SYNC = {
+    'MAX_EVENTS': int(os.getenv('OFFLINE_SYNC_MAX_EVENTS', '1000')),
+    # Limit on the decompressed request body
+    'MAX_BODY_BYTES': int(os.getenv('OFFLINE_SYNC_MAX_BODY_BYTES', str(2 * 1024 * 1024))),
+    # How long after the deadline a reconnecting client may still upload its log
+    # (the expiry sweeper waits this long for offline-capable exams)
+    'LATE_SYNC_SECONDS': int(os.getenv('OFFLINE_SYNC_LATE_SECONDS', '900')),
+    # Tolerated client clock drift when checking answer times against the deadline
+    'CLOCK_SKEW_SECONDS': int(os.getenv('OFFLINE_SYNC_CLOCK_SKEW_SECONDS', '120')),
+}
+
+# Whole-exam re-grading (regrade_exam command / exam regrade endpoint)
+REGRADE = {
+    'SHARD_SIZE': int(os.getenv('REGRADE_SHARD_SIZE', '5000')),
+    # Processes for the regrade_exam command (0: one per CPU); the endpoint runs in-process
+    'WORKERS': int(os.getenv('REGRADE_WORKERS', '0')),
+    'WRITE_CHUNK': int(os.getenv('REGRADE_WRITE_CHUNK', '2000')),
+}
 
 # CORS Settings - LOCAL ONLY
 CORS_ALLOWED_ORIGINS = [
@@ -178,7 +362,9 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
+CORS_EXPOSE_HEADERS = ['idempotent-replayed', 'retry-after']
 
 # Security Settings (local only - relax for development)
 CSRF_TRUSTED_ORIGINS = [
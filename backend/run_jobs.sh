@@ -0,0 +1,23 @@
+#!/bin/sh
+
+# Background loops from MAINTENANCE.md ("Background Jobs"), run next to the web
+# server. Each command is restarted if it exits, so a crash cannot silently stop
+# email delivery or the expiry sweep.
+
+run() {
+  while true; do
+    python manage.py "$@" || echo "$1 exited with status $?, restarting" >&2
+    sleep 5
+  done
+}
+
+echo "Starting background jobs..."
+run send_outbox --loop &
+run sweep_expired_attempts --loop &
+run purge_token_blacklist --loop &
+run purge_idempotency_records --loop &
+# Only needed when the web workers do not flush the answer buffer themselves
+if [ "${ANSWER_BUFFER_IN_PROCESS_FLUSHER:-True}" = "False" ]; then
+  run flush_answer_buffer --loop &
+fi
+wait
@@ -18,10 +18,19 @@ python manage.py migrate --noinput
 echo "Initializing admin..."
 python manage.py initadmin
 
+# Background jobs (email outbox, expiry sweep, purges); set RUN_BACKGROUND_JOBS=False
+# when another container runs them
+if [ "${RUN_BACKGROUND_JOBS:-True}" = "True" ]; then
+  sh /app/run_jobs.sh &
+fi
+
 # Start Gunicorn
+# Live monitoring streams (SSE) hold a thread each; settings cap them at a quarter of
+# GUNICORN_THREADS per worker, so raise it to serve more instructors concurrently
 echo "Starting Gunicorn..."
 exec gunicorn config.wsgi:application \
     --bind 0.0.0.0:8000 \
     --workers 4 \
+    --threads ${GUNICORN_THREADS:-8} \
     --access-logfile - \
     --error-logfile -
@@ -39,7 +39,9 @@ export class AttemptService {
         return this.http.post(`${this.apiUrl}/${attemptId}/submit-answer/`, {
             question_id: questionId,
             selected_choice_id: choiceId,
-            answer_text: answerText
+            answer_text: answerText,
+            // Lets the server keep the newest save when requests arrive out of order
+            client_ts: Date.now() / 1000
         });
     }
 
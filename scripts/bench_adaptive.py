@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Adaptive selector micro-benchmark (no database, no Django settings).
+
+Simulates students working through adaptive papers of several sizes and
+times each next-question pick: the bitmap selector used by submit-answer
+against a naive scan that rebuilds the exclusion list on every answer
+(what the old ExamQuestion filter did, minus the query).
+
+Example:
+    python scripts/bench_adaptive.py --sizes 50 200 1000 --attempts 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from apps.attempts.adaptive import LEVELS, AttemptState, DifficultyPools, StepSelector  # noqa: E402
+
+
+def naive_next(question_ids, difficulty, answered, question_id, is_correct, selector):
+    level = selector.target_level(difficulty[question_id], is_correct)
+    for candidate in question_ids:
+        if difficulty[candidate] == level and candidate not in answered:
+            return candidate
+    return None
+
+
+def run(size, attempts, seed):
+    rng = random.Random(seed)
+    question_ids = [f'q{i}' for i in range(size)]
+    difficulties = [rng.choice(LEVELS) for _ in question_ids]
+    difficulty = dict(zip(question_ids, difficulties))
+    pools = DifficultyPools(question_ids, difficulties)
+    selector = StepSelector()
+
+    bitmap = naive = 0.0
+    picks = 0
+    for _ in range(attempts):
+        state = AttemptState()
+        answered = []
+        current = question_ids[0]
+        for _ in range(size):
+            is_correct = rng.random() < 0.6
+            answered.append(current)
+
+            started = time.perf_counter()
+            state.answered |= pools.bit(current)
+            chosen = selector.next_question(pools, state, current, is_correct)
+            if chosen:
+                state.served |= pools.bit(chosen)
+            bitmap += time.perf_counter() - started
+
+            started = time.perf_counter()
+            naive_next(question_ids, difficulty, set(answered), current, is_correct, selector)
+            naive += time.perf_counter() - started
+
+            picks += 1
+            if chosen is None:
+                remaining = [q for q in question_ids if not state.answered & pools.bit(q)]
+                if not remaining:
+                    break
+                chosen = remaining[0]
+            current = chosen
+    return picks, bitmap, naive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000], help='Questions per paper')
+    parser.add_argument('--attempts', type=int, default=200, help='Simulated attempts per size')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'questions':>10} {'picks':>9} {'bitmap us/pick':>15} {'naive us/pick':>14} {'speedup':>8}")
+    for size in args.sizes:
+        picks, bitmap, naive = run(size, args.attempts, args.seed)
+        print(
+            f'{size:>10} {picks:>9} {bitmap / picks * 1e6:>15.2f} '
+            f'{naive / picks * 1e6:>14.2f} {naive / bitmap:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Login storm benchmark.
+
+Fires N concurrent POST /api/auth/login/ requests (one per simulated
+student) and reports p50/p99 latency and the status mix for each level.
+Default levels: 1000, 5000 and 10000 concurrent users.
+
+Every request comes from this one client IP and each account logs in
+several times, so the login rate limits would reject almost all of them
+and the latencies would measure the 429 path instead of admission
+control. Run the server under test with the throttles disabled:
+
+    LOGIN_THROTTLE_RATE= LOGIN_IP_THROTTLE_RATE= gunicorn ...
+
+Any 429 responses are counted separately and left out of the latencies.
+
+Users are expected to exist as <prefix><n> with a shared password. Pass
+--provision to create them first with the import_users management command
+(run locally, so the server under test must use the same database;
+accounts that already exist are reported and left alone).
+
+Example:
+    python scripts/bench_login.py --base http://127.0.0.1:8000 --provision --levels 1000
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+async def post_json(host, port, path, payload, timeout):
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        f'POST {path} HTTP/1.1\r\n'
+        f'Host: {host}:{port}\r\n'
+        'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        'Connection: close\r\n\r\n'
+    ).encode('ascii')
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(head + body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_level(args, host, port, concurrency):
+    start_gate = asyncio.Event()
+    latencies = []
+    ok_latencies = []
+    throttled = 0
+    statuses = Counter()
+
+    async def one(n):
+        nonlocal throttled
+        await start_gate.wait()
+        payload = {'username': f'{args.prefix}{n % args.users}', 'password': args.password}
+        started = time.perf_counter()
+        try:
+            code = await post_json(host, port, '/api/auth/login/', payload, args.timeout)
+        except Exception as e:
+            code = type(e).__name__
+        elapsed = (time.perf_counter() - started) * 1000
+        statuses[code] += 1
+        if code == 429:
+            throttled += 1
+            return
+        latencies.append(elapsed)
+        if code == 200:
+            ok_latencies.append(elapsed)
+
+    tasks = [asyncio.create_task(one(n)) for n in range(concurrency)]
+    await asyncio.sleep(0)
+    wall = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - wall
+
+    print(f'--- {concurrency} concurrent logins ({wall:.1f}s wall) ---')
+    print(f'  non-429: p50={percentile(latencies, 50):8.1f} ms  p99={percentile(latencies, 99):8.1f} ms')
+    print(f'  200 OK:  p50={percentile(ok_latencies, 50):8.1f} ms  p99={percentile(ok_latencies, 99):8.1f} ms')
+    print('  status:  ' + ', '.join(f'{k}={v}' for k, v in sorted(statuses.items(), key=str)))
+    if throttled:
+        print(f'  WARNING: {throttled} requests were throttled (429); '
+              'start the server with LOGIN_THROTTLE_RATE= LOGIN_IP_THROTTLE_RATE=')
+
+
+def provision(args):
+    """Create the benchmark accounts with import_users; exits when that fails"""
+    print(f'Provisioning {args.users} users...')
+    fd, roster = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['username', 'email', 'password', 'role'])
+            for n in range(args.users):
+                writer.writerow([f'{args.prefix}{n}', f'{args.prefix}{n}@bench.local', args.password, 'STUDENT'])
+        result = subprocess.run(
+            [sys.executable, args.manage, 'import_users', roster],
+            cwd=os.path.dirname(os.path.abspath(args.manage)), capture_output=True, text=True,
+        )
+    finally:
+        os.unlink(roster)
+
+    if result.returncode != 0:
+        sys.exit(f'import_users failed ({result.returncode}):\n{result.stderr or result.stdout}')
+    lines = result.stdout.strip().splitlines()
+    # Per-row warnings, then the summary line
+    existing = sum(1 for line in lines if 'already' in line)
+    other = [line for line in lines[:-1] if 'already' not in line]
+    print(f'  {lines[-1] if lines else "no output"} ({existing} already existed)')
+    if other:
+        print(f'  {len(other)} rows failed, e.g. {other[0]}')
+        sys.exit('Provisioning failed; the benchmark would log in as missing accounts')
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base', default='http://127.0.0.1:8000')
+    parser.add_argument('--levels', default='1000,5000,10000', help='comma-separated concurrency levels')
+    parser.add_argument('--users', type=int, default=1000, help='distinct accounts to log in as')
+    parser.add_argument('--prefix', default='bench_student_')
+    parser.add_argument('--password', default='BenchPass#2024')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--provision', action='store_true', help='create the accounts first (import_users)')
+    parser.add_argument(
+        '--manage', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'manage.py'),
+        help='manage.py used by --provision',
+    )
+    args = parser.parse_args()
+
+    # One socket per simulated user
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError):
+        pass
+
+    url = urlsplit(args.base)
+    host, port = url.hostname, url.port or 80
+    if args.provision:
+        provision(args)
+    for level in [int(x) for x in args.levels.split(',') if x]:
+        await run_level(args, host, port, level)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())